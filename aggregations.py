@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+
+# Dimensions charted on the dashboard
+DIMENSIONS = ["activity_status", "college", "uname", "task_title"]
+
+# Column summed alongside the counts
+VALUE_COLUMN = "time_spent_minutes"
+
+# Number of rows kept for the "Top N" charts
+TOP_N = 10
+
+# Timestamp column the daily trend is bucketed by
+DATE_COLUMN = "created_date"
+
+
+def dimension_totals(series, values):
+    """Task count and summed minutes per value of series, in one bincount pass.
+
+    Categorical columns reuse their codes; anything else is factorized first.
+    Missing values and unused categories are left out.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes, labels = series.cat.codes.to_numpy(), series.cat.categories
+    else:
+        codes, labels = pd.factorize(series)
+
+    present = codes >= 0
+    codes = codes[present]
+    counts = np.bincount(codes, minlength=len(labels))
+    minutes = np.bincount(codes, weights=values[present], minlength=len(labels))
+
+    used = counts > 0
+    return pd.DataFrame(
+        {"count": counts[used], "minutes": minutes[used]},
+        index=pd.Index(np.asarray(labels)[used], name=series.name),
+    )
+
+
+def top_n(totals, column, n=TOP_N):
+    """Largest n rows of totals by column, using partial selection instead of a full sort."""
+    values = totals[column].to_numpy()
+    if len(values) > n:
+        picked = np.argpartition(-values, n - 1)[:n]
+    else:
+        picked = np.arange(len(values))
+    picked = picked[np.argsort(-values[picked], kind="stable")]
+    return totals.iloc[picked]
+
+
+def daily_totals(dates, values):
+    """Tasks and summed minutes per calendar day of dates, oldest first."""
+    days = dates.dt.normalize()
+    codes, labels = pd.factorize(days, sort=True)
+    present = codes >= 0
+    codes = codes[present]
+    return pd.DataFrame({
+        "day": labels,
+        "tasks": np.bincount(codes, minlength=len(labels)),
+        "minutes": np.bincount(codes, weights=values[present], minlength=len(labels)),
+    })
+
+
+def summarize(df, dimensions=DIMENSIONS, value_column=VALUE_COLUMN, n=TOP_N):
+    """Compute every metric and chart input the dashboard needs from one frame.
+
+    Returns a dict with total_tasks, total_minutes, the per-day trend (daily,
+    None without a DATE_COLUMN) and, per dimension present in df, its full
+    totals plus the top-n rows by count and by minutes.
+    """
+    if value_column in df.columns:
+        values = df[value_column].to_numpy(dtype="float64", na_value=0)
+    else:
+        values = np.zeros(len(df))
+
+    summary = {
+        "total_tasks": len(df),
+        "total_minutes": float(values.sum()),
+        "has_minutes": value_column in df.columns,
+        "dimensions": {},
+        "daily": daily_totals(df[DATE_COLUMN], values) if DATE_COLUMN in df.columns else None,
+    }
+    for dim in dimensions:
+        if dim not in df.columns:
+            continue
+        totals = dimension_totals(df[dim], values)
+        summary["dimensions"][dim] = {
+            "totals": totals,
+            "top_count": top_n(totals, "count", n),
+            "top_minutes": top_n(totals, "minutes", n),
+        }
+    return summary
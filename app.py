@@ -1,17 +1,25 @@
 import streamlit as st
 import os
 import re
+import time
+import functools
 import pandas as pd
-import numpy as np
 import requests
 import json
 import plotly.express as px
-import plotly.graph_objects as go
 from datetime import datetime, timedelta
-from mailer import send_summary_email
-from datetime import datetime, timedelta
-from apscheduler.schedulers.background import BackgroundScheduler
-from mailer import send_summary_email  # ✅ REAL sender
+from dataset_cache import get_dataset, get_rollups, sync_dataset
+from aggregations import summarize
+from facets import FACETS, FacetIndex
+from search_index import SearchIndex
+from pagination import PAGE_SIZES, page_bounds, page_count, sort_order, truncate
+from exports import EXPORT_FORMATS, export_file, export_signature
+from reports import detail_frame, save_report, send_detailed_report
+from report_scheduler import get_scheduler, sync_reports
+from scheduler import schedule_jobs
+from rollups import ROLLUP_MIN_DAYS, summarize_rollups
+from metrics import observe, serve_metrics, snapshot, timed
+from mailer import OUTBOX_ENABLED, start_outbox_worker
 # Set the page configuration FIRST
 st.set_page_config(
     page_title="Task Activity Dashboard",
@@ -26,68 +34,67 @@ st.title("Startup World")
 # Define custom colors
 CUSTOM_COLORS = px.colors.qualitative.Plotly
 
+# Prometheus text endpoint for this process, when METRICS_PORT is set
+serve_metrics()
+start_outbox_worker()
+
+@st.cache_resource
+def start_scheduler():
+    # Once per process: the daily email, saved and segment reports and the cache
+    # warm-up run in this process. Saved jobs fire after a restart without
+    # waiting for a click; claims keep a run from happening twice when
+    # scheduler.py is also up on this machine.
+    scheduler = get_scheduler()
+    schedule_jobs(scheduler)
+    return scheduler
+
+start_scheduler()
+
+# Default auto-refresh interval of a view that includes today (seconds, 0 = off)
+AUTO_REFRESH_SECONDS = int(os.getenv("DASHBOARD_AUTO_REFRESH", "0"))
+AUTO_REFRESH_CHOICES = sorted({0, 30, 60, 300, AUTO_REFRESH_SECONDS})
+
+# Rerun timings kept per section (most recent last)
+TIMING_HISTORY = 50
+run_started = time.perf_counter()
+
+def record_timing(section, seconds):
+    timings = st.session_state.setdefault("rerun_timings", {})
+    history = timings.setdefault(section, [])
+    history.append(seconds)
+    del history[:-TIMING_HISTORY]
+    observe("section_seconds", seconds, section=section)
+
+def section(name):
+    # Run a dashboard section as a fragment: its own widgets rerun only this
+    # function, and every run of it is timed under name
+    def decorate(fn):
+        @st.fragment
+        @functools.wraps(fn)
+        def run(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record_timing(name, time.perf_counter() - started)
+        return run
+    return decorate
+
 # Function to fetch data from the API
-@st.cache_data(ttl=3600)  # Cache data for 1 hour
-def fetch_data(from_date, to_date):
+def fetch_data(from_date, to_date, loader=get_dataset):
     try:
-        url = f"http://startupworld.in/Version1/get_task_activity.php?from_date={from_date}&to_date={to_date}"
-        response = requests.get(url)
-        if response.status_code == 200:
-            data = response.json()
-            return data
-        else:
-            st.error(f"Error fetching data: {response.status_code}")
-            return None
+        # Shared with other dynos and the scheduler; stale copies are served while they refresh
+        with timed("dashboard_load", loader=loader.__name__) as info:
+            data = loader(from_date, to_date)
+            info["rows"] = len(data)
+        return data
+    except requests.exceptions.HTTPError as e:
+        st.error(f"Error fetching data: {e.response.status_code}")
+        return None
     except Exception as e:
         st.error(f"Exception occurred: {e}")
         return None
 
-# Function to process data into a pandas DataFrame
-def process_data(data):
-    if "data" in data:
-        df = pd.json_normalize(data["data"])
-        
-        # Convert date fields to datetime
-        date_columns = ["created_date", "updated_date"]
-        for col in date_columns:
-            if col in df.columns:
-               df[col] = pd.to_datetime(df[col], format='%d-%m-%Y', errors='coerce')
-
-        
-        # Convert time_spent to minutes for easier analysis
-        if "time_spent" in df.columns:
-            df["time_spent_minutes"] = df["time_spent"].apply(lambda x: convert_time_to_minutes(x) if pd.notnull(x) else 0)
-        
-        # Clean up nullable fields and ensure 'college' column is string
-        for col in df.columns:
-            if df[col].dtype == 'object':
-                df[col] = df[col].replace(["null", "NULL", "None", ""], np.nan)
-
-        if 'college' in df.columns:
-            # Convert 'college' column to string type to avoid TypeError
-            df['college'] = df['college'].astype(str)
-        
-        return df
-    else:
-        st.error("No data field found in API response")
-        return pd.DataFrame()
-
-# Function to convert time strings like "4:30" to minutes
-def convert_time_to_minutes(time_str):
-    try:
-        if pd.isnull(time_str) or time_str == "":
-            return 0
-        
-        parts = time_str.split(":")
-        if len(parts) == 2:
-            hours = int(parts[0])
-            minutes = int(parts[1])
-            return hours * 60 + minutes
-        else:
-            return 0
-    except:
-        return 0
-
 # Title and description
 st.title("📊 Task Activity Dashboard")
 st.markdown("""
@@ -111,217 +118,347 @@ to_date = st.sidebar.date_input("To Date", value=datetime.strptime(default_to_da
 from_date_str = from_date.strftime("%Y-%m-%d")
 to_date_str = to_date.strftime("%Y-%m-%d")
 
-# Fetch and process data
-with st.spinner("Fetching data..."):
-    raw_data = fetch_data(from_date_str, to_date_str)
-    if raw_data:
-        df = process_data(raw_data)
-        if not df.empty:
-            st.success(f"Successfully loaded {len(df)} task activities.")
+# Long ranges are drawn from the daily rollups; their rows are only loaded once
+# a facet filter, search, the task table, a download or an email needs them
+range_days = (to_date - from_date).days + 1
+rollup_mode = range_days > ROLLUP_MIN_DAYS
+
+def rows_requested():
+    return (st.session_state.get("load_rows") == (from_date_str, to_date_str)
+            or any(st.session_state.get(f"facet_{col}") for col in FACETS)
+            or bool(st.session_state.get("search_term", "").strip()))
+
+def request_rows():
+    st.session_state["load_rows"] = (from_date_str, to_date_str)
+
+def all_rows():
+    # Every row of a long range, for a download or email asked for before they were loaded
+    df = fetch_data(from_date_str, to_date_str)
+    if df is None:
+        raise RuntimeError("Failed to fetch data from API.")
+    return df, None, df
+
+load_rows = not rollup_mode or rows_requested()
+if rollup_mode and load_rows:
+    # Keep the table once it is up, even after the filters are cleared again
+    request_rows()
+
+# Live view: only rows changed since the last load are fetched and merged in
+auto_refresh_seconds = 0
+if not rollup_mode and from_date <= today <= to_date:
+    auto_refresh_seconds = st.sidebar.selectbox(
+        "🔄 Auto-refresh",
+        AUTO_REFRESH_CHOICES,
+        index=AUTO_REFRESH_CHOICES.index(AUTO_REFRESH_SECONDS),
+        format_func=lambda seconds: f"Every {seconds} s" if seconds else "Off",
+        key="auto_refresh",
+    )
+
+def auto_refresh(interval, shown_version):
+    @st.fragment(run_every=interval)
+    def check_for_changes():
+        # The fragment also runs with every full page load, which has just read the data
+        started = time.perf_counter()
+        if time.time() - st.session_state.setdefault("auto_refresh_at", time.time()) >= interval / 2:
+            st.session_state["auto_refresh_at"] = time.time()
+            try:
+                latest = sync_dataset(from_date_str, to_date_str)
+            except Exception as e:
+                print(f"⚠️ Auto-refresh failed: {e}")
+                latest = None
+            record_timing("auto_refresh", time.perf_counter() - started)
+            if latest is not None and latest.attrs.get("version") != shown_version:
+                st.rerun(scope="app")
+        checked = datetime.fromtimestamp(st.session_state["auto_refresh_at"])
+        st.caption(f"🔄 Checked for changes at {checked:%H:%M:%S}")
+    check_for_changes()
+
+# Additional filters based on the data we have
+@st.cache_resource(max_entries=4)
+def facet_index(_df, dataset_version):
+    # Built once per loaded dataset and shared across sessions
+    return FacetIndex(_df)
+
+# All chart inputs in one pass, memoized on (dataset version, filters) so that
+# unrelated widgets never recompute them. The leading underscore keeps
+# Streamlit from hashing the frame itself.
+@st.cache_data(max_entries=64)
+def chart_data(_filtered_df, dataset_version, filters):
+    with timed("aggregations") as info:
+        info["rows"] = len(_filtered_df)
+        return summarize(_filtered_df)
+
+@st.cache_data(max_entries=16)
+def rollup_chart_data(_rollups, dataset_version):
+    return summarize_rollups(_rollups)
+
+def rollup_facets(summary):
+    # Facet options from the rollups' totals; choosing one loads the rows
+    for col, label in FACETS.items():
+        if col not in summary["dimensions"]:
+            continue
+        counts = summary["dimensions"][col]["totals"]["count"]
+        st.sidebar.multiselect(
+            label,
+            sorted(counts.index),
+            key=f"facet_{col}",
+            format_func=lambda value, counts=counts: f"{value} ({counts.get(value, 0)})",
+            placeholder="All",
+        )
+
+if load_rows:
+    # Fetch and process data
+    with st.spinner("Fetching data..."):
+        df = fetch_data(from_date_str, to_date_str)
+        if df is not None:
+            if not df.empty:
+                st.success(f"Successfully loaded {len(df)} task activities.")
+            else:
+                st.warning("No task activities found for the selected date range.")
         else:
-            st.warning("No task activities found for the selected date range.")
+            st.error("Failed to fetch data from API.")
+            st.stop()
+
+    if auto_refresh_seconds:
+        auto_refresh(auto_refresh_seconds, df.attrs.get("version"))
+
+    facet_idx = facet_index(df, df.attrs.get("version"))
+
+    # Read the current selections first so every facet can show live counts
+    facet_options = {col: facet_idx.options(col) for col in facet_idx.facets}
+    selections = {}
+    for col, options in facet_options.items():
+        key = f"facet_{col}"
+        current = st.session_state.get(key, [])
+        # Matched as text: selections made from the rollups hold every value as a string
+        by_text = {str(option): option for option in options}
+        valid = [by_text[str(value)] for value in current if str(value) in by_text]
+        if valid != current:
+            # Drop values that are not in the newly loaded range
+            st.session_state[key] = valid
+        selections[col] = valid
+
+    facet_counts = facet_idx.counts(selections)
+    for col, options in facet_options.items():
+        counts = facet_counts[col]
+        st.sidebar.multiselect(
+            FACETS[col],
+            options,
+            key=f"facet_{col}",
+            format_func=lambda value, counts=counts: f"{value} ({counts.get(value, 0)})",
+            placeholder="All",
+        )
+
+    # Apply filters
+    with timed("filter") as info:
+        positions = facet_idx.positions(selections)
+        filtered_df = df if positions is None else df.take(positions)
+        info["rows"] = len(filtered_df)
+
+    filter_key = tuple((col, tuple(sorted(map(str, values)))) for col, values in selections.items())
+    summary = chart_data(filtered_df, df.attrs.get("version"), filter_key)
+
+    # Unfiltered long ranges take the key metrics and trend from the daily rollups
+    # rather than summarizing every row; any filter needs the rows themselves
+    overview = summary
+    if rollup_mode and not any(selections.values()):
+        rollup_df = fetch_data(from_date_str, to_date_str, loader=get_rollups)
+        if rollup_df is not None:
+            overview = rollup_chart_data(rollup_df, rollup_df.attrs.get("version"))
+else:
+    with st.spinner("Loading daily rollups..."):
+        rollup_df = fetch_data(from_date_str, to_date_str, loader=get_rollups)
+        if rollup_df is None:
+            st.error("Failed to fetch data from API.")
+            st.stop()
+    summary = overview = rollup_chart_data(rollup_df, rollup_df.attrs.get("version"))
+    if summary["total_tasks"]:
+        st.success(f"Loaded daily totals for {summary['total_tasks']} task activities over {range_days} days.")
     else:
-        st.error("Failed to fetch data from API.")
-        st.stop()
+        st.warning("No task activities found for the selected date range.")
+    rollup_facets(summary)
 
-# Additional filters based on the data we have
-if 'activity_status' in df.columns:
-    status_options = ["All"] + sorted(df['activity_status'].unique().tolist())
-    selected_status = st.sidebar.selectbox("Activity Status", status_options)
-
-if 'project' in df.columns:
-    project_options = ["All"] + sorted(df['project'].unique().tolist())
-    selected_project = st.sidebar.selectbox("Project", project_options)
-
-if 'college' in df.columns:
-    # Ensure all values in 'college' are strings before sorting
-    df['college'] = df['college'].astype(str)
-    college_options = ["All"] + sorted(df['college'].unique().tolist())
-    selected_college = st.sidebar.selectbox("College", college_options)
-
-if 'task_title' in df.columns:
-    task_options = ["All"] + sorted(df['task_title'].unique().tolist())
-    selected_task = st.sidebar.selectbox("Task Type", task_options)
-
-# Apply filters
-filtered_df = df.copy()
-if 'activity_status' in filtered_df.columns and selected_status != "All":
-    filtered_df = filtered_df[filtered_df['activity_status'] == selected_status]
-if 'project' in filtered_df.columns and selected_project != "All":
-    filtered_df = filtered_df[filtered_df['project'] == selected_project]
-if 'college' in filtered_df.columns and selected_college != "All":
-    filtered_df = filtered_df[filtered_df['college'] == selected_college]
-if 'task_title' in filtered_df.columns and selected_task != "All":
-    filtered_df = filtered_df[filtered_df['task_title'] == selected_task]
+dims = summary["dimensions"]
 
-# First row - Key metrics
-st.header("Key Metrics")
-col1, col2, col3, col4 = st.columns(4)
-
-with col1:
-    total_tasks = len(filtered_df)
-    st.metric("Total Tasks", total_tasks)
-
-with col2:
-    if 'activity_status' in filtered_df.columns:
-        completed_tasks = filtered_df[filtered_df['activity_status'] == 'Completed'].shape[0]
-        completion_rate = f"{completed_tasks / total_tasks * 100:.1f}%" if total_tasks > 0 else "0%"
-        st.metric("Completed Tasks", completed_tasks, completion_rate)
-    else:
-        st.metric("Completed Tasks", "N/A")
-
-with col3:
-    if 'time_spent_minutes' in filtered_df.columns:
-        total_time = filtered_df['time_spent_minutes'].sum()
-        hours = int(total_time // 60)
-        minutes = int(total_time % 60)
-        st.metric("Total Time Spent", f"{hours}h {minutes}m")
-    else:
-        st.metric("Total Time Spent", "N/A")
+def top_frame(dims, dim, kind, label, value_label):
+    # Chart-ready frame for a dimension's top-N by count or minutes
+    top = dims[dim]["top_count" if kind == "count" else "top_minutes"]
+    if kind == "count":
+        return pd.DataFrame({label: top.index.astype(str), value_label: top["count"].to_numpy()})
+    frame = pd.DataFrame({label: top.index.astype(str), value_label: top["minutes"].to_numpy()})
+    frame['Hours'] = round(frame[value_label] / 60, 2)
+    return frame
 
-with col4:
-    if 'college' in filtered_df.columns:
-        unique_colleges = filtered_df['college'].nunique()
-        st.metric("Unique Colleges", unique_colleges)
-    else:
-        st.metric("Unique Colleges", "N/A")
 
-# Second row - Task status breakdown
-st.header("Task Status Distribution")
-col1, col2 = st.columns(2)
-
-with col1:
-    if 'activity_status' in filtered_df.columns:
-        status_counts = filtered_df['activity_status'].value_counts().reset_index()
-        status_counts.columns = ['Status', 'Count']
-        
-        fig = px.pie(status_counts, values='Count', names='Status', 
-                    title='Task Status Distribution',
-                    color_discrete_sequence=CUSTOM_COLORS,
-                    hole=0.4)
-        fig.update_layout(height=400)
+# Each section below is a fragment fed only what it draws, so a widget in one
+# section (search box, download, email controls) reruns that section alone.
+# Date and facet changes in the sidebar still rerun the whole page.
+
+# First row - Key metrics
+@section("key_metrics")
+def key_metrics(summary):
+    st.header("Key Metrics")
+    dims = summary["dimensions"]
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        total_tasks = summary["total_tasks"]
+        st.metric("Total Tasks", total_tasks)
+
+    with col2:
+        if 'activity_status' in dims:
+            status_totals = dims['activity_status']["totals"]
+            completed_tasks = int(status_totals["count"].get('Completed', 0))
+            completion_rate = f"{completed_tasks / total_tasks * 100:.1f}%" if total_tasks > 0 else "0%"
+            st.metric("Completed Tasks", completed_tasks, completion_rate)
+        else:
+            st.metric("Completed Tasks", "N/A")
+
+    with col3:
+        if summary["has_minutes"]:
+            total_time = summary["total_minutes"]
+            hours = int(total_time // 60)
+            minutes = int(total_time % 60)
+            st.metric("Total Time Spent", f"{hours}h {minutes}m")
+        else:
+            st.metric("Total Time Spent", "N/A")
+
+    with col4:
+        if 'college' in dims:
+            unique_colleges = len(dims['college']["totals"])
+            st.metric("Unique Colleges", unique_colleges)
+        else:
+            st.metric("Unique Colleges", "N/A")
+
+# Daily trend
+@section("trend")
+def trend_section(summary):
+    daily = summary.get("daily")
+    if daily is None or len(daily) < 2:
+        return
+    st.header("Daily Trend")
+    trend = pd.DataFrame({'Day': daily["day"], 'Tasks': daily["tasks"], 'Hours': round(daily["minutes"] / 60, 2)})
+    col1, col2 = st.columns(2)
+
+    with col1:
+        fig = px.line(trend, x='Day', y='Tasks', title='Tasks per Day', markers=len(trend) <= 62,
+                      color_discrete_sequence=CUSTOM_COLORS)
+        fig.update_layout(height=350)
         st.plotly_chart(fig, use_container_width=True)
-    else:
-        st.info("Activity status data not available")
-
-with col2:
-    if 'time_spent_minutes' in filtered_df.columns and 'activity_status' in filtered_df.columns:
-        time_by_status = filtered_df.groupby('activity_status')['time_spent_minutes'].sum().reset_index()
-        time_by_status.columns = ['Status', 'Minutes']
-        
-        fig = px.bar(time_by_status, x='Status', y='Minutes', 
-                    title='Time Spent by Task Status',
-                    color='Status',
-                    color_discrete_sequence=CUSTOM_COLORS)
-        fig.update_layout(height=400)
+
+    with col2:
+        fig = px.bar(trend, x='Day', y='Hours', title='Hours Logged per Day',
+                     color_discrete_sequence=CUSTOM_COLORS[1:])
+        fig.update_layout(height=350)
         st.plotly_chart(fig, use_container_width=True)
-    else:
-        st.info("Time spent or activity status data not available")
+
+# Second row - Task status breakdown
+@section("status")
+def status_section(summary):
+    st.header("Task Status Distribution")
+    dims = summary["dimensions"]
+    col1, col2 = st.columns(2)
+
+    with col1:
+        if 'activity_status' in dims:
+            status_totals = dims['activity_status']["totals"]
+            status_counts = pd.DataFrame({'Status': status_totals.index.astype(str), 'Count': status_totals["count"].to_numpy()})
+
+            fig = px.pie(status_counts, values='Count', names='Status',
+                        title='Task Status Distribution',
+                        color_discrete_sequence=CUSTOM_COLORS,
+                        hole=0.4)
+            fig.update_layout(height=400)
+            st.plotly_chart(fig, use_container_width=True)
+        else:
+            st.info("Activity status data not available")
+
+    with col2:
+        if summary["has_minutes"] and 'activity_status' in dims:
+            status_totals = dims['activity_status']["totals"]
+            time_by_status = pd.DataFrame({'Status': status_totals.index.astype(str), 'Minutes': status_totals["minutes"].to_numpy()})
+
+            fig = px.bar(time_by_status, x='Status', y='Minutes',
+                        title='Time Spent by Task Status',
+                        color='Status',
+                        color_discrete_sequence=CUSTOM_COLORS)
+            fig.update_layout(height=400)
+            st.plotly_chart(fig, use_container_width=True)
+        else:
+            st.info("Time spent or activity status data not available")
+
+def top_charts(summary, dim, label, count_label, names, height):
+    # Side-by-side "Top 10 by count" and "Top 10 by hours" bars for one dimension
+    dims = summary["dimensions"]
+    col1, col2 = st.columns(2)
+
+    with col1:
+        if dim in dims:
+            counts = top_frame(dims, dim, "count", label, count_label)
+
+            fig = px.bar(counts, x=count_label, y=label,
+                        title=names["count_title"],
+                        color=count_label,
+                        color_continuous_scale=px.colors.sequential.Viridis,
+                        orientation='h')
+            fig.update_layout(height=height, yaxis={'categoryorder':'total ascending'})
+            st.plotly_chart(fig, use_container_width=True)
+        else:
+            st.info(names["missing"])
+
+    with col2:
+        if summary["has_minutes"] and dim in dims:
+            time_by = top_frame(dims, dim, "minutes", label, 'Minutes')
+
+            fig = px.bar(time_by, x='Hours', y=label,
+                        title=names["hours_title"],
+                        color='Hours',
+                        color_continuous_scale=px.colors.sequential.Plasma,
+                        orientation='h')
+            fig.update_layout(height=height, yaxis={'categoryorder':'total ascending'})
+            st.plotly_chart(fig, use_container_width=True)
+        else:
+            st.info(names["missing_time"])
 
 # Third row - College analysis
-st.header("College Activity Analysis")
-col1, col2 = st.columns(2)
-
-with col1:
-    if 'college' in filtered_df.columns:
-        college_task_counts = filtered_df.groupby('college').size().sort_values(ascending=False).head(10).reset_index()
-        college_task_counts.columns = ['College', 'Task Count']
-        
-        fig = px.bar(college_task_counts, x='Task Count', y='College', 
-                    title='Top 10 Colleges by Task Count',
-                    color='Task Count',
-                    color_continuous_scale=px.colors.sequential.Viridis,
-                    orientation='h')
-        fig.update_layout(height=500, yaxis={'categoryorder':'total ascending'})
-        st.plotly_chart(fig, use_container_width=True)
-    else:
-        st.info("College data not available")
-
-with col2:
-    if 'time_spent_minutes' in filtered_df.columns and 'college' in filtered_df.columns:
-        time_by_college = filtered_df.groupby('college')['time_spent_minutes'].sum().sort_values(ascending=False).head(10).reset_index()
-        time_by_college.columns = ['College', 'Minutes']
-        time_by_college['Hours'] = round(time_by_college['Minutes'] / 60, 2)
-        
-        fig = px.bar(time_by_college, x='Hours', y='College', 
-                    title='Top 10 Colleges by Time Spent (Hours)',
-                    color='Hours',
-                    color_continuous_scale=px.colors.sequential.Plasma,
-                    orientation='h')
-        fig.update_layout(height=500, yaxis={'categoryorder':'total ascending'})
-        st.plotly_chart(fig, use_container_width=True)
-    else:
-        st.info("Time spent or college data not available")
+@section("college")
+def college_section(summary):
+    st.header("College Activity Analysis")
+    top_charts(summary, 'college', 'College', 'Task Count', {
+        "count_title": 'Top 10 Colleges by Task Count',
+        "hours_title": 'Top 10 Colleges by Time Spent (Hours)',
+        "missing": "College data not available",
+        "missing_time": "Time spent or college data not available",
+    }, height=500)
 
 # User activity analysis
-st.header("User Activity Analysis")
-col1, col2 = st.columns(2)
-
-with col1:
-    if 'uname' in filtered_df.columns:
-        user_counts = filtered_df.groupby('uname').size().sort_values(ascending=False).head(10).reset_index()
-        user_counts.columns = ['User', 'Task Count']
-        
-        fig = px.bar(user_counts, x='Task Count', y='User', 
-                    title='Top 10 Users by Task Count',
-                    color='Task Count',
-                    color_continuous_scale=px.colors.sequential.Viridis,
-                    orientation='h')
-        fig.update_layout(height=400, yaxis={'categoryorder':'total ascending'})
-        st.plotly_chart(fig, use_container_width=True)
-    else:
-        st.info("User name data not available")
-
-with col2:
-    if 'time_spent_minutes' in filtered_df.columns and 'uname' in filtered_df.columns:
-        time_by_user = filtered_df.groupby('uname')['time_spent_minutes'].sum().sort_values(ascending=False).head(10).reset_index()
-        time_by_user.columns = ['User', 'Minutes']
-        time_by_user['Hours'] = round(time_by_user['Minutes'] / 60, 2)
-        
-        fig = px.bar(time_by_user, x='Hours', y='User', 
-                    title='Top 10 Users by Time Spent (Hours)',
-                    color='Hours',
-                    color_continuous_scale=px.colors.sequential.Plasma,
-                    orientation='h')
-        fig.update_layout(height=400, yaxis={'categoryorder':'total ascending'})
-        st.plotly_chart(fig, use_container_width=True)
-    else:
-        st.info("Time spent or user name data not available")
+@section("user")
+def user_section(summary):
+    st.header("User Activity Analysis")
+    top_charts(summary, 'uname', 'User', 'Task Count', {
+        "count_title": 'Top 10 Users by Task Count',
+        "hours_title": 'Top 10 Users by Time Spent (Hours)',
+        "missing": "User name data not available",
+        "missing_time": "Time spent or user name data not available",
+    }, height=400)
 
 # Task Type analysis
-st.header("Task Type Analysis")
-col1, col2 = st.columns(2)
-
-with col1:
-    if 'task_title' in filtered_df.columns:
-        task_counts = filtered_df['task_title'].value_counts().head(10).reset_index()
-        task_counts.columns = ['Task Type', 'Count']
-        
-        fig = px.bar(task_counts, x='Count', y='Task Type', 
-                    title='Top 10 Task Types',
-                    color='Count',
-                    color_continuous_scale=px.colors.sequential.Viridis,
-                    orientation='h')
-        fig.update_layout(height=500, yaxis={'categoryorder':'total ascending'})
-        st.plotly_chart(fig, use_container_width=True)
-    else:
-        st.info("Task title data not available")
-
-with col2:
-    if 'time_spent_minutes' in filtered_df.columns and 'task_title' in filtered_df.columns:
-        time_by_task = filtered_df.groupby('task_title')['time_spent_minutes'].sum().sort_values(ascending=False).head(10).reset_index()
-        time_by_task.columns = ['Task Type', 'Minutes']
-        time_by_task['Hours'] = round(time_by_task['Minutes'] / 60, 2)
-        
-        fig = px.bar(time_by_task, x='Hours', y='Task Type', 
-                    title='Top 10 Task Types by Time Spent (Hours)',
-                    color='Hours',
-                    color_continuous_scale=px.colors.sequential.Plasma,
-                    orientation='h')
-        fig.update_layout(height=500, yaxis={'categoryorder':'total ascending'})
-        st.plotly_chart(fig, use_container_width=True)
-    else:
-        st.info("Time spent or task title data not available")
+@section("task_type")
+def task_type_section(summary):
+    st.header("Task Type Analysis")
+    top_charts(summary, 'task_title', 'Task Type', 'Count', {
+        "count_title": 'Top 10 Task Types',
+        "hours_title": 'Top 10 Task Types by Time Spent (Hours)',
+        "missing": "Task title data not available",
+        "missing_time": "Time spent or task title data not available",
+    }, height=500)
+
+key_metrics(overview)
+trend_section(overview)
+status_section(summary)
+college_section(summary)
+user_section(summary)
+task_type_section(summary)
 
 
 
@@ -336,8 +473,8 @@ with col2:
 #     project_counts.columns = ['Project', 'Task Count', 'Total Minutes']
 #     project_counts['Hours'] = round(project_counts['Total Minutes'] / 60, 2)
 #     project_counts = project_counts.sort_values('Task Count', ascending=False)
-    
-#     fig = px.scatter(project_counts, x='Task Count', y='Hours', 
+
+#     fig = px.scatter(project_counts, x='Task Count', y='Hours',
 #                      text='Project',
 #                      size='Task Count',
 #                      color='Hours',
@@ -350,105 +487,164 @@ with col2:
 #     st.info("Project data not available")
 
 # Detailed task view
-st.header("Detailed Task View")
-
-# Add a text search box
-search_term = st.text_input("Search tasks by title or remark")
-
-# Filter by search term if provided
-if search_term:
-    search_columns = []
-    for col in ['task_title', 'remark', 'current_task','uname','college','email']:
-        if col in filtered_df.columns:
-            search_columns.append(col)
-    
-    if search_columns:
-        search_filter = filtered_df[search_columns[0]].str.contains(search_term, case=False, na=False)
-        for col in search_columns[1:]:
-            search_filter = search_filter | filtered_df[col].str.contains(search_term, case=False, na=False)
-        searched_df = filtered_df[search_filter]
-    else:
-        searched_df = filtered_df
-else:
-    searched_df = filtered_df
-
-# Show data table with the most relevant columns
-if not searched_df.empty:
+@st.cache_resource(max_entries=4)
+def search_index(_df, dataset_version):
+    # Trigram index over the whole dataset, built once per load
+    with timed("search_index") as info:
+        info["rows"] = len(_df)
+        return SearchIndex(_df)
+
+def searched_rows(df, positions, filtered_df, search_term):
+    # Facet-filtered rows narrowed by the search box
+    if not search_term.strip():
+        return filtered_df
+    index = search_index(df, df.attrs.get("version"))
+    with timed("search") as info:
+        matches = index.search(search_term)
+        rows = df[matches] if positions is None else df.take(positions[matches[positions]])
+        info["rows"] = len(rows)
+    return rows
+
+def export_request():
+    # Current search shared with the download button. The button's data is built
+    # on click, off the script thread and possibly after only the detailed view
+    # reran, so it reads the term from this dict rather than from its closure.
+    return st.session_state.setdefault("export_request", {"search_term": ""})
+
+def display_frame(searched_df):
     # Select relevant columns for display
-    display_cols = []
-    for col in ['id','email', 'task_title', 'activity_status', 'remark', 'current_task', 'time_spent', 'created_date', 'college', 'uname']:
-        if col in searched_df.columns:
-            display_cols.append(col)
-    
-    if display_cols:
-        st.dataframe(searched_df[display_cols], use_container_width=True)
-    else:
-        st.dataframe(searched_df, use_container_width=True)
+    return detail_frame(searched_df)
+
+# Free-text columns shown shortened in the table until their row is selected
+LONG_TEXT_COLUMNS = ['task_title', 'remark', 'current_task']
+
+@st.cache_resource(max_entries=16)
+def table_order(_table, dataset_version, filters, search_term, sort_col, ascending):
+    # Sorted row order for the current rows, reused while paging through them
+    return sort_order(_table, sort_col, ascending)
+
+def search_box():
+    # Add a text search box
+    return st.text_input(
+        "Search tasks by title or remark",
+        key="search_term",
+        help="Matches title, remark, current task, user, college and email. "
+             "Prefix a term with a field to narrow it, e.g. college:sinhgad or uname:\"megha k\".",
+    )
+
+def tasks_on_demand():
+    # Long ranges without filters: not a fragment, so a search or the button
+    # reruns the whole page, which then loads the rows
+    st.header("Detailed Task View")
+    st.caption(f"Ranges longer than {ROLLUP_MIN_DAYS} days are drawn from daily totals. "
+               "Individual tasks are loaded when you filter, search or ask for them.")
+    search_box()
+    st.button("📋 Load individual tasks", on_click=request_rows)
+
+@section("detailed_view")
+def detailed_view(df, positions, filtered_df, filter_key):
+    st.header("Detailed Task View")
+
+    search_term = search_box()
+
+    export_request()["search_term"] = search_term
+
+    searched_df = searched_rows(df, positions, filtered_df, search_term)
+    if searched_df.empty:
+        st.info("No tasks match your search criteria.")
+        return
+
+    # Show data table with the most relevant columns, one page at a time:
+    # only the visible rows are sorted into place and sent to the browser
+    table = display_frame(searched_df)
+    columns = list(table.columns)
+    col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
+    with col1:
+        sort_col = st.selectbox("Sort by", columns, key="table_sort",
+                                index=columns.index('created_date') if 'created_date' in columns else 0)
+    with col2:
+        ascending = st.selectbox("Order", ["Descending", "Ascending"], key="table_order") == "Ascending"
+    with col3:
+        page_size = st.selectbox("Rows per page", PAGE_SIZES, index=1, key="table_page_size")
+
+    pages = page_count(len(table), page_size)
+    if st.session_state.get("table_page", 1) > pages:
+        # Fewer rows than before (new search, filters or page size)
+        st.session_state["table_page"] = pages
+    with col4:
+        page = st.number_input("Page", min_value=1, max_value=pages, step=1, key="table_page")
+
+    order = table_order(table, df.attrs.get("version"), filter_key, search_term.strip(), sort_col, ascending)
+    start, stop = page_bounds(len(table), page_size, page)
+    page_df = table.take(order[start:stop])
+
+    event = st.dataframe(
+        truncate(page_df, LONG_TEXT_COLUMNS),
+        use_container_width=True,
+        on_select="rerun",
+        selection_mode="single-row",
+        key="table_rows",
+    )
+    st.caption(f"Showing {start + 1:,}–{stop:,} of {len(table):,} tasks (page {page} of {pages}). "
+               "Select a row to see its full text.")
+
+    # Expanded row: every column, untruncated
+    selected = [i for i in event.selection.rows if i < len(page_df)]
+    if selected:
+        row = page_df.iloc[selected[0]]
+        with st.expander(f"Task {row.get('id', row.name)}", expanded=True):
+            for col, value in row.items():
+                st.markdown(f"**{col}:** {value}")
+
+if load_rows:
+    detailed_view(df, positions, filtered_df, filter_key)
 else:
-    st.info("No tasks match your search criteria.")
+    tasks_on_demand()
 
 # Download option
-st.header("Download Data")
-st.markdown("Download the filtered data as a CSV file")
-
-@st.cache_data
-def convert_df_to_csv(df):
-    return df.to_csv(index=False).encode('utf-8')
-
-csv = convert_df_to_csv(filtered_df)
-st.download_button(
-    label="Download data as CSV",
-    data=csv,
-    file_name=f"task_activities_{from_date_str}_to_{to_date_str}.csv",
-    mime="text/csv",
-)
+EXPORT_LABELS = {"csv": "CSV", "csv.gz": "CSV (gzip)", "parquet": "Parquet"}
+
+# Above this many rows CSV (gzip) or Parquet is suggested
+LARGE_EXPORT_ROWS = 100_000
+
+@section("download")
+def download_section(load, row_count, filter_key, from_date_str, to_date_str):
+    st.header("Download Data")
+    st.markdown("Download the filtered data, narrowed by the current search, as a file")
+
+    fmt = st.radio("Format", list(EXPORT_FORMATS), format_func=EXPORT_LABELS.get,
+                   horizontal=True, key="export_format")
+    if fmt == "csv" and row_count > LARGE_EXPORT_ROWS:
+        st.caption("Large selection: CSV (gzip) or Parquet downloads are several times smaller.")
+    suffix, mime = EXPORT_FORMATS[fmt]
+    request = export_request()
+
+    def build():
+        # Runs only when the button is clicked; repeated clicks reuse the file.
+        # load() gives (df, positions, filtered_df), reading the rows if needed
+        df, positions, filtered_df = load()
+        search_term = request["search_term"]
+        rows = searched_rows(df, positions, filtered_df, search_term)
+        path = export_file(rows, export_signature(df.attrs.get("version"), filter_key, search_term.strip()), fmt)
+        with open(path, "rb") as f:
+            return f.read()
+
+    st.download_button(
+        label=f"Download data as {EXPORT_LABELS[fmt]}",
+        data=build,
+        file_name=f"task_activities_{from_date_str}_to_{to_date_str}{suffix}",
+        mime=mime,
+    )
+
+if load_rows:
+    download_section(lambda: (df, positions, filtered_df), len(filtered_df), filter_key, from_date_str, to_date_str)
+else:
+    download_section(all_rows, summary["total_tasks"], (), from_date_str, to_date_str)
 
 # Footer
 st.markdown("---")
 st.markdown("Task Activity Dashboard | Created with Streamlit | Data source: StartupWorld API")
 
-def fetch_data(from_date, to_date):
-    return [
-        {"task": "Task A", "activity_status": "Completed", "time_spent_minutes": 90},
-        {"task": "Task B", "activity_status": "Pending", "time_spent_minutes": 45},
-    ]
-
-def process_data(data):
-    return pd.DataFrame(data)
-
-# 1️⃣ Dummy fetch/process placeholders
-def fetch_data(from_date, to_date):
-    return [
-        {"task": "Task A", "activity_status": "Completed", "time_spent_minutes": 90},
-        {"task": "Task B", "activity_status": "Pending", "time_spent_minutes": 45},
-    ]
-
-def process_data(data):
-    return pd.DataFrame(data)
-
-# 2️⃣ Generate and send report
-def generate_email_report(recipients, detailed_df, date_for_report):
-    csv_path = f"detailed_task_view_{date_for_report}.csv"
-    detailed_df.to_csv(csv_path, index=False)
-    subject = f"Startup World Report — {date_for_report}"
-    total = len(detailed_df)
-    done = detailed_df[detailed_df['activity_status'] == 'Completed'].shape[0] if 'activity_status' in detailed_df.columns else 0
-    hours = round(detailed_df['time_spent'].apply(lambda x: convert_time_to_minutes(x) if pd.notnull(x) else 0).sum() / 60, 2) if 'time_spent' in detailed_df.columns else 0
-
-    html_body = f"""
-    <h2>📊 Detailed Task View</h2>
-    <ul>
-      <li><b>Total Tasks:</b> {total}</li>
-      <li><b>Completed Tasks:</b> {done}</li>
-      <li><b>Total Time Spent:</b> {hours} hours</li>
-    </ul>
-    """
-
-    plain_body = f"Detailed Task View Report for {date_for_report}\nTotal Tasks: {total}\nCompleted Tasks: {done}\nTotal Time Spent: {hours} hours"
-    send_summary_email(recipients, subject, plain_body, html_body, csv_path)
-    print("✅ Detailed Task View report email sent!")
-
-
 # 3️⃣ Config helpers
 def save_email_time(time_obj):
     os.makedirs("config", exist_ok=True)
@@ -472,91 +668,128 @@ def validate_emails(input_str):
     valid_email_pattern = r"[^@]+@[^@]+\.[^@]+"
     return [e for e in emails if re.match(valid_email_pattern, e)][:10]
 
-# 4️⃣ Streamlit UI
-st.sidebar.markdown("### 📬 Email Schedule")
-
 # --- Persistent Recipients Management ---
-import json
 RECIPIENTS_PATH = "config/recipients.json"
-os.makedirs("config", exist_ok=True)
-
-# Load recipients from file
-if os.path.exists(RECIPIENTS_PATH):
-    with open(RECIPIENTS_PATH, "r") as f:
-        try:
-            recipients_list = json.load(f)
-        except Exception:
-            recipients_list = []
-else:
-    recipients_list = []
 
-recipients_str = ", ".join(recipients_list)
-email_input = st.sidebar.text_area(
-    "Edit recipient emails (comma separated, max 10):",
-    value=recipients_str,
-    placeholder="example1@gmail.com, example2@gmail.com"
-)
+def load_recipients():
+    # Load recipients from file
+    if os.path.exists(RECIPIENTS_PATH):
+        with open(RECIPIENTS_PATH, "r") as f:
+            try:
+                return json.load(f)
+            except Exception:
+                return []
+    return []
 
-if st.sidebar.button("💾 Save Recipients"):
-    updated_recipients = validate_emails(email_input)
-    with open(RECIPIENTS_PATH, "w") as f:
-        json.dump(updated_recipients, f)
-    st.sidebar.success("Recipients saved!")
-    recipients_list = updated_recipients
+# 4️⃣ Streamlit UI
+@section("email_settings")
+def email_settings():
+    st.markdown("### 📬 Email Schedule")
+    os.makedirs("config", exist_ok=True)
 
-valid_recipients = recipients_list
+    recipients_str = ", ".join(load_recipients())
+    email_input = st.text_area(
+        "Edit recipient emails (comma separated, max 10):",
+        value=recipients_str,
+        placeholder="example1@gmail.com, example2@gmail.com"
+    )
 
-# Time picker
-from datetime import datetime, timedelta
-email_time = st.sidebar.time_input(
-    "Select time to send daily report",
-    value=datetime.strptime("18:00", "%H:%M").time(),
-    step=timedelta(minutes=1)
-)
+    if st.button("💾 Save Recipients"):
+        updated_recipients = validate_emails(email_input)
+        with open(RECIPIENTS_PATH, "w") as f:
+            json.dump(updated_recipients, f)
+        st.success("Recipients saved!")
 
-if st.sidebar.button("💾 Save Email Time"):
-    save_email_time(email_time)
-    st.sidebar.success(f"Email time saved: {email_time.strftime('%H:%M')}")
+    # Time picker
+    email_time = st.time_input(
+        "Select time to send daily report",
+        value=datetime.strptime("18:00", "%H:%M").time(),
+        step=timedelta(minutes=1)
+    )
 
-st.sidebar.markdown(f"⏱️ **Current Scheduled Time:** {get_saved_time_str()}")
+    if st.button("💾 Save Email Time"):
+        save_email_time(email_time)
+        st.success(f"Email time saved: {email_time.strftime('%H:%M')}")
 
-# 📤 Manual Send
-if st.button("📤 Send Email Now"):
-    if valid_recipients:
-        date_for_report = to_date_str
-        if 'display_cols' in locals() and display_cols:
-            detailed_df = searched_df[display_cols]
-        else:
-            detailed_df = searched_df
-        generate_email_report(valid_recipients, detailed_df, date_for_report)
-        st.success("✅ Email sent immediately!")
-    else:
-        st.error("⚠️ Please enter valid email addresses.")
+    st.markdown(f"⏱️ **Current Scheduled Time:** {get_saved_time_str()}")
 
-# 🕒 Auto Scheduler
-scheduler = BackgroundScheduler()
+with st.sidebar:
+    email_settings()
 
-def schedule_email():
-    if valid_recipients:
-        # Use the same date range and filtering as the dashboard (today's data)
-        from_date_str = from_date.strftime("%Y-%m-%d")
-        to_date_str = to_date.strftime("%Y-%m-%d")
+# 🕒 Auto Scheduler
+def start_scheduled_job(valid_recipients, selections, search_term, from_date, to_date):
+    # Save the current view as a report definition; the job only holds its id,
+    # runs in the deployment-wide scheduler and re-reads fresh data each day
+    hour, minute = load_email_time()
+    definition = {
+        "id": "dashboard",
+        "name": "Dashboard view",
+        "range_days": (to_date - from_date).days,
+        "filters": {col: [value.item() if hasattr(value, "item") else value for value in values]
+                    for col, values in selections.items() if values},
+        "search": search_term,
+        "recipients": valid_recipients,
+        "hour": hour,
+        "minute": minute,
+    }
+    save_report(definition)
+    sync_reports()
+    st.success(f"✅ Email will now be sent daily at {hour:02d}:{minute:02d}")
 
-        # Use the same DataFrame and columns as the dashboard CSV download
-        if 'display_cols' in locals() and display_cols:
-            detailed_df = searched_df[display_cols]
+@section("email_actions")
+def email_actions(load, selections, from_date, to_date):
+    # The report uses the Detailed Task View rows, including the current search;
+    # load() gives (df, positions, filtered_df), reading the rows if needed
+    def detailed_df():
+        df, positions, filtered_df = load()
+        searched_df = searched_rows(df, positions, filtered_df, st.session_state.get("search_term", ""))
+        return display_frame(searched_df)
+
+    # 📤 Manual Send
+    if st.button("📤 Send Email Now"):
+        valid_recipients = load_recipients()
+        if valid_recipients:
+            try:
+                report_df = detailed_df()
+            except Exception as e:
+                st.error(f"⚠️ Could not load tasks for the report: {e}")
+                return
+            send_detailed_report(valid_recipients, report_df, to_date.strftime("%Y-%m-%d"))
+            st.success("📬 Email queued for delivery!" if OUTBOX_ENABLED else "✅ Email sent immediately!")
         else:
-            detailed_df = searched_df
-        date_for_report = to_date_str
-        generate_email_report(valid_recipients, detailed_df, date_for_report)
-    else:
-        print("⚠️ No valid recipients to send email to.")
+            st.error("⚠️ Please enter valid email addresses.")
 
-def start_scheduled_job():
-    hour, minute = load_email_time()
-    scheduler.add_job(schedule_email, "cron", hour=hour, minute=minute, id="daily_email", replace_existing=True)
-    scheduler.start()
-    st.success(f"✅ Email will now be sent daily at {hour:02d}:{minute:02d}")
+    if st.button("🕒 Start Scheduled Email"):
+        valid_recipients = load_recipients()
+        if valid_recipients:
+            start_scheduled_job(valid_recipients, selections, st.session_state.get("search_term", ""), from_date, to_date)
+        else:
+            st.error("⚠️ Please enter valid email addresses.")
 
-if st.button("🕒 Start Scheduled Email"):
-    start_scheduled_job()
\ No newline at end of file
+if load_rows:
+    email_actions(lambda: (df, positions, filtered_df), selections, from_date, to_date)
+else:
+    email_actions(all_rows, {}, from_date, to_date)
+
+record_timing("full_page", time.perf_counter() - run_started)
+
+def debug_panel():
+    st.header("⏱ Performance")
+    st.subheader("This session")
+    timings = st.session_state.get("rerun_timings", {})
+    st.dataframe(pd.DataFrame([
+        {"section": name, "runs": len(history), "last (s)": history[-1],
+         "avg (s)": sum(history) / len(history), "max (s)": max(history)}
+        for name, history in timings.items()
+    ]), use_container_width=True, hide_index=True)
+
+    st.subheader("This process")
+    st.caption("Stage timings, rows, bytes, cache lookups and SMTP latency since the server started.")
+    rows = snapshot()
+    for row in rows:
+        row["labels"] = ", ".join(f"{k}={v}" for k, v in row["labels"].items())
+    st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+
+# Optional: drawn last so it includes this run's full page time
+if st.sidebar.toggle("⏱ Performance panel", key="debug_panel"):
+    debug_panel()
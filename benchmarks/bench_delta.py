@@ -0,0 +1,76 @@
+"""Refresh cost of a running day: full refetch against the watermark delta sync.
+
+A yesterday→today range is loaded through the dataset cache, then the
+stand-in API adds and updates a few of today's records. The refresh that
+picks them up is timed three ways: refetching today whole (what a stale
+cache entry did before), a delta sync filtered on this side, and a delta
+sync with the API filtering by the watermark. Each result is checked
+against the full refetch.
+
+Run from the repository root:
+    python -m benchmarks.bench_delta [rows_per_day ...] [--new 50] [--updated 20]
+"""
+import argparse
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks import fake_api  # noqa: E402
+from benchmarks.timing import timed  # noqa: E402
+
+
+def by_id(df):
+    return df.sort_values("id", ignore_index=True).astype(
+        {col: object for col in df.columns if df[col].dtype == "category"})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("rows", nargs="*", type=int, default=[20_000, 100_000])
+    parser.add_argument("--new", type=int, default=50, help="records added to today")
+    parser.add_argument("--updated", type=int, default=20, help="records of today updated")
+    args = parser.parse_args()
+
+    api = fake_api.start()
+    os.environ.update({"API_BASE_URL": api.url, "METRICS_LOG": "off"})
+    os.chdir(tempfile.mkdtemp(prefix="bench_delta_"))
+
+    import pandas as pd
+    import dataset_cache
+    import task_store
+    from dataset_cache import get_dataset, range_key, store, sync_dataset
+
+    today = datetime.now().strftime("%Y-%m-%d")
+    yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+    for rows in args.rows:
+        print(f"\nrows per day: {rows:,}  (+{args.new} new, {args.updated} updated today)")
+        for mode in ("full", "delta", "delta_api"):
+            api.rows_per_day = rows
+            api.edit_day(today)
+            for path in (task_store.STORE_DIR, dataset_cache.CACHE_DIR):
+                for name in os.listdir(path) if os.path.isdir(path) else []:
+                    os.remove(os.path.join(path, name))
+            dataset_cache._memo.clear()
+            task_store.API_DELTA_PARAM = fake_api.DELTA_PARAM if mode == "delta_api" else ""
+            get_dataset(yesterday, today)
+            api.edit_day(today, args.new, args.updated)
+            # Bodies are generated outside the timing
+            mark = task_store.watermark(pd.read_parquet(task_store.partition_path(today)))
+            api.body(today, today, mark[1] if mode == "delta_api" else None)
+
+            if mode == "full":
+                def refresh():
+                    task_store.refresh_days([today])
+                    df = task_store.read_partitions(yesterday, today)
+                    store(range_key(yesterday, today), df)
+                    return df
+                reference, _ = timed("full refetch of today", refresh)
+            else:
+                df, _ = timed(f"delta sync ({'API' if mode == 'delta_api' else 'local'} filter)",
+                              lambda: sync_dataset(yesterday, today))
+                pd.testing.assert_frame_equal(by_id(df), by_id(reference), check_like=True)
+    print("\n✅ Delta results match the full refetch")
@@ -0,0 +1,45 @@
+"""Compare the vectorized time_spent/date parsers with the old per-row path.
+
+Run from the repository root:
+    python -m benchmarks.bench_parsing [rows]
+"""
+import sys
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.timing import timed
+from processing import convert_time_to_minutes, parse_dates, parse_durations
+
+
+def make_frame(rows, seed=0):
+    """Durations and timestamps with the repetition seen in real payloads."""
+    rng = np.random.default_rng(seed)
+    durations = np.array([f"{h}:{m:02d}" for h in range(9) for m in range(0, 60, 5)] + ["", "bad", "1:30:15"])
+    base = pd.Timestamp("2024-01-01")
+    stamps = (base + pd.to_timedelta(rng.integers(0, 90 * 24 * 3600, 20_000), unit="s")).strftime("%Y-%m-%d %H:%M:%S")
+    stamps = np.append(stamps.to_numpy(), "0000-00-00 00:00:00")
+    return pd.DataFrame({
+        "time_spent": durations[rng.integers(0, len(durations), rows)],
+        "created_date": stamps[rng.integers(0, len(stamps), rows)],
+    })
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    df = make_frame(rows)
+    print(f"rows: {rows:,}")
+
+    old_minutes, old_t = timed("time_spent .apply (old)", lambda: df["time_spent"].apply(
+        lambda x: convert_time_to_minutes(x) if pd.notnull(x) else 0))
+    new_minutes, new_t = timed("time_spent parse_durations", lambda: parse_durations(df["time_spent"]))
+    print(f"{'speedup':<40} {old_t / new_t:8.1f}x")
+
+    _, old_d = timed("created_date to_datetime (old, inferred)", lambda: pd.to_datetime(
+        df["created_date"], errors="coerce"))
+    _, new_d = timed("created_date parse_dates", lambda: parse_dates(df["created_date"]))
+    print(f"{'speedup':<40} {old_d / new_d:8.1f}x")
+
+    # The old path only understood H:MM, so compare on those rows
+    two_part = df["time_spent"].str.count(":") == 1
+    assert (old_minutes[two_part] == new_minutes[two_part]).all()
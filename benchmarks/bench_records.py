@@ -0,0 +1,65 @@
+"""Compare record-to-frame conversion on the ingestion path the app uses.
+
+Each size is serialized like an API response, then streamed the way
+task_store.refresh_days ingests a day: chunks are decoded incrementally
+into STREAM_BATCH_SIZE batches and the batches are processed one at a time
+(process_batches). Each batch is converted the old way (json_normalize,
+then the same dtype, date and duration passes) and with the columnar
+converter. The results are checked to match.
+
+Run from the repository root:
+    python -m benchmarks.bench_records [rows ...]
+"""
+import argparse
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pandas as pd  # noqa: E402
+
+from benchmarks.synthetic import make_payload  # noqa: E402
+from benchmarks.timing import timed  # noqa: E402
+from fetch_data import STREAM_BATCH_SIZE, STREAM_CHUNK_BYTES  # noqa: E402
+from json_stream import iter_batches, iter_items  # noqa: E402
+from processing import (apply_schema, concat_frames, parse_dates, parse_durations,  # noqa: E402
+                        process_batches)
+
+
+def json_normalize_records(records):
+    """process_records as it was before the columnar converter."""
+    df = apply_schema(pd.json_normalize(records))
+    for col in ["created_date", "updated_date"]:
+        if col in df.columns:
+            df[col] = parse_dates(df[col])
+    if "time_spent" in df.columns:
+        df["time_spent_minutes"] = parse_durations(df["time_spent"])
+    return df
+
+
+def batches(body):
+    """Record batches of a response body, decoded as stream_window decodes them."""
+    chunks = (body[i:i + STREAM_CHUNK_BYTES] for i in range(0, len(body), STREAM_CHUNK_BYTES))
+    return iter_batches(iter_items(chunks, key="data"), STREAM_BATCH_SIZE)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("rows", nargs="*", type=int, default=[100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"batch size: {STREAM_BATCH_SIZE:,}")
+    for rows in args.rows:
+        body = json.dumps(make_payload(rows, "2024-01-01", days=7)).encode()
+        print(f"\nrows: {rows:,}  ({len(body) / 1024 / 1024:.0f} MB)")
+        _, decode_t = timed("decode only", lambda: sum(len(batch) for batch in batches(body)))
+        old, old_t = timed("decode + json_normalize batches",
+                           lambda: concat_frames([json_normalize_records(batch) for batch in batches(body)]))
+        new, new_t = timed("decode + process_batches", lambda: process_batches(batches(body)))
+        print(f"{'conversion speedup (excl. decode)':<34} {(old_t - decode_t) / (new_t - decode_t):8.1f}x")
+        print(f"{'end-to-end speedup':<34} {old_t / new_t:8.1f}x")
+
+        pd.testing.assert_frame_equal(old, new)
+        del body, old, new
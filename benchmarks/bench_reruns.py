@@ -0,0 +1,67 @@
+"""Time dashboard reruns per interaction type.
+
+Each interaction is replayed with Streamlit's AppTest, which always executes
+the whole script, so its wall time is what every interaction cost before the
+page was split into fragments. The app also records how long each section
+took; for widgets inside a fragment that section time is what the
+interaction costs now, since only the fragment reruns.
+
+Run from the repository root (pass an older copy of app.py to compare):
+    python -m benchmarks.bench_reruns [rows] [--app path/to/app.py]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, time as clock_time, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("METRICS_LOG", "off")
+
+from benchmarks.synthetic import make_records  # noqa: E402
+from dataset_cache import range_key, store  # noqa: E402
+from processing import process_records  # noqa: E402
+
+
+def interact(at, label, action, section):
+    start = time.perf_counter()
+    action(at).run()
+    elapsed = time.perf_counter() - start
+    if at.exception:
+        raise RuntimeError(f"{label}: {at.exception[0].value}")
+    timings = at.session_state["rerun_timings"] if "rerun_timings" in at.session_state else {}
+    fragment = f"{timings[section][-1]:8.3f}s" if section in timings else "       -"
+    print(f"{label:<28} {elapsed:8.3f}s {fragment}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    app_path = os.path.join(ROOT, "app.py")
+    if "--app" in args:
+        i = args.index("--app")
+        app_path = os.path.abspath(args[i + 1])
+        del args[i:i + 2]
+    rows = int(args[0]) if args else 200_000
+
+    from streamlit.testing.v1 import AppTest
+
+    # Seed the dataset cache with the range the dashboard opens on, in a
+    # scratch directory so nothing is fetched and no config is touched
+    os.chdir(tempfile.mkdtemp(prefix="bench_reruns_"))
+    today = datetime.now().date()
+    yesterday = today - timedelta(days=1)
+    df = process_records(make_records(rows, today.strftime("%Y-%m-%d")))
+    store(range_key(yesterday.strftime("%Y-%m-%d"), today.strftime("%Y-%m-%d")), df)
+
+    at = AppTest.from_file(app_path, default_timeout=600)
+    print(f"rows: {rows:,}  app: {app_path}")
+    print(f"{'interaction':<28} {'page':>9} {'fragment':>9}")
+    interact(at, "first load", lambda at: at, "full_page")
+    interact(at, "facet filter", lambda at: at.sidebar.multiselect[0].select("Completed"), "full_page")
+    interact(at, "search box (builds index)", lambda at: at.text_input[0].input("poster review"), "detailed_view")
+    interact(at, "search box", lambda at: at.text_input[0].input("review"), "detailed_view")
+    interact(at, "table sort", lambda at: at.selectbox(key="table_sort").set_value("remark"), "detailed_view")
+    interact(at, "table page", lambda at: at.number_input(key="table_page").set_value(3), "detailed_view")
+    interact(at, "save recipients", lambda at: at.sidebar.text_area[0].input("a@example.com"), "email_settings")
+    interact(at, "email time", lambda at: at.sidebar.time_input[0].set_value(clock_time(7, 30)), "email_settings")
@@ -0,0 +1,228 @@
+"""Throughput, latency and peak memory of the data path at several sizes.
+
+Records come from the local API stand-in (benchmarks.fake_api) and report
+emails go to the local SMTP sink (benchmarks.smtp_sink), so nothing leaves
+the machine. load_range is timed against an empty partition store, the
+way the app and scheduler ingest a range: streamed, processed in batches,
+written as partitions and read back. process_batches times the processing
+part alone, on batches fetched beforehand. Every stage is timed once, then run again under tracemalloc
+for its peak Python/NumPy allocation (Arrow buffers are not traced).
+
+Save a run with --save and compare a later one with --baseline; stages
+slower than the baseline by more than --threshold are flagged and the
+exit status is 1.
+
+Run from the repository root:
+    python -m benchmarks.bench_suite [rows ...] [--days 7] [--api-latency 0.05]
+        [--smtp-latency 0] [--no-memory] [--save out.json] [--baseline out.json]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks import fake_api, smtp_sink  # noqa: E402
+
+FROM_DATE = "2024-01-01"
+SEARCH_QUERY = "poster review"
+RECIPIENTS = ["bench@example.com"]
+
+
+def stage_load_range(ctx):
+    # Cold: every day is fetched and processed again
+    for path in (ctx["STORE_DIR"], ctx["ROLLUP_DIR"]):
+        shutil.rmtree(path, ignore_errors=True)
+    ctx["df"] = ctx["load_range"](ctx["from_date"], ctx["to_date"])
+
+
+def stage_process_batches(ctx):
+    ctx["processed"] = ctx["process_batches"](iter(ctx["batches"]))
+
+
+def stage_facet_index(ctx):
+    ctx["facets"] = ctx["FacetIndex"](ctx["df"])
+
+
+def stage_filter(ctx):
+    facets = ctx["facets"]
+    selections = {col: facets.options(col)[:1] for col in ("activity_status", "college") if col in facets.facets}
+    positions = facets.positions(selections)
+    ctx["filtered"] = ctx["df"] if positions is None else ctx["df"].take(positions)
+
+
+def stage_search_index(ctx):
+    ctx["search"] = ctx["SearchIndex"](ctx["df"])
+
+
+def stage_search(ctx):
+    ctx["matches"] = int(ctx["search"].search(SEARCH_QUERY).sum())
+
+
+def stage_aggregations(ctx):
+    ctx["summary"] = ctx["summarize"](ctx["df"])
+
+
+def stage_csv_export(ctx):
+    ctx["write_csv"](ctx["detail_frame"](ctx["df"]), "export.csv")
+
+
+def stage_email_report(ctx):
+    ctx["generate_email_report"](RECIPIENTS)
+
+
+# name -> stage; each reads what earlier stages left in ctx
+STAGES = {
+    "load_range": stage_load_range,
+    "process_batches": stage_process_batches,
+    "facet_index": stage_facet_index,
+    "filter": stage_filter,
+    "search_index": stage_search_index,
+    "search": stage_search,
+    "aggregations": stage_aggregations,
+    "csv_export": stage_csv_export,
+    "email_report": stage_email_report,
+}
+
+
+def run_stage(fn, ctx, memory=True):
+    """(seconds, peak MB or None) of one stage, with its log output silenced."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        fn(ctx)
+        seconds = time.perf_counter() - start
+        peak = None
+        if memory:
+            tracemalloc.start()
+            try:
+                fn(ctx)
+                peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+            finally:
+                tracemalloc.stop()
+    return seconds, peak
+
+
+def run_size(rows, days, api, ctx, memory=True):
+    api.rows_per_day = -(-rows // days)
+    start = datetime.strptime(FROM_DATE, "%Y-%m-%d")
+    ctx["from_date"] = FROM_DATE
+    ctx["to_date"] = (start + timedelta(days=days - 1)).strftime("%Y-%m-%d")
+
+    # Untimed: the stand-in generates each day's body once, and the batches
+    # process_batches is timed on are fetched up front
+    with contextlib.redirect_stdout(io.StringIO()):
+        ctx["batches"] = [batch for day in ctx["days_in_range"](ctx["from_date"], ctx["to_date"])
+                          for batch in ctx["stream_window"](day, day)]
+
+    results = {}
+    for name, fn in STAGES.items():
+        if name == "email_report":
+            # generate_email_report reads the file fetch_task_data writes
+            os.makedirs("data", exist_ok=True)
+            ctx["write_records_json"](ctx["df"], os.path.join("data", "task_data.json"))
+        seconds, peak = run_stage(fn, ctx, memory)
+        results[name] = {"rows": len(ctx["df"]), "seconds": seconds, "peak_mb": peak}
+    return results
+
+
+def print_results(rows, results, baseline=None, threshold=0.2):
+    """Print one size's table; returns the stages that regressed against baseline."""
+    regressions = []
+    print(f"\nrows: {rows:,}")
+    print(f"{'stage':<16} {'seconds':>9} {'rows/s':>12} {'peak MB':>9} {'vs base':>9}")
+    for name, result in results.items():
+        rate = result["rows"] / result["seconds"] if result["seconds"] else float("inf")
+        peak = f"{result['peak_mb']:9.1f}" if result["peak_mb"] is not None else f"{'-':>9}"
+        change = ""
+        base = (baseline or {}).get(str(rows), {}).get(name)
+        if base:
+            ratio = result["seconds"] / base["seconds"] - 1
+            change = f"{ratio:+8.0%}"
+            if ratio > threshold:
+                change += " ⚠️"
+                regressions.append((rows, name))
+        print(f"{name:<16} {result['seconds']:9.3f} {rate:12,.0f} {peak} {change:>9}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("rows", nargs="*", type=int, default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--days", type=int, default=7, help="days the rows are spread over (one request each)")
+    parser.add_argument("--api-latency", type=float, default=0.05, help="seconds added to every API request")
+    parser.add_argument("--smtp-latency", type=float, default=0.0, help="seconds the sink spends per message")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--save", help="write results as JSON")
+    parser.add_argument("--baseline", help="compare against results saved with --save")
+    parser.add_argument("--threshold", type=float, default=0.2, help="slowdown flagged as a regression")
+    args = parser.parse_args()
+
+    api = fake_api.start(latency=args.api_latency)
+    sink = smtp_sink.start(latency=args.smtp_latency)
+
+    # Configured before the app modules read their settings at import time
+    os.environ.update({
+        "API_BASE_URL": api.url,
+        "SMTP_HOST": "127.0.0.1",
+        "SMTP_PORT": str(sink.server_address[1]),
+        "SMTP_SECURITY": "none",
+        "EMAIL_ADDRESS": "",
+        "EMAIL_PASSWORD": "",
+        "METRICS_LOG": "off",
+        # Send inline so email_report keeps measuring delivery, not just queueing
+        "OUTBOX_ENABLED": "0",
+    })
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    save_path = os.path.abspath(args.save) if args.save else None
+
+    # Scratch directory, so the email report's files land nowhere near the repo
+    os.chdir(tempfile.mkdtemp(prefix="bench_suite_"))
+
+    from exports import write_csv
+    from facets import FacetIndex
+    from fetch_data import stream_window
+    from mailer import generate_email_report
+    from aggregations import summarize
+    from processing import process_batches
+    from reports import detail_frame
+    from rollups import ROLLUP_DIR
+    from search_index import SearchIndex
+    from task_store import STORE_DIR, days_in_range, load_range, write_records_json
+
+    ctx = {
+        "load_range": load_range, "process_batches": process_batches, "stream_window": stream_window,
+        "days_in_range": days_in_range, "STORE_DIR": STORE_DIR, "ROLLUP_DIR": ROLLUP_DIR,
+        "FacetIndex": FacetIndex, "SearchIndex": SearchIndex, "summarize": summarize, "write_csv": write_csv,
+        "detail_frame": detail_frame, "generate_email_report": generate_email_report,
+        "write_records_json": write_records_json,
+    }
+
+    print(f"API latency {args.api_latency}s over {args.days} day(s), SMTP latency {args.smtp_latency}s")
+    all_results, regressions = {}, []
+    for rows in args.rows:
+        results = run_size(rows, args.days, api, ctx, memory=not args.no_memory)
+        all_results[str(rows)] = results
+        regressions += print_results(rows, results, baseline, args.threshold)
+        for key in ("batches", "processed", "df", "facets", "filtered", "search", "summary"):
+            ctx.pop(key, None)
+    print(f"\nSMTP sink received {sink.messages} message(s), {sink.bytes_received / 1024 / 1024:.1f} MB")
+
+    if save_path:
+        with open(save_path, "w") as f:
+            json.dump(all_results, f, indent=2)
+        print(f"✅ Results saved to {save_path}")
+    if regressions:
+        print(f"⚠️ {len(regressions)} stage(s) slower than the baseline by more than {args.threshold:.0%}")
+        sys.exit(1)
@@ -0,0 +1,141 @@
+"""Local stand-in for the StartupWorld get_task_activity endpoint.
+
+Serves synthetic records for any from_date/to_date, rows_per_day records
+per day, after an optional per-request latency. Bodies are gzip-encoded
+when the client asks for it, like the real server. Point the app at it
+with API_BASE_URL.
+
+edit_day() adds and updates records of a day, as activity during a running
+day would. With DELTA_PARAM in the query only records stamped at or after
+it are returned (set API_DELTA_PARAM=updated_since to use it).
+
+Run standalone:
+    python -m benchmarks.fake_api [--port 8765] [--rows-per-day 5000] [--latency 0.2]
+"""
+import argparse
+import gzip
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.synthetic import make_records
+
+PATH = "/Version1/get_task_activity.php"
+
+# Record ids count up from this day so they stay small, like the real ones
+EPOCH = datetime(2020, 1, 1).toordinal()
+
+# "Changed at or after" query parameter understood by this stand-in
+DELTA_PARAM = "updated_since"
+
+# Ids of records added by edit_day start here, above every generated id
+EDIT_FIRST_ID = 10 ** 9
+
+
+class FakeAPI(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, rows_per_day=5000, latency=0.0):
+        super().__init__(address, _Handler)
+        self.rows_per_day = rows_per_day
+        self.latency = latency
+        self.requests = 0
+        self.bytes_sent = 0
+        self.edits = {}     # day -> (new records, updated records)
+        self._bodies = {}
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{PATH}"
+
+    def payload(self, from_date, to_date):
+        start = datetime.strptime(from_date, "%Y-%m-%d")
+        end = datetime.strptime(to_date, "%Y-%m-%d")
+        data = []
+        while start <= end:
+            offset = start.toordinal() - EPOCH
+            day = start.strftime("%Y-%m-%d")
+            records = make_records(self.rows_per_day, day, seed=offset, first_id=offset * self.rows_per_day)
+            new, updated = self.edits.get(day, (0, 0))
+            for record in records[:updated]:
+                record.update(activity_status="Completed", updated_date=f"{day} 23:59:59")
+            added = make_records(new, day, seed=-offset % 2 ** 32, first_id=EDIT_FIRST_ID + offset * 10 ** 5)
+            for record in added:
+                record["created_date"] = f"{day} 23:59:59"
+            records += added
+            data.extend(records)
+            start += timedelta(days=1)
+        return {"success": True, "total": len(data), "data": data}
+
+    def edit_day(self, day, new=0, updated=0):
+        """Serve day with new records added and its first updated records changed."""
+        with self._lock:
+            self.edits[day] = (new, updated)
+            self._bodies.clear()
+
+    def body(self, from_date, to_date, since=None):
+        """Gzipped JSON for a window, generated once so later fetches measure transfer only."""
+        key = (from_date, to_date, self.rows_per_day, since)
+        with self._lock:
+            if key not in self._bodies:
+                payload = self.payload(from_date, to_date)
+                if since:
+                    payload["data"] = [r for r in payload["data"]
+                                       if max(r["created_date"], r["updated_date"]) >= since]
+                    payload["total"] = len(payload["data"])
+                payload = json.dumps(payload).encode()
+                self._bodies[key] = gzip.compress(payload, compresslevel=1)
+            return self._bodies[key]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        if url.path != PATH or "from_date" not in params or "to_date" not in params:
+            self.send_error(404)
+            return
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        body = self.server.body(params["from_date"], params["to_date"], params.get(DELTA_PARAM))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            self.send_header("Content-Encoding", "gzip")
+        else:
+            body = gzip.decompress(body)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        with self.server._lock:
+            self.server.requests += 1
+            self.server.bytes_sent += len(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start(port=0, rows_per_day=5000, latency=0.0):
+    """Serve in a background thread; returns the server (see .url)."""
+    server = FakeAPI(("127.0.0.1", port), rows_per_day, latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rows-per-day", type=int, default=5000)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    args = parser.parse_args()
+    server = FakeAPI(("127.0.0.1", args.port), args.rows_per_day, args.latency)
+    print(f"📡 Fake API on {server.url}")
+    server.serve_forever()
@@ -0,0 +1,93 @@
+"""Local SMTP server that accepts and discards every message.
+
+Speaks just enough SMTP (EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP, QUIT)
+for smtplib, without TLS or auth. Point the mailer at it with
+SMTP_HOST=127.0.0.1, SMTP_PORT=<port> and SMTP_SECURITY=none.
+
+Run standalone:
+    python -m benchmarks.smtp_sink [--port 2525] [--latency 0.05]
+"""
+import argparse
+import socketserver
+import threading
+import time
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, latency=0.0):
+        super().__init__(address, _Handler)
+        self.latency = latency
+        self.messages = 0
+        self.recipients = 0
+        self.bytes_received = 0
+        self._lock = threading.Lock()
+
+    def record(self, recipients, size):
+        with self._lock:
+            self.messages += 1
+            self.recipients += recipients
+            self.bytes_received += size
+
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self.reply("220 smtp-sink ready")
+        recipients = 0
+        for raw in self.rfile:
+            command = raw.decode("utf-8", "replace").strip()
+            verb = command[:4].upper()
+            if verb == "EHLO":
+                self.reply("250-smtp-sink")
+                self.reply("250-8BITMIME")
+                self.reply("250 SMTPUTF8")
+            elif verb in ("HELO", "NOOP"):
+                self.reply("250 OK")
+            elif verb == "MAIL":
+                recipients = 0
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                recipients += 1
+                self.reply("250 OK")
+            elif verb == "RSET":
+                recipients = 0
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                size = 0
+                for line in self.rfile:
+                    if line in (b".\r\n", b".\n"):
+                        break
+                    size += len(line)
+                if self.server.latency:
+                    time.sleep(self.server.latency)
+                self.server.record(recipients, size)
+                self.reply("250 OK: queued")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+def start(port=0, latency=0.0):
+    """Serve in a background thread; returns the server (see .server_address)."""
+    server = SMTPSink(("127.0.0.1", port), latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=2525)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds spent accepting each message")
+    args = parser.parse_args()
+    server = SMTPSink(("127.0.0.1", args.port), args.latency)
+    print(f"📬 SMTP sink on 127.0.0.1:{args.port}")
+    server.serve_forever()
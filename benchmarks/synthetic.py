@@ -0,0 +1,91 @@
+"""Synthetic get_task_activity records with realistic repetition.
+
+Field names and value shapes follow data/task_data.json. Cardinalities
+mirror production: a few hundred colleges, a few thousand users (each
+in one college), a long tail of task titles and mostly distinct remarks.
+"""
+import json
+from datetime import datetime, timedelta
+
+import numpy as np
+
+STATUSES = ["Completed", "Pending", "In Progress"]
+STATUS_WEIGHTS = [0.55, 0.3, 0.15]
+
+COLLEGES = 300
+USERS = 5000
+TASK_TITLES = 2000
+PROJECTS = 12
+TEAMS = 120
+
+WORDS = ("campus radio playlist upload social media post design poster review content "
+         "draft blog video edit survey report meeting outreach event website update "
+         "module testing data entry research call follow up documentation").split()
+
+
+def _zipf_choice(rng, n, size, a=1.3):
+    # Popular values repeat often, the rest form a long tail
+    return (rng.zipf(a, size) - 1) % n
+
+
+def _phrases(rng, n, words=4):
+    picks = rng.integers(0, len(WORDS), (n, words))
+    return np.array([" ".join(WORDS[i] for i in row) for row in picks], dtype=object)
+
+
+def make_records(rows, day, seed=0, first_id=0):
+    """rows API-shaped task records created on day ("YYYY-MM-DD")."""
+    rng = np.random.default_rng(seed)
+    users = _zipf_choice(rng, USERS, rows, a=1.1)
+    titles = _phrases(rng, TASK_TITLES)[_zipf_choice(rng, TASK_TITLES, rows)]
+    remarks = _phrases(rng, max(rows // 2, 1), words=6)[rng.integers(0, max(rows // 2, 1), rows)]
+    current = _phrases(rng, max(rows // 4, 1), words=5)[rng.integers(0, max(rows // 4, 1), rows)]
+    statuses = rng.choice(STATUSES, rows, p=STATUS_WEIGHTS)
+    hours = rng.integers(0, 9, rows)
+    minutes = rng.integers(0, 12, rows) * 5
+    seconds = rng.integers(0, 24 * 3600, rows)
+    base = datetime.strptime(day, "%Y-%m-%d")
+    stamps = [(base + timedelta(seconds=int(s))).strftime("%Y-%m-%d %H:%M:%S") for s in seconds]
+
+    records = []
+    for i in range(rows):
+        user = int(users[i])
+        college = user % COLLEGES
+        records.append({
+            "id": str(first_id + i),
+            "user_id": str(20000 + user),
+            "activity_type": "task",
+            "activity_status": statuses[i],
+            "project": str(user % PROJECTS + 1),
+            "team": str(user % TEAMS + 1),
+            "task_title": titles[i].capitalize(),
+            "remark": remarks[i],
+            "current_task": current[i],
+            "time_spent": f"{hours[i]}:{minutes[i]:02d}",
+            "created_date": stamps[i],
+            "updated_date": "0000-00-00 00:00:00",
+            "college": f"COLLEGE {college} INSTITUTE OF MANAGEMENT",
+            "college_id": f"1-{4259355966 + college}",
+            "email": f"user{user}@example.com",
+            "mobile": str(7000000000 + user),
+            "uname": f"User {user}",
+            "lastname": None,
+            "fullName": None,
+        })
+    return records
+
+
+def make_payload(rows, from_date, days=1, seed=0):
+    """API response for rows records spread evenly over days starting at from_date."""
+    start = datetime.strptime(from_date, "%Y-%m-%d")
+    per_day = -(-rows // days)
+    data = []
+    for n in range(days):
+        day = (start + timedelta(days=n)).strftime("%Y-%m-%d")
+        data.extend(make_records(min(per_day, rows - len(data)), day, seed + n, first_id=len(data)))
+    return {"success": True, "total": len(data), "data": data}
+
+
+def write_payload(payload, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f)
@@ -0,0 +1,10 @@
+import time
+
+
+def timed(label, fn):
+    """Run fn once, print its wall time under label and return (result, seconds)."""
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<40} {elapsed:8.3f}s")
+    return result, elapsed
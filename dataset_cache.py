@@ -0,0 +1,330 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import pandas as pd
+
+from metrics import inc
+from sqlite_store import OWNER, connect
+from task_store import (TODAY_TTL, dataset_version, load_range, load_rollups, stale_days, sync_day,
+                        upsert_rows)
+
+# Shared between the web dynos and the scheduler worker
+CACHE_DIR = os.path.join("data", "cache")
+CACHE_DB = os.path.join(CACHE_DIR, "cache.sqlite")
+
+# Age after which an entry is served stale and refreshed in the background (seconds)
+CACHE_TTL      = int(os.getenv("CACHE_TTL", str(TODAY_TTL)))
+CACHE_PAST_TTL = int(os.getenv("CACHE_PAST_TTL", str(24 * 3600)))
+
+# Most recently used entries kept on disk; older ones are deleted with their files
+CACHE_KEEP = int(os.getenv("CACHE_KEEP", "32"))
+
+# How long a refresh may hold a key's lock before others may take over (seconds)
+LOCK_TIMEOUT = int(os.getenv("CACHE_LOCK_TIMEOUT", "300"))
+LOCK_POLL_SECONDS = 0.5
+
+# Frames already read in this process: key -> (created_at, DataFrame), least recent first
+MEMO_ENTRIES = int(os.getenv("CACHE_MEMO_ENTRIES", "8"))
+_memo = OrderedDict()
+_memo_lock = threading.Lock()
+_refreshing = set()        # keys with a background refresh running in this process
+
+
+CACHE_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS entries ("
+    "key TEXT PRIMARY KEY, path TEXT NOT NULL, version TEXT, created_at REAL NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS locks ("
+    "key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)",
+]
+
+
+def _connect():
+    return connect(CACHE_DB, CACHE_SCHEMA)
+
+
+def range_key(from_date, to_date):
+    return f"range:{from_date}:{to_date}"
+
+
+def rollup_key(from_date, to_date):
+    return f"rollups:{from_date}:{to_date}"
+
+
+def ttl_for(from_date, to_date):
+    """Ranges that include today go stale quickly; fully past ranges barely change."""
+    return CACHE_TTL if str(to_date) >= datetime.now().strftime("%Y-%m-%d") else CACHE_PAST_TTL
+
+
+def read_entry(key):
+    """(path, version, created_at) for key, or None."""
+    conn = _connect()
+    try:
+        return conn.execute("SELECT path, version, created_at FROM entries WHERE key = ?", (key,)).fetchone()
+    finally:
+        conn.close()
+
+
+def acquire_lock(key, timeout=LOCK_TIMEOUT):
+    """Try to become the only process refreshing key; expired locks are taken over."""
+    conn = _connect()
+    try:
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("DELETE FROM locks WHERE key = ? AND expires_at < ?", (key, now))
+        cur = conn.execute(
+            "INSERT OR IGNORE INTO locks (key, owner, expires_at) VALUES (?, ?, ?)",
+            (key, OWNER, now + timeout),
+        )
+        conn.execute("COMMIT")
+        return cur.rowcount == 1
+    finally:
+        conn.close()
+
+
+def release_lock(key):
+    conn = _connect()
+    try:
+        conn.execute("DELETE FROM locks WHERE key = ? AND owner = ?", (key, OWNER))
+    finally:
+        conn.close()
+
+
+def store(key, df):
+    """Write df as key's payload and point the entry at it atomically; returns the entry's created_at."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    digest = hashlib.sha1(key.encode()).hexdigest()
+    created_at = time.time()
+    path = os.path.join(CACHE_DIR, f"{digest}-{int(created_at * 1000)}.parquet")
+    tmp_path = f"{path}.{OWNER}.tmp"
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+    conn = _connect()
+    try:
+        old = conn.execute("SELECT path FROM entries WHERE key = ?", (key,)).fetchone()
+        conn.execute(
+            "INSERT OR REPLACE INTO entries (key, path, version, created_at) VALUES (?, ?, ?, ?)",
+            (key, path, df.attrs.get("version"), created_at),
+        )
+    finally:
+        conn.close()
+    if old and old[0] != path:
+        # Readers that already opened the old file keep their handle
+        try:
+            os.remove(old[0])
+        except OSError:
+            pass
+    prune_cache()
+    return created_at
+
+
+def _last_used(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0
+
+
+def prune_cache(keep=CACHE_KEEP):
+    """Delete all but the keep most recently used entries, rows and files both.
+
+    Files no entry points at (left by a writer that died) are removed once
+    they are older than LOCK_TIMEOUT.
+    """
+    conn = _connect()
+    try:
+        entries = conn.execute("SELECT key, path FROM entries").fetchall()
+        entries.sort(key=lambda entry: _last_used(entry[1]), reverse=True)
+        for key, path in entries[keep:]:
+            # Only if it was not replaced meanwhile
+            conn.execute("DELETE FROM entries WHERE key = ? AND path = ?", (key, path))
+        kept = {path for _, path in entries[:keep]}
+    finally:
+        conn.close()
+    for key, path in entries[keep:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    cutoff = time.time() - LOCK_TIMEOUT
+    for name in os.listdir(CACHE_DIR):
+        path = os.path.join(CACHE_DIR, name)
+        if name.endswith((".parquet", ".tmp")) and path not in kept and _last_used(path) < cutoff:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def _remember(key, created_at, df):
+    with _memo_lock:
+        _memo[key] = (created_at, df)
+        _memo.move_to_end(key)
+        while len(_memo) > MEMO_ENTRIES:
+            _memo.popitem(last=False)
+
+
+def touch(key):
+    """Mark key's entry fresh again without rewriting it; the frame keeps its version."""
+    created_at = time.time()
+    conn = _connect()
+    try:
+        conn.execute("UPDATE entries SET created_at = ? WHERE key = ?", (created_at, key))
+    finally:
+        conn.close()
+    with _memo_lock:
+        cached = _memo.get(key)
+        if cached:
+            _memo[key] = (created_at, cached[1])
+
+
+def load_entry(key, entry):
+    """Read an entry's frame, reusing the copy this process already holds."""
+    path, version, created_at = entry
+    try:
+        # Marks the entry as recently used for prune_cache
+        os.utime(path)
+    except OSError:
+        pass
+    with _memo_lock:
+        cached = _memo.get(key)
+        if cached and cached[0] == created_at:
+            _memo.move_to_end(key)
+            return cached[1]
+    try:
+        df = pd.read_parquet(path)
+    except FileNotFoundError:
+        # Replaced by another process between the lookup and the read
+        return load_entry(key, read_entry(key))
+    df.attrs["version"] = f"{version}@{created_at}"
+    _remember(key, created_at, df)
+    return df
+
+
+def refresh(key, loader):
+    """Recompute key under its lock; returns False if another process holds it."""
+    if not acquire_lock(key):
+        return False
+    try:
+        store(key, loader())
+        return True
+    finally:
+        release_lock(key)
+
+
+def _refresh_in_background(key, loader):
+    with _memo_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+
+    def run():
+        try:
+            refresh(key, loader)
+        except Exception as err:
+            print(f"❌ Background refresh of {key} failed: {err}")
+        finally:
+            with _memo_lock:
+                _refreshing.discard(key)
+
+    threading.Thread(target=run, name=f"refresh-{key}", daemon=True).start()
+
+
+def get_cached(key, loader, ttl, wait_for_fresh=False):
+    """Stale-while-revalidate lookup shared by every process on this machine.
+
+    A fresh entry is returned as is. A stale one is returned immediately
+    while a background thread refreshes it, unless wait_for_fresh asks for
+    the refreshed copy. On a miss the first process to take the key's lock
+    computes it; the others wait for its result.
+    """
+    cache = key.split(":", 1)[0]
+    entry = read_entry(key)
+    if entry and os.path.exists(entry[0]):
+        if time.time() - entry[2] <= ttl:
+            inc("cache_requests_total", cache=cache, result="hit")
+            return load_entry(key, entry)
+        if not wait_for_fresh:
+            inc("cache_requests_total", cache=cache, result="stale")
+            _refresh_in_background(key, loader)
+            return load_entry(key, entry)
+
+    inc("cache_requests_total", cache=cache, result="miss")
+
+    seen = entry[2] if entry else None
+    deadline = time.time() + LOCK_TIMEOUT
+    while True:
+        if refresh(key, loader):
+            return load_entry(key, read_entry(key))
+        # Someone else is computing it: wait for their entry to appear
+        time.sleep(LOCK_POLL_SECONDS)
+        entry = read_entry(key)
+        if entry and entry[2] != seen and os.path.exists(entry[0]):
+            return load_entry(key, entry)
+        if time.time() > deadline:
+            store(key, loader())
+            return load_entry(key, read_entry(key))
+
+
+def get_dataset(from_date, to_date, wait_for_fresh=False):
+    """Processed task activity for a range, through the shared cache."""
+    return get_cached(
+        range_key(from_date, to_date),
+        lambda: load_range(from_date, to_date),
+        ttl_for(from_date, to_date),
+        wait_for_fresh,
+    )
+
+
+def get_rollups(from_date, to_date, wait_for_fresh=False):
+    """Daily rollups for a range, through the shared cache."""
+    return get_cached(
+        rollup_key(from_date, to_date),
+        lambda: load_rollups(from_date, to_date),
+        ttl_for(from_date, to_date),
+        wait_for_fresh,
+    )
+
+
+def sync_dataset(from_date, to_date):
+    """Delta refresh of a cached range that includes today.
+
+    Only today's rows at or past its watermark are fetched; they are upserted
+    by id into the frame this process already holds, which is then stored as
+    the range's entry. The range is reloaded whole when nothing is cached
+    yet, today had to be refetched whole, or another day went stale. While
+    another process refreshes the range the held copy is returned as is.
+    attrs["version"] changes only when rows changed.
+    """
+    key = range_key(from_date, to_date)
+    today = datetime.now().strftime("%Y-%m-%d")
+    entry = read_entry(key)
+    if not (from_date <= today <= to_date) or not entry or not os.path.exists(entry[0]):
+        return get_dataset(from_date, to_date)
+
+    df = load_entry(key, entry)
+    if not acquire_lock(key):
+        return df
+    try:
+        delta = sync_day(today)
+        if delta is None or stale_days(from_date, to_date):
+            store(key, load_range(from_date, to_date))
+        elif delta.empty:
+            touch(key)
+            return df
+        else:
+            updated = upsert_rows(df, delta)
+            updated.attrs["version"] = f"{from_date}:{to_date}:{dataset_version(from_date, to_date)}"
+            created_at = store(key, updated)
+            updated.attrs["version"] = f"{updated.attrs['version']}@{created_at}"
+            _remember(key, created_at, updated)
+            print(f"🔄 Upserted {len(delta)} changed task(s) into {from_date} → {to_date}")
+            return updated
+    finally:
+        release_lock(key)
+    return load_entry(key, read_entry(key))
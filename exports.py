@@ -0,0 +1,114 @@
+import gzip
+import hashlib
+import os
+import tempfile
+
+from metrics import inc, timed
+
+# Dashboard downloads, one file per (dataset version, filters, search, format)
+EXPORT_DIR = os.path.join("data", "exports", "downloads")
+
+# Rows converted and written per step, bounding the memory an export needs
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "50000"))
+
+# Most recent exports kept on disk
+EXPORT_KEEP = int(os.getenv("EXPORT_KEEP", "20"))
+
+# format -> (file suffix, MIME type)
+EXPORT_FORMATS = {
+    "csv":     (".csv", "text/csv"),
+    "csv.gz":  (".csv.gz", "application/gzip"),
+    "parquet": (".parquet", "application/vnd.apache.parquet"),
+}
+
+
+def export_signature(dataset_version, filters, search_term):
+    """Short key naming an export without hashing the rows it contains."""
+    return hashlib.sha1(repr((dataset_version, filters, search_term)).encode()).hexdigest()[:20]
+
+
+def _chunks(df, rows=EXPORT_CHUNK_ROWS):
+    # An empty frame still yields one (empty) chunk so the header is written
+    for start in range(0, max(len(df), 1), rows):
+        yield df.iloc[start:start + rows]
+
+
+def _write_csv_stream(df, f):
+    for i, chunk in enumerate(_chunks(df)):
+        chunk.to_csv(f, header=(i == 0), index=False)
+
+
+def write_csv(df, path):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        _write_csv_stream(df, f)
+
+
+def write_csv_gzip(df, path):
+    with gzip.open(path, "wt", newline="", encoding="utf-8") as f:
+        _write_csv_stream(df, f)
+
+
+def write_parquet(df, path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        for chunk in _chunks(df):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+EXPORT_WRITERS = {
+    "csv":     write_csv,
+    "csv.gz":  write_csv_gzip,
+    "parquet": write_parquet,
+}
+
+
+def prune_files(directory, keep):
+    """Delete all but the keep most recently modified files in directory (subdirectories are left alone)."""
+    paths = [
+        os.path.join(directory, name)
+        for name in os.listdir(directory)
+        if not name.endswith(".tmp") and os.path.isfile(os.path.join(directory, name))
+    ]
+    paths.sort(key=os.path.getmtime, reverse=True)
+    for path in paths[keep:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def prune_exports(keep=EXPORT_KEEP):
+    """Delete all but the keep most recently used exports."""
+    prune_files(EXPORT_DIR, keep)
+
+
+def export_file(df, signature, fmt="csv"):
+    """Path of df exported as fmt, written on first request for signature only.
+
+    The file is written chunk by chunk to a temporary name and renamed into
+    place, so concurrent requests never see a partial export.
+    """
+    suffix, _ = EXPORT_FORMATS[fmt]
+    path = os.path.join(EXPORT_DIR, f"{signature}{suffix}")
+    if os.path.exists(path):
+        inc("cache_requests_total", cache="export", result="hit")
+        os.utime(path)
+        return path
+
+    inc("cache_requests_total", cache="export", result="miss")
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=EXPORT_DIR, suffix=".tmp")
+    os.close(fd)
+    try:
+        with timed("export", format=fmt) as info:
+            EXPORT_WRITERS[fmt](df, tmp_path)
+            info.update(rows=len(df), bytes=os.path.getsize(tmp_path))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    prune_exports()
+    return path
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+
+# Sidebar facets and their labels
+FACETS = {
+    "activity_status": "Activity Status",
+    "project":         "Project",
+    "college":         "College",
+    "task_title":      "Task Type",
+}
+
+
+class FacetIndex:
+    """Row-index postings per facet value for one loaded dataset.
+
+    Built once per dataset; filtering is then a union of the selected values'
+    postings within a facet and an intersection across facets, without
+    copying or rescanning the frame.
+    """
+
+    def __init__(self, df, facets=FACETS):
+        self.rows = len(df)
+        self.facets = {}
+        for col in facets:
+            if col not in df.columns:
+                continue
+            series = df[col]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                codes, labels = series.cat.codes.to_numpy(), series.cat.categories
+            else:
+                codes, labels = pd.factorize(series, sort=True)
+            codes = codes.astype(np.int32)
+
+            # Rows grouped by value: value i owns order[offsets[i]:offsets[i + 1]]
+            counts = np.bincount(codes[codes >= 0], minlength=len(labels))
+            order = np.argsort(codes, kind="stable").astype(np.int32)
+            offsets = np.concatenate([[0], np.cumsum(counts)]) + np.count_nonzero(codes < 0)
+
+            self.facets[col] = {
+                "codes": codes,
+                "labels": list(labels),
+                "lookup": {label: i for i, label in enumerate(labels)},
+                "order": order,
+                "offsets": offsets,
+                "counts": counts,
+            }
+
+    def options(self, col):
+        """Sorted values of a facet that occur in the dataset."""
+        facet = self.facets[col]
+        return [label for label, count in zip(facet["labels"], facet["counts"]) if count]
+
+    def mask(self, col, values):
+        """Boolean row mask for rows whose col is any of values."""
+        facet = self.facets[col]
+        mask = np.zeros(self.rows, dtype=bool)
+        for value in values:
+            i = facet["lookup"].get(value)
+            if i is not None:
+                mask[facet["order"][facet["offsets"][i]:facet["offsets"][i + 1]]] = True
+        return mask
+
+    def select(self, selections, exclude=None):
+        """Intersect the masks of every facet with a non-empty selection (None if none apply)."""
+        combined = None
+        for col, values in selections.items():
+            if col == exclude or col not in self.facets or not values:
+                continue
+            mask = self.mask(col, values)
+            combined = mask if combined is None else combined & mask
+        return combined
+
+    def positions(self, selections):
+        """Row positions matching selections, or None when nothing is filtered."""
+        combined = self.select(selections)
+        return None if combined is None else np.flatnonzero(combined)
+
+    def counts(self, selections):
+        """Live per-value counts for each facet, honouring the other facets' selections."""
+        live = {}
+        for col, facet in self.facets.items():
+            others = self.select(selections, exclude=col)
+            codes = facet["codes"] if others is None else facet["codes"][others]
+            counts = np.bincount(codes[codes >= 0], minlength=len(facet["labels"]))
+            live[col] = dict(zip(facet["labels"], counts.tolist()))
+        return live
@@ -1,30 +1,135 @@
 import requests
-import json
 import os
+import threading
+import time
 from datetime import datetime, timedelta
+from requests.adapters import HTTPAdapter
+
+from json_stream import iter_batches, iter_items
+from metrics import timed
 
 # Automatically fetch data for the last 1 day
 FROM_DATE = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
 TO_DATE   = datetime.now().strftime("%Y-%m-%d")
 
+# API endpoint (set API_BASE_URL to point at a local stand-in)
+API_BASE_URL = os.getenv("API_BASE_URL", "http://startupworld.in/Version1/get_task_activity.php")
+
 # API URL with dynamic date range
-API_URL = f"http://startupworld.in/Version1/get_task_activity.php?from_date={FROM_DATE}&to_date={TO_DATE}"
+API_URL = f"{API_BASE_URL}?from_date={FROM_DATE}&to_date={TO_DATE}"
+
+# Chunked fetch settings
+CHUNK_DAYS      = int(os.getenv("FETCH_CHUNK_DAYS", "1"))
+MAX_WORKERS     = int(os.getenv("FETCH_MAX_WORKERS", "8"))
+REQUEST_TIMEOUT = float(os.getenv("FETCH_TIMEOUT", "30"))
+MAX_RETRIES     = int(os.getenv("FETCH_RETRIES", "3"))
+BACKOFF_SECONDS = float(os.getenv("FETCH_BACKOFF", "0.5"))
+
+# Query parameter the API takes for "changed at or after" (e.g. updated_since) in
+# delta refreshes; unset, the day is fetched and filtered on this side
+API_DELTA_PARAM = os.getenv("API_DELTA_PARAM", "")
+
+# Streaming ingestion settings
+STREAM_CHUNK_BYTES = 64 * 1024
+STREAM_BATCH_SIZE  = int(os.getenv("FETCH_BATCH_SIZE", "5000"))
 
 # Save location
 DATA_DIR = "data"
 DATA_FILE = os.path.join(DATA_DIR, "task_data.json")
 
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Return the shared keep-alive session, sized for MAX_WORKERS connections."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+    return _session
+
+
+def _to_date(value):
+    if isinstance(value, str):
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    return value
+
+
+def split_date_range(from_date, to_date, chunk_days=CHUNK_DAYS):
+    """Split an inclusive date range into (from, to) windows of chunk_days each.
+
+    A falsy chunk_days returns the whole range as a single window.
+    """
+    start, end = _to_date(from_date), _to_date(to_date)
+    if not chunk_days or end < start:
+        return [(start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"))]
+
+    windows = []
+    while start <= end:
+        stop = min(start + timedelta(days=chunk_days - 1), end)
+        windows.append((start.strftime("%Y-%m-%d"), stop.strftime("%Y-%m-%d")))
+        start = stop + timedelta(days=1)
+    return windows
+
+
+def with_retries(fn, retries=MAX_RETRIES, backoff=BACKOFF_SECONDS):
+    """Call fn(), retrying request and decode errors with exponential backoff."""
+    for attempt in range(retries + 1):
+        try:
+            return fn()
+        except (requests.exceptions.RequestException, ValueError):
+            if attempt == retries:
+                raise
+            time.sleep(backoff * 2 ** attempt)
+
+
+def stream_window(from_date, to_date, session=None, timeout=REQUEST_TIMEOUT,
+                  batch_size=STREAM_BATCH_SIZE, extra_params=None, keep=None):
+    """Yield one window's records in batches while the response is still downloading.
+
+    The body is requested gzip-compressed and decoded incrementally, so the
+    raw text and the full list of dicts are never held at once. Only records
+    for which keep(record) is true are batched, when keep is given. Callers
+    that retry must restart the whole stream (see with_retries).
+    """
+    session = session or get_session()
+    params = {"from_date": from_date, "to_date": to_date, **(extra_params or {})}
+    headers = {"Accept-Encoding": "gzip, deflate"}
+    # Timed until the last batch is consumed, so this includes the caller's processing
+    with timed("fetch_stream") as info, \
+            session.get(API_BASE_URL, params=params, timeout=timeout, headers=headers, stream=True) as response:
+        response.raise_for_status()
+        info.update(rows=0, bytes=0)
+
+        def counted(chunks):
+            for chunk in chunks:
+                info["bytes"] += len(chunk)
+                yield chunk
+
+        chunks = counted(response.iter_content(chunk_size=STREAM_CHUNK_BYTES))
+        items = iter_items(chunks, key="data")
+        for batch in iter_batches(items if keep is None else filter(keep, items), batch_size):
+            info["rows"] += len(batch)
+            yield batch
+
+
 def fetch_task_data():
+    # Imported here because the store and cache build on the fetch helpers above
+    from dataset_cache import get_dataset
+    from task_store import write_records_json
+
     try:
         print(f"📡 Fetching task data from {FROM_DATE} to {TO_DATE}...")
 
-        response = requests.get(API_URL, timeout=10)
-        response.raise_for_status()  # Raise for HTTP errors (4xx, 5xx)
-
-        response_data = response.json()
-        task_data = response_data.get("data", [])
+        # Shared with the dashboards; only days missing from (or stale in) the local store hit the API
+        df = get_dataset(FROM_DATE, TO_DATE, wait_for_fresh=True)
 
-        if not task_data:
+        if df.empty:
             print("⚠️ No task data returned by the API.")
             return
 
@@ -32,8 +137,7 @@ def fetch_task_data():
         os.makedirs(DATA_DIR, exist_ok=True)
 
         # Save only the "data" portion into the file
-        with open(DATA_FILE, "w") as f:
-            json.dump(task_data, f, indent=2)
+        write_records_json(df, DATA_FILE)
 
         print(f"✅ Task data saved to '{DATA_FILE}'!")
 
@@ -0,0 +1,117 @@
+import codecs
+import json
+
+_decoder = json.JSONDecoder()
+
+WHITESPACE = " \t\n\r"
+
+# Characters a JSON number can start with and contain
+NUMBER_START = "-0123456789"
+NUMBER_CHARS = frozenset("0123456789.eE+-")
+
+
+class _Reader:
+    """Incremental cursor over JSON text arriving in chunks (bytes or str)."""
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        """Append the next chunk to the buffer, dropping what has been consumed."""
+        text = ""
+        for chunk in self.chunks:
+            text = self.utf8.decode(chunk) if isinstance(chunk, bytes) else chunk
+            if text:
+                break
+        else:
+            text = self.utf8.decode(b"", final=True)
+            self.eof = True
+        self.buf = self.buf[self.pos:] + text
+        self.pos = 0
+
+    def peek(self):
+        """Next non-whitespace character, or None at the end of the input."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if self.eof:
+                return None
+            self.fill()
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} in JSON stream, found {found!r}")
+        self.pos += 1
+
+    def value(self):
+        """Decode the next complete JSON value, reading more chunks as needed."""
+        self.peek()
+        while True:
+            try:
+                obj, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            else:
+                # A number running up to the buffer edge may continue in the next
+                # chunk ("1." then "5", "1e" then "3"), even where it decoded
+                # early or left an unparsed fraction/exponent tail
+                if self.eof or self.buf[self.pos] not in NUMBER_START \
+                        or not NUMBER_CHARS.issuperset(self.buf[end:]):
+                    self.pos = end
+                    return obj
+            self.fill()
+
+
+def iter_items(chunks, key="data"):
+    """Yield the elements of a JSON array as its text streams in.
+
+    Accepts either a top-level array or an object holding the array under
+    key, like the get_task_activity envelope. Other keys are skipped. Only
+    one element is held in memory at a time.
+    """
+    reader = _Reader(chunks)
+    if reader.peek() == "{":
+        reader.pos += 1
+        while True:
+            if reader.peek() in ("}", None):
+                return
+            name = reader.value()
+            reader.expect(":")
+            if name == key and reader.peek() == "[":
+                break
+            reader.value()
+            if reader.peek() == ",":
+                reader.pos += 1
+
+    reader.expect("[")
+    if reader.peek() == "]":
+        return
+    while True:
+        yield reader.value()
+        found = reader.peek()
+        if found == ",":
+            reader.pos += 1
+        elif found == "]":
+            return
+        else:
+            raise ValueError(f"Expected ',' or ']' in JSON array, found {found!r}")
+
+
+def iter_batches(items, size):
+    """Group an iterable into lists of at most size items."""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
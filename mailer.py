@@ -1,18 +1,309 @@
-import json
 import csv
+import gzip
+import html
+import shutil
 import smtplib
 import os
+import zipfile
+import threading
+import time
+from collections import Counter, deque
 from email.message import EmailMessage
 from datetime import datetime
 from dotenv import load_dotenv
 
+from json_stream import iter_items
+from exports import prune_files
+from metrics import inc, log_event, observe, timed
+from outbox import OutboxWorker, enqueue, exists, flush
+from processing import duration_minutes
+
 # look for a .env file in the current directory (or parent directories)
 load_dotenv()  
 
 EMAIL_ADDRESS  = os.getenv("EMAIL_ADDRESS")
 EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD")
 
-def send_summary_email(to_emails, subject, plain_body, html_body, csv_path):
+# SMTP server (point at a local stand-in with SMTP_HOST/SMTP_PORT/SMTP_SECURITY=none)
+SMTP_HOST     = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT     = int(os.getenv("SMTP_PORT", "465"))
+SMTP_SECURITY = os.getenv("SMTP_SECURITY", "ssl")  # ssl | starttls | none
+SMTP_TIMEOUT  = float(os.getenv("SMTP_TIMEOUT", "30"))
+SMTP_RETRIES  = int(os.getenv("SMTP_RETRIES", "2"))
+
+# Idle sessions are closed proactively before the server drops them (seconds)
+SMTP_IDLE_TIMEOUT = float(os.getenv("SMTP_IDLE_TIMEOUT", "240"))
+
+# Report emails are queued in the durable outbox (outbox.py) and delivered by a
+# background worker; OUTBOX_ENABLED=0 sends them inline instead
+OUTBOX_ENABLED = os.getenv("OUTBOX_ENABLED", "1") != "0"
+
+# Report attachment: raw | gzip | zip | parquet | auto (raw when it fits, else gzip)
+ATTACHMENT_MODE         = os.getenv("ATTACHMENT_MODE", "auto")
+ATTACHMENT_MAX_BYTES    = int(os.getenv("ATTACHMENT_MAX_BYTES", str(20 * 1024 * 1024)))
+ATTACHMENT_PREVIEW_ROWS = int(os.getenv("ATTACHMENT_PREVIEW_ROWS", "1000"))
+ATTACHMENT_CHUNK_BYTES  = 1024 * 1024
+
+# Full exports that were too large to attach, and how many of the newest are kept
+EXPORT_DIR = os.path.join("data", "exports")
+ATTACHMENT_EXPORT_KEEP = int(os.getenv("ATTACHMENT_EXPORT_KEEP", "20"))
+
+# Streaming report settings
+REPORT_READ_CHUNK    = 64 * 1024
+REPORT_TOP_COLLEGES  = 10
+
+
+def _is_connection_error(err):
+    """True for errors that a fresh connection could fix (not bad recipients or auth)."""
+    if isinstance(err, smtplib.SMTPServerDisconnected):
+        return True
+    if isinstance(err, smtplib.SMTPResponseException):
+        return err.smtp_code == 421
+    return isinstance(err, OSError) and not isinstance(err, smtplib.SMTPException)
+
+
+def _is_permanent_error(err):
+    """True for failures a later retry cannot fix (every recipient refused)."""
+    return isinstance(err, smtplib.SMTPRecipientsRefused)
+
+
+class SMTPConnection:
+    """Authenticated SMTP session reused across messages.
+
+    Connects and logs in on first use, drops the session after
+    SMTP_IDLE_TIMEOUT seconds without traffic, and reconnects and retries when
+    the server hangs up mid-batch. Recent per-message latencies are kept in
+    latencies.
+    """
+
+    def __init__(self, host=SMTP_HOST, port=SMTP_PORT, security=SMTP_SECURITY,
+                 username=EMAIL_ADDRESS, password=EMAIL_PASSWORD,
+                 timeout=SMTP_TIMEOUT, retries=SMTP_RETRIES, idle_timeout=SMTP_IDLE_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.security = security
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.retries = retries
+        self.idle_timeout = idle_timeout
+        self.smtp = None
+        self.last_used = 0.0
+        self.latencies = deque(maxlen=1000)
+        self.lock = threading.Lock()
+
+    def connect(self):
+        if self.security == "ssl":
+            smtp = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            if self.security == "starttls":
+                smtp.starttls()
+        try:
+            if self.username and self.password:
+                smtp.login(self.username, self.password)
+        except Exception:
+            smtp.close()
+            raise
+        self.smtp = smtp
+
+    def close(self):
+        if self.smtp is not None:
+            try:
+                self.smtp.quit()
+            except Exception:
+                self.smtp.close()
+            self.smtp = None
+
+    def send(self, msg):
+        """Send one message over the session and return its latency in seconds."""
+        with self.lock:
+            if self.smtp is not None and time.monotonic() - self.last_used > self.idle_timeout:
+                self.close()
+            for attempt in range(self.retries + 1):
+                try:
+                    if self.smtp is None:
+                        self.connect()
+                    start = time.perf_counter()
+                    self.smtp.send_message(msg)
+                    latency = time.perf_counter() - start
+                    self.last_used = time.monotonic()
+                    self.latencies.append((msg["Subject"], latency))
+                    observe("smtp_send_seconds", latency)
+                    return latency
+                except Exception as err:
+                    if not _is_connection_error(err) or attempt == self.retries:
+                        inc("smtp_errors_total")
+                        log_event("smtp_error", error=str(err), attempts=attempt + 1)
+                        raise
+                    # The session is gone; reconnect and try again
+                    if self.smtp is not None:
+                        self.smtp.close()
+                        self.smtp = None
+
+    def send_batch(self, messages):
+        """Send messages over this one session; returns [(message, latency, error)]."""
+        results = []
+        for msg in messages:
+            try:
+                results.append((msg, self.send(msg), None))
+            except Exception as err:
+                results.append((msg, None, err))
+        return results
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_shared_connection = None
+_shared_lock = threading.Lock()
+
+
+def get_connection():
+    """Process-wide SMTPConnection so consecutive reports reuse one session."""
+    global _shared_connection
+    with _shared_lock:
+        if _shared_connection is None:
+            _shared_connection = SMTPConnection()
+    return _shared_connection
+
+
+_outbox_worker = None
+
+
+def start_outbox_worker():
+    """Start this process's outbox worker once; it sends over its own SMTP session."""
+    global _outbox_worker
+    with _shared_lock:
+        if _outbox_worker is None and OUTBOX_ENABLED:
+            _outbox_worker = OutboxWorker(SMTPConnection().send, _is_permanent_error)
+            _outbox_worker.start()
+    return _outbox_worker
+
+
+def flush_outbox():
+    """Deliver whatever is due in the outbox now, for one-off runs that exit afterwards."""
+    if OUTBOX_ENABLED:
+        flush(get_connection().send, _is_permanent_error)
+
+
+def already_queued(dedup_key, label=None):
+    """True if the outbox already holds dedup_key, so the report need not be rendered again."""
+    if not (OUTBOX_ENABLED and dedup_key and exists(dedup_key)):
+        return False
+    print(f"⚠️ {label or dedup_key} was already queued or sent. Skipping.")
+    return True
+
+
+def queue_message(msg, dedup_key=None):
+    """Hand a finished message to the outbox; False if dedup_key was already queued or sent."""
+    if enqueue(msg, dedup_key):
+        print(f"📬 Email to {msg['To']} queued for delivery")
+        return True
+    print(f"⚠️ '{msg['Subject']}' was already sent to {msg['To']} ({dedup_key}). Skipping.")
+    return False
+
+
+def _is_current(path, source):
+    """True if path was already built from the current version of source."""
+    return os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(source)
+
+
+def _gzip_file(src, dst):
+    with open(src, "rb") as fin, gzip.open(dst, "wb") as fout:
+        shutil.copyfileobj(fin, fout, ATTACHMENT_CHUNK_BYTES)
+
+
+def _zip_file(src, dst):
+    with zipfile.ZipFile(dst, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.write(src, arcname=os.path.basename(src))
+
+
+def _parquet_file(src, dst):
+    import pyarrow.parquet as pq
+    from pyarrow import csv as pa_csv
+
+    # Every column stays text so IDs and durations keep their exact spelling
+    with open(src, "rb") as f:
+        header = next(csv.reader([f.readline().decode("utf-8-sig")]), [])
+    options = pa_csv.ConvertOptions(column_types={name: "string" for name in header})
+    reader = pa_csv.open_csv(src, convert_options=options)
+    with pq.ParquetWriter(dst, reader.schema, compression="zstd") as writer:
+        for batch in reader:
+            writer.write_batch(batch)
+
+
+def _trim_csv(src, dst, rows):
+    with open(src, newline="", encoding="utf-8") as fin, open(dst, "w", newline="", encoding="utf-8") as fout:
+        writer = csv.writer(fout)
+        for i, row in enumerate(csv.reader(fin)):
+            if i > rows:
+                break
+            writer.writerow(row)
+
+
+# mode -> (suffix, builder, maintype, subtype)
+ATTACHMENT_FORMATS = {
+    "gzip":    (".gz", _gzip_file, "application", "gzip"),
+    "zip":     (".zip", _zip_file, "application", "zip"),
+    "parquet": (".parquet", _parquet_file, "application", "vnd.apache.parquet"),
+}
+
+
+def prepare_attachment(csv_path, mode=ATTACHMENT_MODE, max_bytes=ATTACHMENT_MAX_BYTES):
+    """Pick the file to attach for a report CSV, staying under max_bytes.
+
+    Returns (path, maintype, subtype, note). "raw" attaches the CSV, "gzip",
+    "zip" and "parquet" stream it into that format, and "auto" attaches it
+    raw when it fits and gzip otherwise. Whatever still exceeds max_bytes is
+    replaced by the first ATTACHMENT_PREVIEW_ROWS rows, and the full CSV is
+    kept under EXPORT_DIR; note then says where.
+    """
+    if mode == "auto":
+        mode = "raw" if os.path.getsize(csv_path) <= max_bytes else "gzip"
+
+    if mode == "raw":
+        path, maintype, subtype = csv_path, "text", "csv"
+    else:
+        suffix, build, maintype, subtype = ATTACHMENT_FORMATS[mode]
+        path = csv_path + suffix
+        if not _is_current(path, csv_path):
+            build(csv_path, path)
+
+    if os.path.getsize(path) <= max_bytes:
+        return path, maintype, subtype, None
+
+    # Still too big: keep the full export locally and send a trimmed summary
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    export_path = os.path.abspath(os.path.join(EXPORT_DIR, os.path.basename(csv_path)))
+    if not _is_current(export_path, csv_path):
+        shutil.copyfile(csv_path, export_path)
+        prune_files(EXPORT_DIR, ATTACHMENT_EXPORT_KEEP)
+    root, ext = os.path.splitext(csv_path)
+    trimmed_path = f"{root}_first{ATTACHMENT_PREVIEW_ROWS}{ext}"
+    if not _is_current(trimmed_path, csv_path):
+        _trim_csv(csv_path, trimmed_path, ATTACHMENT_PREVIEW_ROWS)
+    note = (f"The full report exceeds the {max_bytes / (1024 * 1024):.1f} MB attachment limit; "
+            f"attached are the first {ATTACHMENT_PREVIEW_ROWS} rows. Full export: {export_path}")
+    return trimmed_path, "text", "csv", note
+
+
+def build_summary_message(to_emails, subject, plain_body, html_body, csv_path):
+    """Build the report email with its CSV attachment (None if the CSV is missing)."""
+    try:
+        attach_path, maintype, subtype, note = prepare_attachment(csv_path)
+    except FileNotFoundError:
+        print(f"❌ CSV not found: {csv_path}")
+        return None
+
+    if note:
+        plain_body = f"{plain_body}\n{note}\n"
+        html_body = html_body.replace("</body>", f"<p><i>{html.escape(note)}</i></p></body>") \
+            if "</body>" in html_body else f"{html_body}<p><i>{html.escape(note)}</i></p>"
+
     msg = EmailMessage()
     msg["Subject"]  = subject
     msg["From"]     = f"TaskBot Reports <{EMAIL_ADDRESS}>"
@@ -25,64 +316,173 @@ def send_summary_email(to_emails, subject, plain_body, html_body, csv_path):
     # HTML version
     msg.add_alternative(html_body, subtype="html")
 
-    # Attach CSV
-    try:
-        with open(csv_path, "rb") as f:
-            file_data = f.read()
-            file_name = os.path.basename(csv_path)
-            msg.add_attachment(
-                file_data,
-                maintype="application",
-                subtype="octet-stream",
-                filename=file_name
-            )
-            print(f"📎 Attached CSV: {file_name} — Size: {len(file_data)} bytes")
-    except FileNotFoundError:
-        print(f"❌ CSV not found: {csv_path}")
+    # Attach the (possibly compressed or trimmed) report; it is bounded by ATTACHMENT_MAX_BYTES
+    with open(attach_path, "rb") as f:
+        file_data = f.read()
+    file_name = os.path.basename(attach_path)
+    msg.add_attachment(
+        file_data,
+        maintype=maintype,
+        subtype=subtype,
+        filename=file_name
+    )
+    print(f"📎 Attached {file_name} — Size: {len(file_data)} bytes")
+
+    return msg
+
+
+def send_summary_email(to_emails, subject, plain_body, html_body, csv_path, connection=None, dedup_key=None):
+    msg = build_summary_message(to_emails, subject, plain_body, html_body, csv_path)
+    if msg is None:
         return
 
-    # Send email
+    # Queued for the outbox worker; dedup_key (e.g. report and date) stops repeats
+    if OUTBOX_ENABLED:
+        try:
+            queue_message(msg, dedup_key)
+        except Exception as e:
+            print(f"❌ Failed to queue email: {e}")
+        return
+
+    # Send email over the shared session unless a batch connection is given
     try:
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465) as smtp:
-            smtp.login(EMAIL_ADDRESS, EMAIL_PASSWORD)
-            smtp.send_message(msg)
-        print(f"✅ Email sent to: {', '.join(to_emails)}")
+        latency = (connection or get_connection()).send(msg)
+        print(f"✅ Email sent to: {', '.join(to_emails)} ({latency * 1000:.0f} ms)")
+        log_event("email_sent", recipients=len(to_emails), subject=subject, seconds=round(latency, 6))
     except Exception as e:
         print(f"❌ Failed to send email: {e}")
 
-def generate_email_report(recipients):
+
+def send_batch(messages, connection=None, dedup_keys=None):
+    """Send prepared messages over one session and print per-message latency.
+
+    With the outbox enabled they are queued instead (latency None; a
+    duplicate dedup key is not an error).
+    """
+    if OUTBOX_ENABLED:
+        results = []
+        for msg, key in zip(messages, dedup_keys or [None] * len(messages)):
+            try:
+                queue_message(msg, key)
+                results.append((msg, None, None))
+            except Exception as err:
+                print(f"❌ Failed to queue email to {msg['To']}: {err}")
+                results.append((msg, None, err))
+        return results
+
+    results = (connection or get_connection()).send_batch(messages)
+    for msg, latency, error in results:
+        if error is None:
+            print(f"✅ Email sent to: {msg['To']} ({latency * 1000:.0f} ms)")
+            log_event("email_sent", recipients=len(msg["To"].split(",")), subject=msg["Subject"],
+                      seconds=round(latency, 6))
+        else:
+            print(f"❌ Failed to send email to {msg['To']}: {error}")
+    return results
+
+class ReportStats:
+    """Summary statistics accumulated one record at a time."""
+
+    def __init__(self):
+        self.total_tasks = 0
+        self.completed_tasks = 0
+        self.total_minutes = 0
+        self.by_status = Counter()
+        self.by_college = Counter()
+        self.minutes_by_college = Counter()
+
+    def add(self, record):
+        minutes = duration_minutes(record.get("time_spent"))
+        status = record.get("activity_status") or "Unknown"
+        college = record.get("college") or "Unknown"
+
+        self.total_tasks += 1
+        self.total_minutes += minutes
+        if status.lower() == "completed":
+            self.completed_tasks += 1
+        self.by_status[status] += 1
+        self.by_college[college] += 1
+        self.minutes_by_college[college] += minutes
+
+    @property
+    def total_hours(self):
+        return round(self.total_minutes / 60, 2)
+
+
+def stream_report(json_path, csv_path):
+    """Write csv_path from the records in json_path and return their ReportStats.
+
+    Records are decoded one at a time and written to the CSV in the same pass
+    that accumulates the statistics, so memory stays flat however large the
+    day is. The CSV columns come from the first record; keys that only appear
+    later are reported and left out. No CSV is written when there are no
+    records.
+    """
+    stats = ReportStats()
+    csvfile = writer = fields = None
+    extra_keys = set()
+    try:
+        with timed("email_report_csv") as info, open(json_path, "r", encoding="utf-8") as f:
+            for record in iter_items(iter(lambda: f.read(REPORT_READ_CHUNK), "")):
+                if writer is None:
+                    fields = sorted(record)
+                    field_set = set(fields)
+                    csvfile = open(csv_path, "w", newline="", encoding="utf-8")
+                    writer = csv.writer(csvfile)
+                    writer.writerow(fields)
+                if record.keys() != field_set:
+                    extra_keys.update(record.keys() - field_set)
+                writer.writerow([record.get(key) for key in fields])
+                stats.add(record)
+            info.update(rows=stats.total_tasks, bytes=os.path.getsize(json_path))
+    finally:
+        if csvfile is not None:
+            csvfile.close()
+    if extra_keys:
+        print(f"⚠️ Columns missing from the first record were left out of the CSV: {', '.join(sorted(extra_keys))}")
+    return stats
+
+
+def _breakdown_rows(stats, limit=REPORT_TOP_COLLEGES):
+    statuses = stats.by_status.most_common()
+    colleges = [(college, count, round(stats.minutes_by_college[college] / 60, 2))
+                for college, count in stats.by_college.most_common(limit)]
+    return statuses, colleges
+
+
+def generate_email_report(recipients, per_recipient=False):
     try:
         today_str = datetime.now().strftime("%Y-%m-%d")
         json_path = "data/task_data.json"
         csv_path  = f"task_{today_str}.csv"
 
-        # Load JSON
-        with open(json_path, "r", encoding="utf-8") as f:
-            payload = json.load(f)
-        rows = payload.get("data", payload)
+        # Reports already in the outbox for today are not rendered again
+        if per_recipient:
+            recipients = [r for r in recipients if not already_queued(f"daily_report:{today_str}:{r}")]
+        elif already_queued(f"daily_report:{today_str}:{','.join(sorted(recipients))}"):
+            recipients = []
+        if not recipients:
+            return
+
+        # Single pass: decode records, write the CSV and accumulate every statistic
+        stats = stream_report(json_path, csv_path)
 
-        if not rows:
+        if not stats.total_tasks:
             print("⚠️ No task data found.")
             return
 
-        # Write CSV
-        with open(csv_path, "w", newline="", encoding="utf-8") as csvfile:
-            headers = sorted({k for row in rows for k in row.keys()})
-            writer  = csv.DictWriter(csvfile, fieldnames=headers)
-            writer.writeheader()
-            for row in rows:
-                writer.writerow(row)
-
         print(f"✅ CSV generated: {csv_path}")
 
         # Summary stats
-        total_tasks     = len(rows)
-        completed_tasks = sum(1 for t in rows if t.get("activity_status","").lower()=="completed")
-        total_minutes   = sum(
-            int(t.get("time_spent","0").split(":")[0])
-            for t in rows if t.get("time_spent","")
-        )
-        total_hours     = round(total_minutes / 60, 2)
+        total_tasks     = stats.total_tasks
+        completed_tasks = stats.completed_tasks
+        total_hours     = stats.total_hours
+        statuses, colleges = _breakdown_rows(stats)
+        status_lines  = "\n".join(f"  {status}: {count}" for status, count in statuses)
+        college_lines = "\n".join(f"  {college}: {count} tasks, {hours} hours" for college, count, hours in colleges)
+        status_items  = "".join(f"<li>{html.escape(str(status))}: {count}</li>" for status, count in statuses)
+        college_items = "".join(f"<li>{html.escape(str(college))}: {count} tasks, {hours} hours</li>"
+                                for college, count, hours in colleges)
 
         # Email subject/body
         subject    = f"[Test] Daily Task Report — {today_str}"
@@ -93,6 +493,12 @@ Total Tasks:     {total_tasks}
 Completed Tasks: {completed_tasks}
 Total Time Spent: {total_hours} hours
 
+By status:
+{status_lines}
+
+Top colleges:
+{college_lines}
+
 See attached CSV for full details.
 """
 
@@ -106,6 +512,10 @@ See attached CSV for full details.
       <li><b>Completed Tasks:</b> {completed_tasks}</li>
       <li><b>Total Time Spent:</b> {total_hours} hours</li>
     </ul>
+    <h3>By Status</h3>
+    <ul>{status_items}</ul>
+    <h3>Top Colleges</h3>
+    <ul>{college_items}</ul>
     <p>Please refer to the attached CSV for full task details.</p>
     <p style="color:#777;">If this lands in spam, mark it “Not Spam” to improve delivery.</p>
     <p style="font-size:0.9em; color:#888;">Regards,<br/>TaskBot</p>
@@ -113,13 +523,20 @@ See attached CSV for full details.
 </html>
 """
 
-        # Send email
+        # Send email (one message per recipient goes out as a batch over one session)
+        if per_recipient:
+            messages = [(build_summary_message([r], subject, plain_body, html_body, csv_path), r) for r in recipients]
+            send_batch([msg for msg, _ in messages if msg is not None],
+                       dedup_keys=[f"daily_report:{today_str}:{r}" for msg, r in messages if msg is not None])
+            return
+
         send_summary_email(
             to_emails  = recipients,
             subject    = subject,
             plain_body = plain_body,
             html_body  = html_body,
-            csv_path   = csv_path  # Ensure csv_path is passed here
+            csv_path   = csv_path,  # Ensure csv_path is passed here
+            dedup_key  = f"daily_report:{today_str}:{','.join(sorted(recipients))}"
         )
 
     except Exception as e:
@@ -130,4 +547,5 @@ if __name__ == "__main__":
     recipients = [
         "jaychoubisa90@gmail.com"  # ✅ Best to avoid sending to your own Gmail sender here
     ]
-    generate_email_report(recipients)
\ No newline at end of file
+    generate_email_report(recipients)
+    flush_outbox()
\ No newline at end of file
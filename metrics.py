@@ -0,0 +1,183 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Structured event log: "off" (default), "stdout", or a file path (one JSON object per line)
+METRICS_LOG = os.getenv("METRICS_LOG", "off")
+
+# Port of this process's Prometheus text endpoint (0 disables it)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+# Prepended to every exported metric name
+METRICS_PREFIX = "task_dashboard_"
+
+# name -> (Prometheus type, help text)
+METRICS = {
+    "stage_seconds":        ("summary", "Wall time of a pipeline stage"),
+    "stage_rows_total":     ("counter", "Rows handled by a pipeline stage"),
+    "stage_bytes_total":    ("counter", "Payload bytes handled by a pipeline stage"),
+    "stage_errors_total":   ("counter", "Pipeline stage runs that raised"),
+    "section_seconds":      ("summary", "Wall time of a dashboard section run"),
+    "cache_requests_total": ("counter", "Dataset cache lookups by result (hit, stale, miss)"),
+    "smtp_send_seconds":    ("summary", "SMTP send latency per message"),
+    "smtp_errors_total":    ("counter", "SMTP sends that failed after retries"),
+    "scheduler_runs_total": ("counter", "Scheduled job runs by result (run, skipped)"),
+    "reports_sent_total":   ("counter", "Saved report emails by result (ok, failed)"),
+    "outbox_messages_total": ("counter", "Outbox messages by result (queued, duplicate, sent, retry, failed)"),
+    "outbox_delay_seconds": ("summary", "Time from queueing an email to its delivery"),
+}
+
+_lock = threading.Lock()
+_counters = {}     # (name, labels) -> value
+_summaries = {}    # (name, labels) -> [count, sum, max, last]
+_log_lock = threading.Lock()
+_server = None
+
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name, value=1, **labels):
+    """Add value to a counter."""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name, value, **labels):
+    """Record one observation (e.g. seconds) of a summary."""
+    key = _key(name, labels)
+    with _lock:
+        stats = _summaries.get(key)
+        if stats is None:
+            _summaries[key] = [1, value, value, value]
+        else:
+            stats[0] += 1
+            stats[1] += value
+            stats[2] = max(stats[2], value)
+            stats[3] = value
+
+
+def log_event(event, **fields):
+    """Write one structured log line (see METRICS_LOG)."""
+    if METRICS_LOG == "off":
+        return
+    line = json.dumps({"ts": round(time.time(), 3), "event": event, "pid": os.getpid(), **fields}, default=str)
+    with _log_lock:
+        if METRICS_LOG == "stdout":
+            print(line, flush=True)
+        else:
+            with open(METRICS_LOG, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+@contextmanager
+def timed(stage, **labels):
+    """Time a block as stage; the yielded dict takes "rows" and "bytes" to record too."""
+    info = {}
+    started = time.perf_counter()
+    ok = True
+    try:
+        yield info
+    except GeneratorExit:
+        # A generator's consumer stopped early; not a failure
+        raise
+    except BaseException:
+        ok = False
+        inc("stage_errors_total", stage=stage, **labels)
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        observe("stage_seconds", seconds, stage=stage, **labels)
+        if "rows" in info:
+            inc("stage_rows_total", info["rows"], stage=stage, **labels)
+        if "bytes" in info:
+            inc("stage_bytes_total", info["bytes"], stage=stage, **labels)
+        log_event("stage", stage=stage, seconds=round(seconds, 6), ok=ok, **labels, **info)
+
+
+def snapshot():
+    """Every metric as a list of dicts (name, labels and values), for display."""
+    with _lock:
+        counters = list(_counters.items())
+        summaries = [(key, list(stats)) for key, stats in _summaries.items()]
+    rows = [{"metric": name, "labels": dict(labels), "count": None, "total": value,
+             "avg": None, "max": None, "last": None}
+            for (name, labels), value in counters]
+    rows += [{"metric": name, "labels": dict(labels), "count": count, "total": total,
+              "avg": total / count, "max": peak, "last": last}
+             for (name, labels), (count, total, peak, last) in summaries]
+    return sorted(rows, key=lambda row: (row["metric"], sorted(row["labels"].items())))
+
+
+def _labels_text(labels):
+    if not labels:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in labels)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + "}"
+
+
+def render_prometheus():
+    """All metrics in the Prometheus text exposition format."""
+    with _lock:
+        counters = dict(_counters)
+        summaries = {key: list(stats) for key, stats in _summaries.items()}
+
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        full = METRICS_PREFIX + name
+        if kind == "counter":
+            series = [(labels, value) for (n, labels), value in counters.items() if n == name]
+            if not series:
+                continue
+            lines += [f"# HELP {full} {help_text}", f"# TYPE {full} counter"]
+            lines += [f"{full}{_labels_text(labels)} {value}" for labels, value in sorted(series)]
+        else:
+            series = [(labels, stats) for (n, labels), stats in summaries.items() if n == name]
+            if not series:
+                continue
+            lines += [f"# HELP {full} {help_text}", f"# TYPE {full} summary"]
+            for labels, (count, total, peak, last) in sorted(series):
+                text = _labels_text(labels)
+                lines += [f"{full}_count{text} {count}", f"{full}_sum{text} {total}"]
+            lines += [f"# TYPE {full}_max gauge"]
+            lines += [f"{full}_max{_labels_text(labels)} {stats[2]}" for labels, stats in sorted(series)]
+    return "\n".join(lines) + "\n"
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve_metrics(port=METRICS_PORT):
+    """Start this process's /metrics endpoint once (no-op when port is 0)."""
+    global _server
+    with _lock:
+        if _server is not None or not port:
+            return _server
+        try:
+            _server = ThreadingHTTPServer(("0.0.0.0", port), _Handler)
+        except OSError as e:
+            print(f"⚠️ Metrics endpoint not started on port {port}: {e}")
+            return None
+        _server.daemon_threads = True
+    threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+    print(f"📡 Metrics on http://0.0.0.0:{port}/metrics")
+    return _server
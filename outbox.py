@@ -0,0 +1,279 @@
+import os
+import random
+import threading
+import time
+from email import message_from_bytes, policy
+
+from metrics import inc, log_event, observe
+from sqlite_store import OWNER, connect
+
+# Finished report emails wait here until a worker delivers them; shared by
+# every dashboard process and scheduler.py on this machine
+OUTBOX_DIR = os.path.join("data", "outbox")
+OUTBOX_DB = os.path.join(OUTBOX_DIR, "outbox.sqlite")
+
+# Token bucket shared by all workers: sustained sends per minute, and how many may go out back to back
+OUTBOX_RATE_PER_MINUTE = float(os.getenv("OUTBOX_RATE_PER_MINUTE", "20"))
+OUTBOX_BURST = int(os.getenv("OUTBOX_BURST", "5"))
+
+# Failed sends are retried after OUTBOX_BACKOFF_SECONDS, doubling each time up to OUTBOX_MAX_BACKOFF
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "6"))
+OUTBOX_BACKOFF_SECONDS = float(os.getenv("OUTBOX_BACKOFF_SECONDS", "30"))
+OUTBOX_MAX_BACKOFF = float(os.getenv("OUTBOX_MAX_BACKOFF", "3600"))
+
+# How often an idle worker looks for new messages
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", "5"))
+
+# A message claimed longer ago than this (its worker died mid-send) is sent again
+LEASE_SECONDS = 300
+
+# Sent messages are forgotten after this; their dedup keys block repeats until then
+RETENTION_SECONDS = 7 * 24 * 3600
+
+OUTBOX_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS messages ("
+    "id INTEGER PRIMARY KEY AUTOINCREMENT, dedup_key TEXT UNIQUE, subject TEXT, recipients TEXT, "
+    "message BLOB NOT NULL, status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, "
+    "next_attempt REAL NOT NULL, last_error TEXT, owner TEXT, lease_until REAL, "
+    "created_at REAL NOT NULL, sent_at REAL)",
+    "CREATE INDEX IF NOT EXISTS messages_due ON messages (status, next_attempt)",
+    "CREATE TABLE IF NOT EXISTS bucket ("
+    "id INTEGER PRIMARY KEY CHECK (id = 0), tokens REAL NOT NULL, updated REAL NOT NULL)",
+]
+
+
+def _connect():
+    return connect(OUTBOX_DB, OUTBOX_SCHEMA)
+
+
+def enqueue(msg, dedup_key=None):
+    """Store a finished EmailMessage for delivery; False if dedup_key was already queued or sent.
+
+    A key whose earlier message failed for good is queued again.
+    """
+    now = time.time()
+    conn = _connect()
+    try:
+        cursor = conn.execute(
+            "INSERT INTO messages (dedup_key, subject, recipients, message, status, next_attempt, created_at) "
+            "VALUES (?, ?, ?, ?, 'pending', ?, ?) "
+            "ON CONFLICT (dedup_key) DO UPDATE SET subject = excluded.subject, "
+            "recipients = excluded.recipients, message = excluded.message, status = 'pending', "
+            "attempts = 0, next_attempt = excluded.next_attempt, last_error = NULL, owner = NULL, "
+            "lease_until = NULL, created_at = excluded.created_at, sent_at = NULL "
+            "WHERE messages.status = 'failed'",
+            (dedup_key, msg["Subject"], msg["To"], msg.as_bytes(), now, now),
+        )
+        queued = cursor.rowcount > 0
+    finally:
+        conn.close()
+    inc("outbox_messages_total", result="queued" if queued else "duplicate")
+    log_event("outbox_enqueue", subject=msg["Subject"], dedup_key=dedup_key, queued=queued)
+    return queued
+
+
+def exists(dedup_key):
+    """True if a message with dedup_key is queued or sent (one that failed for good does not count)."""
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT 1 FROM messages WHERE dedup_key = ? AND status != 'failed'",
+                           (dedup_key,)).fetchone()
+    finally:
+        conn.close()
+    return row is not None
+
+
+def claim_next(now=None):
+    """Claim the oldest due message for this process; (id, EmailMessage, attempts, created_at) or None."""
+    now = now or time.time()
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute(
+            "SELECT id, message, attempts, created_at FROM messages "
+            "WHERE (status = 'pending' AND next_attempt <= ?) OR (status = 'sending' AND lease_until < ?) "
+            "ORDER BY next_attempt LIMIT 1",
+            (now, now),
+        ).fetchone()
+        if row is not None:
+            conn.execute(
+                "UPDATE messages SET status = 'sending', owner = ?, lease_until = ? WHERE id = ?",
+                (OWNER, now + LEASE_SECONDS, row[0]),
+            )
+        conn.execute("DELETE FROM messages WHERE status = 'sent' AND sent_at < ?", (now - RETENTION_SECONDS,))
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    return row[0], message_from_bytes(row[1], policy=policy.default), row[2], row[3]
+
+
+def release(message_id):
+    """Put a claimed message back unsent (e.g. the worker is stopping)."""
+    conn = _connect()
+    try:
+        conn.execute("UPDATE messages SET status = 'pending', owner = NULL, lease_until = NULL "
+                     "WHERE id = ? AND owner = ?", (message_id, OWNER))
+    finally:
+        conn.close()
+
+
+def mark_sent(message_id):
+    conn = _connect()
+    try:
+        conn.execute("UPDATE messages SET status = 'sent', sent_at = ?, message = x'', lease_until = NULL "
+                     "WHERE id = ?", (time.time(), message_id))
+    finally:
+        conn.close()
+
+
+def backoff_seconds(attempts):
+    """Delay before retry number attempts, with jitter so retries from a burst spread out."""
+    delay = min(OUTBOX_MAX_BACKOFF, OUTBOX_BACKOFF_SECONDS * 2 ** (attempts - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+
+def mark_failed(message_id, attempts, error, permanent=False):
+    """Schedule a retry with backoff, or give up after OUTBOX_MAX_ATTEMPTS; True if it will be retried."""
+    retry = not permanent and attempts < OUTBOX_MAX_ATTEMPTS
+    conn = _connect()
+    try:
+        conn.execute(
+            "UPDATE messages SET status = ?, attempts = ?, next_attempt = ?, last_error = ?, "
+            "lease_until = NULL WHERE id = ?",
+            ("pending" if retry else "failed", attempts,
+             time.time() + (backoff_seconds(attempts) if retry else 0), str(error), message_id),
+        )
+    finally:
+        conn.close()
+    return retry
+
+
+def take_token(rate_per_minute=OUTBOX_RATE_PER_MINUTE, burst=OUTBOX_BURST):
+    """Take one send from the shared token bucket; 0 if taken, else seconds until one is available."""
+    rate = rate_per_minute / 60
+    now = time.time()
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute("SELECT tokens, updated FROM bucket WHERE id = 0").fetchone()
+        tokens = burst if row is None else min(burst, row[0] + (now - row[1]) * rate)
+        wait = 0 if tokens >= 1 else (1 - tokens) / rate
+        if not wait:
+            tokens -= 1
+        conn.execute("INSERT OR REPLACE INTO bucket (id, tokens, updated) VALUES (0, ?, ?)", (tokens, now))
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+    return wait
+
+
+def seconds_until_due(now=None):
+    """Seconds until the next pending message is due (None if nothing is pending)."""
+    now = now or time.time()
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT MIN(next_attempt) FROM messages WHERE status = 'pending'").fetchone()
+    finally:
+        conn.close()
+    return None if row[0] is None else max(0.0, row[0] - now)
+
+
+def outbox_counts():
+    """Number of messages per status (pending, sending, sent, failed)."""
+    conn = _connect()
+    try:
+        return dict(conn.execute("SELECT status, COUNT(*) FROM messages GROUP BY status").fetchall())
+    finally:
+        conn.close()
+
+
+def retry_failed():
+    """Queue every message that failed for good again; returns how many."""
+    conn = _connect()
+    try:
+        cursor = conn.execute("UPDATE messages SET status = 'pending', attempts = 0, next_attempt = ? "
+                              "WHERE status = 'failed'", (time.time(),))
+        return cursor.rowcount
+    finally:
+        conn.close()
+
+
+def deliver_next(send, is_permanent=lambda err: False, stopped=None):
+    """Send the next due message under the rate limit.
+
+    send(msg) delivers one EmailMessage; is_permanent(err) says whether a
+    failure is worth retrying. Returns True if a message was handled and
+    False when nothing is due.
+    """
+    claimed = claim_next()
+    if claimed is None:
+        return False
+    message_id, msg, attempts, created_at = claimed
+
+    wait = take_token()
+    while wait:
+        if stopped is not None and stopped.wait(wait):
+            release(message_id)
+            return False
+        if stopped is None:
+            time.sleep(wait)
+        wait = take_token()
+
+    try:
+        send(msg)
+    except Exception as err:
+        attempts += 1
+        if mark_failed(message_id, attempts, err, permanent=is_permanent(err)):
+            inc("outbox_messages_total", result="retry")
+            print(f"⚠️ Email to {msg['To']} failed (attempt {attempts}), will retry: {err}")
+        else:
+            inc("outbox_messages_total", result="failed")
+            print(f"❌ Gave up on email to {msg['To']} after {attempts} attempt(s): {err}")
+        log_event("outbox_error", subject=msg["Subject"], attempts=attempts, error=str(err))
+        return True
+
+    mark_sent(message_id)
+    inc("outbox_messages_total", result="sent")
+    observe("outbox_delay_seconds", time.time() - created_at)
+    print(f"✅ Email sent to: {msg['To']}")
+    log_event("email_sent", recipients=len(msg["To"].split(",")), subject=msg["Subject"])
+    return True
+
+
+def flush(send, is_permanent=lambda err: False):
+    """Deliver everything due now (rate limited) and return how many were handled.
+
+    Messages waiting out a retry backoff stay queued for the next worker.
+    """
+    handled = 0
+    while deliver_next(send, is_permanent):
+        handled += 1
+    return handled
+
+
+class OutboxWorker(threading.Thread):
+    """Daemon thread that drains the outbox, sleeping while nothing is due."""
+
+    def __init__(self, send, is_permanent=lambda err: False, poll_seconds=OUTBOX_POLL_SECONDS):
+        super().__init__(name="outbox", daemon=True)
+        self.send = send
+        self.is_permanent = is_permanent
+        self.poll_seconds = poll_seconds
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            try:
+                if deliver_next(self.send, self.is_permanent, self.stopped):
+                    continue
+                due = seconds_until_due()
+                wait = self.poll_seconds if due is None else min(self.poll_seconds, max(due, 0.05))
+            except Exception as e:
+                print(f"⚠️ Outbox worker error: {e}")
+                wait = self.poll_seconds
+            self.stopped.wait(wait)
+
+    def stop(self):
+        self.stopped.set()
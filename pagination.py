@@ -0,0 +1,58 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+# Page sizes offered by the Detailed Task View
+PAGE_SIZES = [25, 50, 100, 250, 500]
+
+# Long text is cut to this many characters until its row is expanded
+PREVIEW_CHARS = 80
+
+
+def sort_keys(series):
+    """Integer keys ordering series ascending, with missing values as -1.
+
+    Categorical columns rank their categories instead of the rows, so
+    sorting a million rows costs one argsort over a few thousand labels.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = series.cat.categories
+        rank = np.empty(len(categories), dtype=np.int64)
+        rank[np.argsort(categories.astype(str))] = np.arange(len(categories))
+        codes = series.cat.codes.to_numpy()
+        return np.where(codes >= 0, rank[codes.clip(0)], -1), len(categories)
+    codes, uniques = pd.factorize(series, sort=True)
+    return codes, len(uniques)
+
+
+def sort_order(df, column, ascending=True):
+    """Row positions of df sorted by column, missing values last, ties in row order."""
+    keys, distinct = sort_keys(df[column])
+    if not ascending:
+        keys = np.where(keys >= 0, distinct - 1 - keys, -1)
+    keys = np.where(keys >= 0, keys, distinct)
+    return np.argsort(keys, kind="stable")
+
+
+def page_count(total, page_size):
+    return max(1, math.ceil(total / page_size))
+
+
+def page_bounds(total, page_size, page):
+    """(start, stop) row offsets of a 1-based page, clamped to the last page."""
+    page = min(max(page, 1), page_count(total, page_size))
+    start = (page - 1) * page_size
+    return start, min(start + page_size, total)
+
+
+def truncate(frame, columns, limit=PREVIEW_CHARS):
+    """Copy of a (page-sized) frame with long text in columns cut to limit characters."""
+    frame = frame.copy()
+    for col in columns:
+        if col not in frame.columns:
+            continue
+        text = frame[col].astype("string")
+        long = (text.str.len() > limit).fillna(False)
+        frame[col] = text.where(~long, text.str.slice(0, limit - 1) + "…")
+    return frame
@@ -0,0 +1,300 @@
+import re
+from functools import lru_cache
+from operator import itemgetter
+
+import pandas as pd
+import numpy as np
+
+from metrics import timed
+
+# Columns added by process_records that are not part of the API payload
+DERIVED_COLUMNS = ["time_spent_minutes"]
+
+# Date formats seen from the get_task_activity API, most likely first
+DATE_FORMATS = ["%Y-%m-%d %H:%M:%S", "%Y-%m-%d", "%d-%m-%Y %H:%M:%S", "%d-%m-%Y"]
+
+# MySQL "zero date" sentinels the API uses for missing dates
+NULL_DATES = ["0000-00-00 00:00:00", "0000-00-00"]
+
+# "H:MM" or "H:MM:SS"
+DURATION_PATTERN = r"^\s*(\d+):(\d{1,2})(?::(\d{1,2}))?\s*$"
+
+_DURATION_RE = re.compile(DURATION_PATTERN)
+
+# Number of distinct values used to pick a date format
+FORMAT_SAMPLE_SIZE = 200
+
+# Strings the API uses for missing values
+NULL_TOKENS = ["null", "NULL", "None", ""]
+
+# Declared dtypes for the get_task_activity payload. IDs become compact
+# nullable integers, repeated text becomes category, free text stays string
+# and dates are left to parse_dates.
+TASK_SCHEMA = {
+    "id":              "UInt32",
+    "user_id":         "UInt32",
+    "activity_type":   "category",
+    "activity_status": "category",
+    "project":         "UInt32",
+    "team":            "UInt32",
+    "task_title":      "category",
+    "remark":          "string",
+    "current_task":    "string",
+    "time_spent":      "category",
+    "created_date":    "datetime",
+    "updated_date":    "datetime",
+    "college":         "category",
+    "college_id":      "category",
+    "email":           "category",
+    "mobile":          "category",
+    "uname":           "category",
+    "lastname":        "category",
+    "fullName":        "category",
+}
+
+
+# Keys of a get_task_activity record, in API order
+RECORD_KEYS = list(TASK_SCHEMA)
+
+
+def _to_category(series):
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype("category")
+    # Null tokens are dropped from the categories, which turns their rows into NaN
+    tokens = [token for token in NULL_TOKENS if token in series.cat.categories]
+    return series.cat.remove_categories(tokens) if tokens else series
+
+
+def _cast_integer(numbers, series, dtype):
+    # IDs outside dtype's range (negative, or 2**32 and up for UInt32) widen to
+    # Int64 instead of failing the whole batch or wrapping around
+    limits = np.iinfo(pd.api.types.pandas_dtype(dtype).numpy_dtype)
+    present = numbers.dropna()
+    if len(present) and (present.min() < limits.min or present.max() > limits.max):
+        dtype = "Int64"
+    try:
+        return numbers.astype(dtype)
+    except (TypeError, ValueError, OverflowError):
+        return _to_category(series.astype(str))
+
+
+def _to_integer(series, dtype):
+    if pd.api.types.is_integer_dtype(series.dtype):
+        return _cast_integer(series, series, dtype)
+    if pd.api.types.is_object_dtype(series.dtype) and pd.api.types.infer_dtype(series, skipna=False) == "string":
+        # All text and no nulls (the usual payload): parse in one C-level pass
+        try:
+            numbers = series.to_numpy().astype(np.int64)
+            return _cast_integer(pd.Series(numbers, index=series.index, name=series.name), series, dtype)
+        except (ValueError, OverflowError):
+            pass
+    values = series.mask(series.isin(NULL_TOKENS))
+    numbers = pd.to_numeric(values.astype(object), errors="coerce")
+    # Keep non-numeric payloads readable instead of silently dropping them
+    if numbers.notna().sum() < values.notna().sum() or (numbers.dropna() % 1 != 0).any():
+        return _to_category(series)
+    return _cast_integer(numbers, series, dtype)
+
+
+def apply_schema(df, schema=TASK_SCHEMA):
+    """Cast columns to their declared compact dtypes, normalizing null tokens in the same pass.
+
+    Columns missing from the schema keep their dtype; text ones only get null
+    tokens replaced. Safe to call again on an already converted frame.
+    """
+    for col in df.columns:
+        dtype = schema.get(col)
+        series = df[col]
+        if dtype == "datetime":
+            continue
+        if dtype == "category":
+            df[col] = _to_category(series)
+        elif dtype in ("UInt8", "UInt16", "UInt32", "UInt64", "Int32", "Int64"):
+            df[col] = _to_integer(series, dtype)
+        elif dtype == "string" or pd.api.types.is_object_dtype(series.dtype) \
+                or pd.api.types.is_string_dtype(series.dtype):
+            series = series.mask(series.isin(NULL_TOKENS))
+            df[col] = series.astype(dtype) if dtype else series
+    return df
+
+
+def parse_durations(series):
+    """Vectorized time_spent to minutes: "H:MM" and "H:MM:SS" parse, anything else is 0.
+
+    Every distinct value is parsed once and broadcast back to the rows, so
+    heavily repeated durations cost a single regex match each. Seconds are
+    rounded to the nearest minute.
+    """
+    codes, uniques = pd.factorize(series)
+    parts = pd.Series(uniques, dtype=object).astype(str).str.extract(DURATION_PATTERN)
+    hours, mins, secs = (pd.to_numeric(parts[i], errors="coerce") for i in range(3))
+    minutes = hours * 60 + mins + (secs.fillna(0) >= 30)
+    minutes = minutes.fillna(0).astype("int64").to_numpy()
+
+    # Code -1 (missing value) picks the trailing 0
+    return pd.Series(np.append(minutes, 0)[codes], index=series.index, name=series.name)
+
+
+@lru_cache(maxsize=4096)
+def duration_minutes(value):
+    """Scalar twin of parse_durations for record-at-a-time callers (cached per value)."""
+    match = _DURATION_RE.match(value) if isinstance(value, str) else None
+    if not match:
+        return 0
+    hours, mins, secs = match.groups()
+    return int(hours) * 60 + int(mins) + (int(secs or 0) >= 30)
+
+
+def infer_date_format(values, formats=DATE_FORMATS):
+    """Pick the format in formats that parses most of a sample of values (None if none do)."""
+    sample = values.dropna()
+    sample = sample.iloc[:FORMAT_SAMPLE_SIZE]
+    best_format, best_count = None, 0
+    for fmt in formats:
+        count = pd.to_datetime(sample, format=fmt, errors="coerce").notna().sum()
+        if count > best_count:
+            best_format, best_count = fmt, count
+            if count == len(sample):
+                break
+    return best_format
+
+
+def parse_dates(series, formats=DATE_FORMATS):
+    """Vectorized date parsing with format inference, cached per distinct value.
+
+    The dominant format is inferred from a sample and applied in one pass;
+    values it rejects are retried against the remaining formats. Zero-date
+    sentinels and unparseable values become NaT.
+    """
+    codes, uniques = pd.factorize(series)
+    values = pd.Series(uniques, dtype=object).astype(str).str.strip()
+    values = values.mask(values.isin(NULL_DATES))
+
+    parsed = pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns]")
+    fmt = infer_date_format(values, formats)
+    remaining = [f for f in formats if f != fmt]
+    for candidate in [fmt] + remaining if fmt else []:
+        todo = parsed.isna() & values.notna()
+        if not todo.any():
+            break
+        parsed[todo] = pd.to_datetime(values[todo], format=candidate, errors="coerce")
+
+    # Code -1 (missing value) picks the trailing NaT
+    result = np.append(parsed.to_numpy(), np.datetime64("NaT", "ns"))
+    return pd.Series(result[codes], index=series.index, name=series.name)
+
+
+def concat_frames(frames):
+    """Concatenate processed frames, unifying category sets so columns stay categorical."""
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame()
+    if len(frames) > 1:
+        category_cols = {
+            col for frame in frames for col in frame.columns
+            if isinstance(frame[col].dtype, pd.CategoricalDtype)
+        }
+        dtypes = {}
+        for col in category_cols:
+            values = set()
+            for frame in frames:
+                if col in frame.columns:
+                    series = frame[col]
+                    values.update(series.cat.categories if isinstance(series.dtype, pd.CategoricalDtype)
+                                  else series.dropna().unique())
+            dtypes[col] = pd.CategoricalDtype(sorted(values, key=str))
+        frames = [frame.astype({col: dtype for col, dtype in dtypes.items() if col in frame.columns})
+                  for frame in frames]
+    return apply_schema(pd.concat(frames, ignore_index=True))
+
+
+def record_fields(records, keys=RECORD_KEYS):
+    """Keys present in any record: those of keys in order, then any others sorted."""
+    present = set().union(*map(dict.keys, records))
+    return [key for key in keys if key in present] + sorted(present.difference(keys), key=str)
+
+
+def _column(records, key):
+    # One C-level pass per key; a record without the key falls back to .get
+    try:
+        return np.fromiter(map(itemgetter(key), records), dtype=object, count=len(records))
+    except KeyError:
+        return np.fromiter((record.get(key) for record in records), dtype=object, count=len(records))
+
+
+def _frame(columns, schema=TASK_SCHEMA):
+    # Known columns stay objects for apply_schema, which skips pandas' slow
+    # per-column type inference; unknown ones get the dtype pandas infers
+    df = pd.DataFrame({key: values for key, values in columns.items() if key in schema},
+                      dtype=object, copy=False)
+    for key, values in columns.items():
+        if key not in schema:
+            df[key] = pd.Series(list(values))
+    return df
+
+
+def records_to_frame(records, keys=RECORD_KEYS):
+    """Build a DataFrame from flat records column by column, without json_normalize.
+
+    When every record has exactly the known keys each column is a single
+    itemgetter pass. Otherwise columns come from every key any record has,
+    and records missing one get None. Values are kept as they are (nested
+    dicts are not flattened).
+    """
+    if not records:
+        return pd.DataFrame()
+    if set(map(len, records)) == {len(keys)}:
+        try:
+            return _frame({key: np.fromiter(map(itemgetter(key), records), dtype=object, count=len(records))
+                           for key in keys})
+        except KeyError:
+            pass  # Same number of keys, but not the same keys
+    return _frame({key: _column(records, key) for key in record_fields(records, keys)})
+
+
+def process_records(records):
+    """Process a list of flat API records into a typed DataFrame."""
+    with timed("process") as info:
+        info["rows"] = len(records)
+        df = records_to_frame(records)
+
+        # Compact dtypes and null normalization in one pass over the columns
+        df = apply_schema(df)
+
+        # Convert date fields to datetime
+        date_columns = ["created_date", "updated_date"]
+        for col in date_columns:
+            if col in df.columns:
+                df[col] = parse_dates(df[col])
+
+        # Convert time_spent to minutes for easier analysis
+        if "time_spent" in df.columns:
+            df["time_spent_minutes"] = parse_durations(df["time_spent"])
+
+        return df
+
+
+def process_batches(batches):
+    """Process record batches one at a time and concatenate the compact results.
+
+    Each batch's dicts can be freed as soon as it is converted, so peak memory
+    stays near the size of the final frame.
+    """
+    return concat_frames([process_records(batch) for batch in batches])
+
+
+# Function to convert time strings like "4:30" to minutes
+def convert_time_to_minutes(time_str):
+    try:
+        if pd.isnull(time_str) or time_str == "":
+            return 0
+        
+        parts = time_str.split(":")
+        if len(parts) == 2:
+            hours = int(parts[0])
+            minutes = int(parts[1])
+            return hours * 60 + minutes
+        else:
+            return 0
+    except:
+        return 0
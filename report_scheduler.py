@@ -0,0 +1,268 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from apscheduler.executors.base import run_job
+from apscheduler.executors.pool import ThreadPoolExecutor
+from apscheduler.job import Job
+from apscheduler.jobstores.base import BaseJobStore, ConflictingIdError, JobLookupError
+from apscheduler.jobstores.memory import MemoryJobStore
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.util import datetime_to_utc_timestamp, utc_timestamp_to_datetime
+
+from metrics import inc, timed
+from reports import load_reports, report_schedule
+from sqlite_store import OWNER, connect
+
+# Shared by every dashboard process and scheduler.py on this machine
+SCHEDULER_DIR = os.path.join("data", "scheduler")
+SCHEDULER_DB = os.path.join(SCHEDULER_DIR, "jobs.sqlite")
+
+# A run missed by less than this (e.g. during a restart) still happens, once
+MISFIRE_GRACE_SECONDS = int(os.getenv("SCHEDULER_MISFIRE_GRACE", "3600"))
+
+# How often a scheduler re-reads the store for jobs other processes added
+POLL_SECONDS = int(os.getenv("SCHEDULER_POLL_SECONDS", "60"))
+
+# Claims older than this are forgotten
+CLAIM_RETENTION_SECONDS = 7 * 24 * 3600
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+SCHEDULER_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS jobs ("
+    "id TEXT PRIMARY KEY, next_run_time REAL, job_state BLOB NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS jobs_next_run_time ON jobs (next_run_time)",
+    "CREATE TABLE IF NOT EXISTS claims ("
+    "job_id TEXT NOT NULL, run_time REAL NOT NULL, owner TEXT NOT NULL, claimed_at REAL NOT NULL, "
+    "PRIMARY KEY (job_id, run_time))",
+]
+
+
+def _connect():
+    return connect(SCHEDULER_DB, SCHEDULER_SCHEMA)
+
+
+class SQLiteJobStore(BaseJobStore):
+    """APScheduler job store in a local SQLite file, modelled on SQLAlchemyJobStore.
+
+    Jobs survive restarts and are visible to every process using the file.
+    Job functions must be importable ("module:function") and their
+    arguments picklable, so jobs carry ids of saved definitions, not data.
+    """
+
+    def lookup_job(self, job_id):
+        conn = _connect()
+        try:
+            row = conn.execute("SELECT job_state FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        finally:
+            conn.close()
+        return self._reconstitute_job(row[0]) if row else None
+
+    def get_due_jobs(self, now):
+        return self._get_jobs("WHERE next_run_time <= ?", (datetime_to_utc_timestamp(now),))
+
+    def get_next_run_time(self):
+        conn = _connect()
+        try:
+            row = conn.execute(
+                "SELECT next_run_time FROM jobs WHERE next_run_time IS NOT NULL "
+                "ORDER BY next_run_time LIMIT 1"
+            ).fetchone()
+        finally:
+            conn.close()
+        return utc_timestamp_to_datetime(row[0]) if row else None
+
+    def get_all_jobs(self):
+        jobs = self._get_jobs()
+        self._fix_paused_jobs_sorting(jobs)
+        return jobs
+
+    def add_job(self, job):
+        conn = _connect()
+        try:
+            conn.execute(
+                "INSERT INTO jobs (id, next_run_time, job_state) VALUES (?, ?, ?)",
+                (job.id, datetime_to_utc_timestamp(job.next_run_time), pickle.dumps(job.__getstate__())),
+            )
+        except sqlite3.IntegrityError:
+            raise ConflictingIdError(job.id)
+        finally:
+            conn.close()
+
+    def update_job(self, job):
+        conn = _connect()
+        try:
+            cur = conn.execute(
+                "UPDATE jobs SET next_run_time = ?, job_state = ? WHERE id = ?",
+                (datetime_to_utc_timestamp(job.next_run_time), pickle.dumps(job.__getstate__()), job.id),
+            )
+        finally:
+            conn.close()
+        if cur.rowcount == 0:
+            raise JobLookupError(job.id)
+
+    def remove_job(self, job_id):
+        conn = _connect()
+        try:
+            cur = conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        finally:
+            conn.close()
+        if cur.rowcount == 0:
+            raise JobLookupError(job_id)
+
+    def remove_all_jobs(self):
+        conn = _connect()
+        try:
+            conn.execute("DELETE FROM jobs")
+        finally:
+            conn.close()
+
+    def _reconstitute_job(self, job_state):
+        job_state = pickle.loads(job_state)
+        job_state["jobstore"] = self
+        job = Job.__new__(Job)
+        job.__setstate__(job_state)
+        job._scheduler = self._scheduler
+        job._jobstore_alias = self._alias
+        return job
+
+    def _get_jobs(self, where="", params=()):
+        conn = _connect()
+        try:
+            rows = conn.execute(f"SELECT id, job_state FROM jobs {where} ORDER BY next_run_time", params).fetchall()
+            jobs, failed = [], []
+            for job_id, job_state in rows:
+                try:
+                    jobs.append(self._reconstitute_job(job_state))
+                except BaseException:
+                    self._logger.exception('Unable to restore job "%s" -- removing it', job_id)
+                    failed.append(job_id)
+            if failed:
+                conn.executemany("DELETE FROM jobs WHERE id = ?", [(job_id,) for job_id in failed])
+        finally:
+            conn.close()
+        return jobs
+
+
+def claim_run(job_id, run_time):
+    """Record that this process runs job_id's run_time; False if another process already did."""
+    conn = _connect()
+    try:
+        now = time.time()
+        cur = conn.execute(
+            "INSERT OR IGNORE INTO claims (job_id, run_time, owner, claimed_at) VALUES (?, ?, ?, ?)",
+            (job_id, datetime_to_utc_timestamp(run_time), OWNER, now),
+        )
+        conn.execute("DELETE FROM claims WHERE claimed_at < ?", (now - CLAIM_RETENTION_SECONDS,))
+        return cur.rowcount == 1
+    finally:
+        conn.close()
+
+
+def _run_claimed_job(job, jobstore_alias, run_times, logger_name):
+    # Every scheduler sharing the store sees the same due run times; only the
+    # first to claim one runs it. Process-local jobs need no claim.
+    if jobstore_alias != "default":
+        return run_job(job, jobstore_alias, run_times, logger_name)
+    claimed = [run_time for run_time in run_times if claim_run(job.id, run_time)]
+    if not claimed:
+        inc("scheduler_runs_total", job=job.id, result="skipped")
+        return []
+    inc("scheduler_runs_total", job=job.id, result="run")
+    with timed("scheduled_job", job=job.id):
+        return run_job(job, jobstore_alias, claimed, logger_name)
+
+
+class ClaimingExecutor(ThreadPoolExecutor):
+    """Thread pool executor that runs each scheduled time at most once across processes."""
+
+    def _do_submit_job(self, job, run_times):
+        def callback(f):
+            exc = f.exception()
+            if exc:
+                self._run_job_error(job.id, exc, exc.__traceback__)
+            else:
+                self._run_job_success(job.id, f.result())
+
+        f = self._pool.submit(_run_claimed_job, job, job._jobstore_alias, run_times, self._logger.name)
+        f.add_done_callback(callback)
+
+
+def _poll():
+    # No-op: running it makes the scheduler re-read the shared store
+    pass
+
+
+def build_scheduler(scheduler_class=BackgroundScheduler):
+    """A scheduler on the shared job store, with coalescing and misfire handling."""
+    scheduler = scheduler_class(
+        jobstores={"default": SQLiteJobStore(), "local": MemoryJobStore()},
+        executors={"default": ClaimingExecutor(max_workers=4)},
+        job_defaults={
+            "coalesce": True,                 # a backlog of missed runs fires once
+            "misfire_grace_time": MISFIRE_GRACE_SECONDS,
+            "max_instances": 1,
+        },
+    )
+    scheduler.add_job(_poll, "interval", seconds=POLL_SECONDS, id="poll", jobstore="local")
+    return scheduler
+
+
+def get_scheduler():
+    """The process-wide scheduler, started on first use and shared by every session."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = build_scheduler()
+            _scheduler.start()
+        return _scheduler
+
+
+def ensure_job(scheduler, func, trigger, job_id, args=(), name=None):
+    """Add job_id to the shared store unless it is already there unchanged.
+
+    Re-adding an unchanged job would move its next run past one missed
+    while no scheduler was up, and that run would never fire as a misfire.
+    Returns True if the job was added or replaced.
+    """
+    existing = SQLiteJobStore().lookup_job(job_id)
+    if (existing is not None and existing.func_ref == func
+            and str(existing.trigger) == str(trigger) and tuple(existing.args) == tuple(args)):
+        return False
+    scheduler.add_job(func, trigger=trigger, args=list(args), id=job_id, name=name or job_id,
+                      replace_existing=True)
+    return True
+
+
+# Jobs created from report definitions: one per distinct schedule
+REPORT_JOB_PREFIX = "reports:"
+
+
+def sync_reports(scheduler=None):
+    """Make the shared store hold one job per distinct report schedule.
+
+    Definitions that share a schedule share a job, so they are fetched
+    together and sent on one worker pool. Jobs only hold the schedule;
+    definitions are re-read when they fire. Unchanged schedules keep their
+    job, and schedules no definition uses any more are removed.
+    """
+    scheduler = scheduler or get_scheduler()
+    schedules = {report_schedule(definition) for definition in load_reports().values()}
+    for schedule in schedules:
+        trigger = CronTrigger.from_crontab(schedule, timezone=scheduler.timezone)
+        ensure_job(scheduler, "reports:run_due_reports", trigger, REPORT_JOB_PREFIX + schedule,
+                   args=[schedule], name=f"Reports at {schedule}")
+
+    store = SQLiteJobStore()
+    for job in store.get_all_jobs():
+        stale = job.id.startswith(REPORT_JOB_PREFIX) and job.id[len(REPORT_JOB_PREFIX):] not in schedules
+        # Per-report jobs ("report:<id>") predate schedule sharing
+        if stale or job.id.startswith("report:"):
+            store.remove_job(job.id)
+    return schedules
@@ -0,0 +1,305 @@
+import hashlib
+import html
+import json
+import os
+import queue
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from dataset_cache import get_dataset
+from exports import prune_files
+from facets import FacetIndex
+from mailer import SMTPConnection, already_queued, build_summary_message, send_batch, send_summary_email
+from metrics import inc, timed
+from processing import parse_durations
+from search_index import scan_search
+from task_store import refresh_days, stale_days
+
+# Saved report definitions, keyed by id
+CONFIG_DIR = "config"
+REPORTS_PATH = os.path.join(CONFIG_DIR, "reports.json")
+
+# CSVs attached to report emails, with their compressed and trimmed copies;
+# only the newest REPORT_KEEP files are kept once their message is built
+REPORT_DIR = os.path.join("data", "reports")
+REPORT_KEEP = int(os.getenv("REPORT_KEEP", "100"))
+
+# Per-segment distribution lists, e.g.
+#   {"college": {"SINHGAD INSTITUTE ...": ["coordinator@example.com"]},
+#    "project": {"2": ["lead@example.com"]}}
+# Any column works; values are matched as strings.
+SEGMENTS_PATH = os.path.join(CONFIG_DIR, "segments.json")
+
+# Reports rendered and sent at once when several are due together
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "4"))
+
+# Columns of the Detailed Task View, in display order
+DETAIL_COLUMNS = ['id', 'email', 'task_title', 'activity_status', 'remark', 'current_task',
+                  'time_spent', 'created_date', 'college', 'uname']
+
+# A definition looks like:
+#   {"id": "dashboard", "name": "Dashboard view", "range_days": 1,
+#    "filters": {"college": ["..."]}, "search": "", "recipients": ["..."],
+#    "cron": "0 18 * * 1-5"}
+# range_days counts back from the day the report runs, so a saved view keeps
+# following the calendar instead of freezing the rows it was created with.
+# "hour" and "minute" may be given instead of "cron" for a daily report.
+
+
+def load_reports():
+    """All saved report definitions by id (empty if none are saved)."""
+    if not os.path.exists(REPORTS_PATH):
+        return {}
+    with open(REPORTS_PATH, "r") as f:
+        return {report["id"]: report for report in json.load(f)}
+
+
+def save_report(definition):
+    """Add or replace the definition with the same id."""
+    reports = load_reports()
+    reports[definition["id"]] = definition
+    os.makedirs(CONFIG_DIR, exist_ok=True)
+    tmp_path = f"{REPORTS_PATH}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(list(reports.values()), f, indent=2)
+    os.replace(tmp_path, REPORTS_PATH)
+    print(f"✅ Saved report definition '{definition['id']}'")
+
+
+def get_report(report_id):
+    return load_reports().get(report_id)
+
+
+def report_schedule(definition):
+    """Crontab expression a definition runs on."""
+    if definition.get("cron"):
+        return " ".join(definition["cron"].split())
+    return f"{int(definition.get('minute', 0))} {int(definition.get('hour', 18))} * * *"
+
+
+def report_range(definition, today=None):
+    """(from, to) date strings a definition covers when run on today."""
+    today = today or datetime.now().date()
+    from_date = today - timedelta(days=int(definition.get("range_days", 1)))
+    return from_date.strftime("%Y-%m-%d"), today.strftime("%Y-%m-%d")
+
+
+def detail_frame(df):
+    """The Detailed Task View columns of df that exist (all columns if none do)."""
+    display_cols = [col for col in DETAIL_COLUMNS if col in df.columns]
+    return df[display_cols] if display_cols else df
+
+
+def select_rows(df, filters=None, search="", facet_index=None):
+    """Rows of df matching facet filters ({column: [values]}) and a search query."""
+    positions = (facet_index or FacetIndex(df)).positions(filters or {})
+    rows = df if positions is None else df.take(positions)
+    if search and search.strip():
+        # One query per report: a scan is cheaper than building an index to throw away
+        rows = rows[scan_search(rows, search)]
+    return rows
+
+
+def report_bodies(title, date_for_report, total, done, hours):
+    """(plain, html) summary of a detailed report."""
+    html_body = f"""
+    <h2>📊 {html.escape(title)}</h2>
+    <ul>
+      <li><b>Total Tasks:</b> {total}</li>
+      <li><b>Completed Tasks:</b> {done}</li>
+      <li><b>Total Time Spent:</b> {hours} hours</li>
+    </ul>
+    """
+
+    plain_body = f"{title} Report for {date_for_report}\nTotal Tasks: {total}\nCompleted Tasks: {done}\nTotal Time Spent: {hours} hours"
+    return plain_body, html_body
+
+
+def send_detailed_report(recipients, detailed_df, date_for_report, connection=None, name="detailed_task_view",
+                         dedup_key=None):
+    """Email a Detailed Task View summary with its rows attached as CSV."""
+    if already_queued(dedup_key, f"Report '{name}' for {date_for_report}"):
+        return
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    csv_path = os.path.join(REPORT_DIR, f"{name}_{date_for_report}.csv")
+    detailed_df.to_csv(csv_path, index=False)
+    subject = f"Startup World Report — {date_for_report}"
+    total = len(detailed_df)
+    done = detailed_df[detailed_df['activity_status'] == 'Completed'].shape[0] if 'activity_status' in detailed_df.columns else 0
+    hours = round(parse_durations(detailed_df['time_spent']).sum() / 60, 2) if 'time_spent' in detailed_df.columns else 0
+
+    plain_body, html_body = report_bodies("Detailed Task View", date_for_report, total, done, hours)
+    send_summary_email(recipients, subject, plain_body, html_body, csv_path, connection=connection,
+                       dedup_key=dedup_key)
+    prune_files(REPORT_DIR, REPORT_KEEP)
+
+
+def load_datasets(ranges):
+    """Processed frame per distinct (from, to) range.
+
+    Stale days across all the ranges are fetched and processed in one
+    parallel pass first, so overlapping ranges never fetch a day twice and
+    each range is then read from the local partitions.
+    """
+    ranges = sorted(set(ranges))
+    refresh_days(sorted({day for from_date, to_date in ranges for day in stale_days(from_date, to_date)}))
+    return {(from_date, to_date): get_dataset(from_date, to_date, wait_for_fresh=True)
+            for from_date, to_date in ranges}
+
+
+def send_reports(definitions, workers=REPORT_WORKERS, today=None):
+    """Fetch once for every definition, then render and send them on a bounded pool.
+
+    Finished emails go to the outbox, one per report and date; with it
+    disabled each worker sends over its own SMTP session so messages go out
+    in parallel. Returns the ids of the reports that failed.
+    """
+    definitions = [d for d in definitions if d.get("recipients")]
+    if not definitions:
+        print("⚠️ No reports with recipients to send.")
+        return []
+
+    today = today or datetime.now().date()
+    ranges = {d["id"]: report_range(d, today) for d in definitions}
+    datasets = load_datasets(ranges.values())
+    indexes = {key: FacetIndex(df) for key, df in datasets.items()}
+
+    workers = max(1, min(workers, len(definitions)))
+    connections = queue.Queue()
+    for _ in range(workers):
+        connections.put(SMTPConnection())
+
+    def render_and_send(definition):
+        key = ranges[definition["id"]]
+        rows = select_rows(datasets[key], definition.get("filters"), definition.get("search", ""), indexes[key])
+        connection = connections.get()
+        try:
+            send_detailed_report(definition["recipients"], detail_frame(rows), key[1],
+                                 connection=connection, name=definition["id"],
+                                 dedup_key=f"report:{definition['id']}:{key[1]}")
+        finally:
+            connections.put(connection)
+
+    failed = []
+    try:
+        with timed("send_reports") as info, ThreadPoolExecutor(max_workers=workers) as pool:
+            info["rows"] = len(definitions)
+            futures = {pool.submit(render_and_send, d): d["id"] for d in definitions}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    failed.append(futures[future])
+                    print(f"❌ Report '{futures[future]}' failed: {e}")
+    finally:
+        while not connections.empty():
+            connections.get().close()
+    inc("reports_sent_total", len(definitions) - len(failed), result="ok")
+    inc("reports_sent_total", len(failed), result="failed")
+    return failed
+
+
+def run_report(report_id):
+    """Fetch one definition's range and send its report now."""
+    definition = get_report(report_id)
+    if definition is None:
+        print(f"⚠️ Report '{report_id}' no longer exists. Skipping.")
+        return
+    send_reports([definition])
+
+
+def run_due_reports(schedule):
+    """Scheduled entry point: send every definition that runs on schedule (a crontab expression)."""
+    due = [d for d in load_reports().values() if report_schedule(d) == schedule]
+    print(f"⏰ {len(due)} report(s) due for '{schedule}'")
+    send_reports(due)
+
+
+def load_segments():
+    """Recipients per segment value, by column (empty if none are configured)."""
+    if not os.path.exists(SEGMENTS_PATH):
+        return {}
+    with open(SEGMENTS_PATH, "r") as f:
+        segments = json.load(f)
+    return {column: {str(value): recipients for value, recipients in lists.items() if recipients}
+            for column, lists in segments.items()}
+
+
+def _segment_name(column, value):
+    # Readable and filesystem-safe, and still unique per value
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", value).strip("_")[:40]
+    return f"segment_{column}_{slug}_{hashlib.sha1(value.encode()).hexdigest()[:6]}"
+
+
+def segment_key(column, value, date_for_report):
+    """Outbox dedup key of one segment's report for a day."""
+    return f"segment:{column}:{value}:{date_for_report}"
+
+
+def segment_messages(df, column, recipients_by_value, date_for_report):
+    """Report email by segment value, for each value of column that has recipients.
+
+    The rows are partitioned in a single groupby pass; each segment's CSV
+    and summary are then written from its own partition only. Values with
+    recipients but no rows get no email.
+    """
+    positions = {str(value): rows for value, rows in df.groupby(column, observed=True, sort=False).indices.items()}
+    completed = (df["activity_status"] == "Completed").to_numpy(dtype=bool, na_value=False) \
+        if "activity_status" in df.columns else np.zeros(len(df), dtype=bool)
+    minutes = df["time_spent_minutes"].to_numpy(dtype="float64", na_value=0) \
+        if "time_spent_minutes" in df.columns else np.zeros(len(df))
+
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    messages = {}
+    for value, recipients in recipients_by_value.items():
+        rows = positions.get(value)
+        if rows is None:
+            print(f"⚠️ No {column} rows for '{value}' on {date_for_report}. Skipping.")
+            continue
+        csv_path = os.path.join(REPORT_DIR, f"{_segment_name(column, value)}_{date_for_report}.csv")
+        detail_frame(df.take(rows)).to_csv(csv_path, index=False)
+        total, done, hours = len(rows), int(completed[rows].sum()), round(minutes[rows].sum() / 60, 2)
+        plain_body, html_body = report_bodies(value, date_for_report, total, done, hours)
+        msg = build_summary_message(recipients, f"Startup World Report — {value} — {date_for_report}",
+                                    plain_body, html_body, csv_path)
+        if msg is not None:
+            messages[value] = msg
+    prune_files(REPORT_DIR, REPORT_KEEP)
+    return messages
+
+
+def send_segment_reports(column, today=None):
+    """Scheduled entry point: each configured value of column gets a report of its own rows.
+
+    The day is fetched once, every segment is built from one partitioning
+    pass, and all of them are queued together in the outbox (once per
+    segment and day) or, with it disabled, sent as one batch over a single
+    SMTP session. Returns the subjects of the emails that failed.
+    """
+    recipients_by_value = load_segments().get(column)
+    if not recipients_by_value:
+        print(f"⚠️ No segments configured for '{column}'. Skipping.")
+        return []
+
+    from_date, to_date = report_range({"range_days": 1}, today)
+    df = get_dataset(from_date, to_date, wait_for_fresh=True)
+    if column not in df.columns:
+        print(f"❌ Cannot segment by '{column}': no such column.")
+        return []
+
+    # Segments already in the outbox for the day are not rendered again
+    recipients_by_value = {value: recipients for value, recipients in recipients_by_value.items()
+                           if not already_queued(segment_key(column, value, to_date), f"{column} '{value}'")}
+    if not recipients_by_value:
+        return []
+
+    with timed("segment_reports", column=column) as info:
+        info["rows"] = len(df)
+        messages = segment_messages(df, column, recipients_by_value, to_date)
+    print(f"📬 Sending {len(messages)} {column} report(s)")
+    results = send_batch(list(messages.values()),
+                         dedup_keys=[segment_key(column, value, to_date) for value in messages])
+    return [msg["Subject"] for msg, _, error in results if error is not None]
@@ -0,0 +1,110 @@
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from aggregations import TOP_N, VALUE_COLUMN, dimension_totals, top_n
+
+# One small Parquet file of per-day aggregates next to each partition
+ROLLUP_DIR = os.path.join("data", "rollups")
+
+# Dimensions rolled up per day
+ROLLUP_DIMENSIONS = ["activity_status", "college", "uname", "task_title", "project"]
+
+# Dimension name of each day's overall row
+TOTAL = "total"
+
+# Ranges longer than this many days are served from rollups instead of raw rows
+ROLLUP_MIN_DAYS = int(os.getenv("ROLLUP_MIN_DAYS", "31"))
+
+ROLLUP_COLUMNS = ["day", "dimension", "value", "count", "minutes"]
+
+
+def rollup_path(day):
+    return os.path.join(ROLLUP_DIR, f"{day}.parquet")
+
+
+def build_rollup(day, df):
+    """Task count and minutes per value of each rollup dimension for one day's rows.
+
+    Returns long-format rows (day, dimension, value, count, minutes), plus
+    one TOTAL row for the whole day.
+    """
+    if VALUE_COLUMN in df.columns:
+        values = df[VALUE_COLUMN].to_numpy(dtype="float64", na_value=0)
+    else:
+        values = np.zeros(len(df))
+
+    frames = [pd.DataFrame({"dimension": [TOTAL], "value": [""], "count": [len(df)], "minutes": [values.sum()]})]
+    for dim in ROLLUP_DIMENSIONS:
+        if dim not in df.columns:
+            continue
+        totals = dimension_totals(df[dim], values)
+        frames.append(pd.DataFrame({
+            "dimension": dim,
+            "value": totals.index.astype(str),
+            "count": totals["count"].to_numpy(),
+            "minutes": totals["minutes"].to_numpy(),
+        }))
+    rollup = pd.concat(frames, ignore_index=True)
+    rollup.insert(0, "day", day)
+    return rollup[ROLLUP_COLUMNS]
+
+
+def write_rollup(day, df):
+    """Atomically replace the rollup for a day from its processed rows."""
+    os.makedirs(ROLLUP_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=ROLLUP_DIR, suffix=".tmp")
+    os.close(fd)
+    try:
+        build_rollup(day, df).to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, rollup_path(day))
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def read_rollups(days):
+    """Concatenate the stored rollups of days (missing days are skipped)."""
+    import pyarrow.parquet as pq
+
+    paths = [rollup_path(day) for day in days if os.path.exists(rollup_path(day))]
+    if not paths:
+        return pd.DataFrame(columns=ROLLUP_COLUMNS)
+    return pq.ParquetDataset(paths).read().to_pandas()
+
+
+def daily_trend(rollups):
+    """Tasks and minutes per day from the TOTAL rows, oldest first."""
+    totals = rollups[rollups["dimension"] == TOTAL]
+    return pd.DataFrame({
+        "day": pd.to_datetime(totals["day"].to_numpy()),
+        "tasks": totals["count"].to_numpy(),
+        "minutes": totals["minutes"].to_numpy(),
+    }).sort_values("day", ignore_index=True)
+
+
+def summarize_rollups(rollups, n=TOP_N):
+    """The aggregations.summarize() dict for a range, computed from its daily rollups."""
+    totals = rollups[rollups["dimension"] == TOTAL]
+    summary = {
+        "total_tasks": int(totals["count"].sum()),
+        "total_minutes": float(totals["minutes"].sum()),
+        "has_minutes": True,
+        "dimensions": {},
+        "daily": daily_trend(rollups),
+    }
+    rows = rollups[rollups["dimension"] != TOTAL]
+    grouped = rows.groupby(["dimension", "value"], observed=True, sort=False)[["count", "minutes"]].sum()
+    for dim in ROLLUP_DIMENSIONS:
+        if dim not in grouped.index.get_level_values(0):
+            continue
+        dim_totals = grouped.xs(dim, level="dimension")
+        dim_totals.index.name = dim
+        summary["dimensions"][dim] = {
+            "totals": dim_totals,
+            "top_count": top_n(dim_totals, "count", n),
+            "top_minutes": top_n(dim_totals, "minutes", n),
+        }
+    return summary
@@ -1,14 +1,29 @@
 import os
 import json
+from datetime import datetime, timedelta
 from apscheduler.schedulers.blocking import BlockingScheduler
-from mailer import generate_email_report
+from apscheduler.triggers.cron import CronTrigger
+from dataset_cache import get_dataset
+from report_scheduler import build_scheduler, ensure_job, sync_reports
+from reports import load_segments, run_report, send_segment_reports
+from mailer import flush_outbox, generate_email_report, start_outbox_worker
 from fetch_data import fetch_task_data
+from metrics import serve_metrics, timed
+from outbox import outbox_counts, retry_failed
 
 # ─── Helpers ────────────────────────────────────────────────────────────────
 
 CONFIG_DIR = "config"
 EMAIL_TIME_PATH = os.path.join(CONFIG_DIR, "email_time.json")
 RECIPIENTS_PATH = os.path.join(CONFIG_DIR, "recipients.json")
+WARMUP_PATH = os.path.join(CONFIG_DIR, "warmup.json")
+
+# Cache warm-up defaults: the dashboard's default yesterday→today view plus the
+# last 7 and 30 days, refreshed every 30 minutes and 15 minutes before the report
+WARMUP_DEFAULTS = {"range_days": [1, 7, 30], "interval_minutes": 30, "lead_minutes": 15}
+
+# Port of this worker's /metrics endpoint (0 disables it); separate from the dashboard's METRICS_PORT
+SCHEDULER_METRICS_PORT = int(os.getenv("SCHEDULER_METRICS_PORT", "0"))
 
 
 def load_email_time():
@@ -58,10 +73,41 @@ def remove_recipient(email):
     print(f"✅ Removed {email} from recipients.")
 
 
+def load_warmup_config():
+    """Read warm-up settings from config/warmup.json, falling back to WARMUP_DEFAULTS."""
+    config = dict(WARMUP_DEFAULTS)
+    if os.path.exists(WARMUP_PATH):
+        with open(WARMUP_PATH, "r") as f:
+            config.update(json.load(f))
+    return config
+
+
+def warmup_ranges(range_days, today=None):
+    """(from, to) strings ending today for each entry of range_days, as the dashboard requests them."""
+    today = today or datetime.now().date()
+    return [
+        ((today - timedelta(days=days)).strftime("%Y-%m-%d"), today.strftime("%Y-%m-%d"))
+        for days in range_days
+    ]
+
+
+def warm_cache():
+    """Fetch and process the commonly viewed ranges into the cache app.py reads."""
+    for from_date, to_date in warmup_ranges(load_warmup_config()["range_days"]):
+        try:
+            with timed("warm_cache") as info:
+                df = get_dataset(from_date, to_date, wait_for_fresh=True)
+                info["rows"] = len(df)
+            print(f"🔥 Warmed {from_date} → {to_date} ({len(df)} tasks)")
+        except Exception as e:
+            print(f"❌ Failed to warm {from_date} → {to_date}: {e}")
+
+
 def send_daily_report():
     """Fetch fresh data, then generate & send the report to all recipients."""
     print("⏰ Fetching fresh task data...")
-    fetch_task_data()
+    with timed("daily_report_fetch"):
+        fetch_task_data()
 
     recipients = load_recipients()
     if not recipients:
@@ -69,7 +115,62 @@ def send_daily_report():
         return
 
     print(f"⏰ Sending daily report to: {', '.join(recipients)}")
-    generate_email_report(recipients)
+    with timed("daily_report_email"):
+        generate_email_report(recipients)
+
+
+def schedule_jobs(scheduler):
+    """Add the daily email, saved reports, segment reports and cache warm-up to scheduler.
+
+    Used by the dashboard's in-process scheduler and by `python scheduler.py`.
+    Returns what was scheduled, for logging.
+    """
+    hour, minute = load_email_time()
+    ensure_job(
+        scheduler,
+        "scheduler:send_daily_report",
+        CronTrigger(hour=hour, minute=minute, timezone=scheduler.timezone),
+        "daily_email",
+    )
+    # Saved report definitions (config/reports.json), one job per distinct schedule
+    schedules = sync_reports(scheduler)
+
+    # Per-segment reports (config/segments.json) go out with the daily email
+    segment_columns = sorted(load_segments())
+    for column in segment_columns:
+        ensure_job(
+            scheduler,
+            "reports:send_segment_reports",
+            CronTrigger(hour=hour, minute=minute, timezone=scheduler.timezone),
+            f"segments:{column}",
+            args=[column],
+        )
+
+    # Keep the dashboard's common ranges warm, and refresh them just before the report.
+    # These are this process's own housekeeping, so they stay out of the shared store.
+    warmup = load_warmup_config()
+    scheduler.add_job(
+        warm_cache,
+        trigger="interval",
+        minutes=warmup["interval_minutes"],
+        next_run_time=datetime.now(),
+        id="cache_warmup",
+        jobstore="local",
+        replace_existing=True,
+    )
+    before_report = datetime(2000, 1, 1, hour, minute) - timedelta(minutes=warmup["lead_minutes"])
+    scheduler.add_job(
+        warm_cache,
+        trigger="cron",
+        hour=before_report.hour,
+        minute=before_report.minute,
+        id="cache_warmup_before_report",
+        jobstore="local",
+        replace_existing=True,
+    )
+
+    return {"hour": hour, "minute": minute, "schedules": schedules, "segments": segment_columns,
+            "warmup": warmup, "before_report": before_report}
 
 
 # ─── Scheduler & CLI ────────────────────────────────────────────────────────
@@ -78,7 +179,11 @@ if __name__ == "__main__":
     # Example CLI usage:
     #   python script.py add user@example.com
     #   python script.py remove user@example.com
-    #   python script.py run
+    #   python script.py warm
+    #   python script.py report <report id>
+    #   python script.py segments college
+    #   python script.py outbox            (deliver what is due, then show counts)
+    #   python script.py outbox retry      (queue failed messages again)
 
     import sys
     if len(sys.argv) >= 3 and sys.argv[1] == "add":
@@ -87,18 +192,37 @@ if __name__ == "__main__":
     if len(sys.argv) >= 3 and sys.argv[1] == "remove":
         remove_recipient(sys.argv[2])
         sys.exit(0)
+    if len(sys.argv) >= 2 and sys.argv[1] == "warm":
+        warm_cache()
+        sys.exit(0)
+    if len(sys.argv) >= 3 and sys.argv[1] == "report":
+        run_report(sys.argv[2])
+        flush_outbox()
+        sys.exit(0)
+    if len(sys.argv) >= 3 and sys.argv[1] == "segments":
+        send_segment_reports(sys.argv[2])
+        flush_outbox()
+        sys.exit(0)
+    if len(sys.argv) >= 2 and sys.argv[1] == "outbox":
+        if sys.argv[2:3] == ["retry"]:
+            print(f"📬 Queued {retry_failed()} failed message(s) again")
+        flush_outbox()
+        print(f"📬 Outbox: {outbox_counts()}")
+        sys.exit(0)
 
-    # Otherwise, start the scheduler to run daily
-    hour, minute = load_email_time()
-    scheduler = BlockingScheduler()
-    scheduler.add_job(
-        send_daily_report,
-        trigger="cron",
-        hour=hour,
-        minute=minute,
-        id="daily_email",
-        replace_existing=True,
-    )
-
-    print(f"✅ Scheduler started — will send email daily at {hour:02d}:{minute:02d}")
+    # Otherwise, run the scheduler in this process, for a host where the
+    # dashboard does not run one (see schedule_jobs). Jobs live in the shared
+    # store, and each scheduled time runs once even if a dashboard process is
+    # also up on this machine.
+    serve_metrics(SCHEDULER_METRICS_PORT)
+    start_outbox_worker()
+    scheduler = build_scheduler(BlockingScheduler)
+    scheduled = schedule_jobs(scheduler)
+    before_report = scheduled["before_report"]
+
+    print(f"✅ Scheduler started — will send email daily at {scheduled['hour']:02d}:{scheduled['minute']:02d}")
+    print(f"📬 {len(scheduled['schedules'])} report schedule(s): {', '.join(sorted(scheduled['schedules'])) or 'none'}")
+    print(f"📬 Segmented reports by: {', '.join(scheduled['segments']) or 'none'}")
+    print(f"🔥 Cache warm-up every {scheduled['warmup']['interval_minutes']} min and at "
+          f"{before_report.hour:02d}:{before_report.minute:02d}")
     scheduler.start()
@@ -0,0 +1,150 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# Columns searched by the Detailed Task View box
+SEARCH_FIELDS = ["task_title", "remark", "current_task", "uname", "college", "email"]
+
+# field:term or field:"quoted term"
+FIELD_TERM_PATTERN = re.compile(r'(\w+):(?:"([^"]*)"|(\S+))')
+
+
+def trigrams(text):
+    """Set of 3-character substrings of text."""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def parse_query(query, fields=SEARCH_FIELDS):
+    """Split a query into [(field, term)] pairs; field is None for the free-text part.
+
+    Only known fields are treated as prefixes, so "10:30" stays free text.
+    """
+    terms = []
+
+    def take_field(match):
+        field = match.group(1)
+        if field not in fields:
+            return match.group(0)
+        term = (match.group(2) if match.group(2) is not None else match.group(3)).strip().casefold()
+        if term:
+            terms.append((field, term))
+        return " "
+
+    rest = " ".join(FIELD_TERM_PATTERN.sub(take_field, query).split()).casefold()
+    if rest:
+        terms.append((None, rest))
+    return terms
+
+
+class SearchIndex:
+    """Case-folded trigram index over the searchable text columns of one dataset.
+
+    Text repeats heavily, so each column is indexed by distinct value: a
+    trigram maps to the value ids containing it, and value ids map back to
+    rows through the column codes. A substring search intersects the
+    postings of the term's trigrams and verifies the few candidates left.
+    """
+
+    def __init__(self, df, fields=SEARCH_FIELDS):
+        self.rows = len(df)
+        self.fields = {}
+        for col in fields:
+            if col not in df.columns:
+                continue
+            series = df[col]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                codes, values = series.cat.codes.to_numpy(), series.cat.categories
+            else:
+                codes, values = pd.factorize(series)
+            folded = [str(value).casefold() for value in values]
+
+            postings = {}
+            for value_id, text in enumerate(folded):
+                for gram in trigrams(text):
+                    postings.setdefault(gram, []).append(value_id)
+
+            self.fields[col] = {
+                "codes": codes,
+                "values": folded,
+                "postings": {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()},
+            }
+
+    def matching_values(self, field, term):
+        """Ids of the distinct values of field that contain term."""
+        index = self.fields[field]
+        grams = trigrams(term)
+        if grams:
+            lists = sorted((index["postings"].get(gram) for gram in grams), key=lambda ids: 0 if ids is None else len(ids))
+            if lists[0] is None:
+                return np.array([], dtype=np.int32)
+            candidates = lists[0]
+            for ids in lists[1:]:
+                candidates = np.intersect1d(candidates, ids, assume_unique=True)
+                if not len(candidates):
+                    break
+        else:
+            # Terms shorter than a trigram scan the distinct values, not the rows
+            candidates = range(len(index["values"]))
+        values = index["values"]
+        return np.array([i for i in candidates if term in values[i]], dtype=np.int32)
+
+    def field_mask(self, field, term):
+        """Row mask for rows whose field contains term."""
+        index = self.fields[field]
+        hits = np.zeros(len(index["values"]) + 1, dtype=bool)
+        hits[self.matching_values(field, term)] = True
+        # Code -1 (missing value) picks the trailing False
+        return hits[index["codes"]]
+
+    def search(self, query):
+        """Row mask for query; free text matches any field, field:term only that field."""
+        mask = np.ones(self.rows, dtype=bool)
+        if not self.fields:
+            return mask
+        for field, term in parse_query(query, list(self.fields)):
+            if field is None:
+                term_mask = np.zeros(self.rows, dtype=bool)
+                for name in self.fields:
+                    term_mask |= self.field_mask(name, term)
+            else:
+                term_mask = self.field_mask(field, term)
+            mask &= term_mask
+        return mask
+
+
+def scan_search(df, query, fields=SEARCH_FIELDS):
+    """Row mask for query, like SearchIndex(df).search(query), without building an index.
+
+    For a single query: each field's distinct values are case-folded and
+    scanned with a vectorized substring match, then mapped to rows by code.
+    """
+    fields = [col for col in fields if col in df.columns]
+    mask = np.ones(len(df), dtype=bool)
+    if not fields:
+        return mask
+
+    columns = {}
+
+    def field_mask(field, term):
+        if field not in columns:
+            series = df[field]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                codes, values = series.cat.codes.to_numpy(), series.cat.categories
+            else:
+                codes, values = pd.factorize(series)
+            columns[field] = (codes, pd.Series(np.asarray(values, dtype=object)).astype(str).str.casefold())
+        codes, folded = columns[field]
+        # Code -1 (missing value) picks the trailing False
+        hits = np.append(folded.str.contains(term, regex=False).to_numpy(dtype=bool), False)
+        return hits[codes]
+
+    for field, term in parse_query(query, fields):
+        if field is None:
+            term_mask = np.zeros(len(df), dtype=bool)
+            for name in fields:
+                term_mask |= field_mask(name, term)
+        else:
+            term_mask = field_mask(field, term)
+        mask &= term_mask
+    return mask
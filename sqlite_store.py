@@ -0,0 +1,21 @@
+import os
+import sqlite3
+import uuid
+
+# Identifies this process in the locks, run claims and outbox leases it takes
+OWNER = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+def connect(path, schema=()):
+    """Open a SQLite file shared by every process on this machine.
+
+    Autocommit, WAL so readers never block the writer, and a 30 s busy
+    timeout. The directory is created and each statement of schema
+    (CREATE ... IF NOT EXISTS) is run on every connect.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    for statement in schema:
+        conn.execute(statement)
+    return conn
@@ -0,0 +1,320 @@
+import hashlib
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from fetch_data import (API_DELTA_PARAM, CHUNK_DAYS, MAX_WORKERS, get_session, split_date_range, stream_window,
+                        with_retries)
+from processing import DERIVED_COLUMNS, concat_frames, process_batches
+from metrics import timed
+from rollups import read_rollups, rollup_path, write_rollup
+
+# One Parquet file of processed task activity per day
+STORE_DIR = os.path.join("data", "partitions")
+
+# How long a partition for a day that has not ended yet is served before refetching (seconds)
+TODAY_TTL = int(os.getenv("STORE_TODAY_TTL", "900"))
+
+# A running day is refreshed by fetching only the rows at or past its watermark
+# (STORE_DELTA_SYNC=0 refetches it whole); it is still refetched whole after
+# STORE_FULL_SYNC seconds so rows deleted upstream disappear
+DELTA_SYNC = os.getenv("STORE_DELTA_SYNC", "1") != "0"
+FULL_SYNC_SECONDS = int(os.getenv("STORE_FULL_SYNC", "3600"))
+
+# Timestamps a record's watermark is taken from, in the API's sortable text format
+WATERMARK_COLUMNS = ["created_date", "updated_date"]
+STAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# The API assigns a record to the day it was created on
+CREATED_COLUMN = "created_date"
+
+
+def partition_path(day):
+    """Path of the partition file for a YYYY-MM-DD day."""
+    return os.path.join(STORE_DIR, f"{day}.parquet")
+
+
+def is_fresh(day):
+    """True if the day's partition can be served without calling the API.
+
+    A partition written after its day ended is immutable; one written while
+    the day was still running is only trusted for TODAY_TTL seconds.
+    """
+    path = partition_path(day)
+    if not os.path.exists(path):
+        return False
+    written_at = os.path.getmtime(path)
+    day_end = datetime.strptime(day, "%Y-%m-%d") + timedelta(days=1)
+    if datetime.fromtimestamp(written_at) >= day_end:
+        return True
+    return time.time() - written_at < TODAY_TTL
+
+
+def days_in_range(from_date, to_date):
+    """List every YYYY-MM-DD day in an inclusive range."""
+    return [day for day, _ in split_date_range(from_date, to_date, chunk_days=1)]
+
+
+def stale_days(from_date, to_date):
+    """Days in the range whose partition is missing or stale."""
+    return [day for day in days_in_range(from_date, to_date) if not is_fresh(day)]
+
+
+def write_partition(day, df, full_sync_at=None):
+    """Atomically replace the partition for a day, and its rollup.
+
+    full_sync_at (default now) is when the day was last fetched whole; it is
+    kept in the file's attrs for delta refreshes.
+    """
+    df.attrs["full_sync_at"] = full_sync_at or time.time()
+    os.makedirs(STORE_DIR, exist_ok=True)
+    # Unique per writer: threads of one process may write the same day at once
+    fd, tmp_path = tempfile.mkstemp(dir=STORE_DIR, suffix=".tmp")
+    os.close(fd)
+    try:
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, partition_path(day))
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    write_rollup(day, df)
+
+
+def day_windows(days, chunk_days=CHUNK_DAYS):
+    """Group days into runs of consecutive days, each at most chunk_days long."""
+    windows = []
+    for day in sorted(days):
+        if windows and len(windows[-1]) < max(1, chunk_days):
+            next_day = datetime.strptime(windows[-1][-1], "%Y-%m-%d") + timedelta(days=1)
+            if day == next_day.strftime("%Y-%m-%d"):
+                windows[-1].append(day)
+                continue
+        windows.append([day])
+    return windows
+
+
+def split_by_day(df, days):
+    """{day: rows created that day} for a window's days; rows dated outside them stay with the first."""
+    if len(days) == 1 or df.empty or CREATED_COLUMN not in df.columns:
+        return {day: df if i == 0 else df.iloc[:0] for i, day in enumerate(days)}
+    created = df[CREATED_COLUMN].dt.strftime("%Y-%m-%d").to_numpy(dtype=object, na_value=None)
+    created = np.where(np.isin(created, days), created, days[0])
+    return {day: df[created == day].reset_index(drop=True) for day in days}
+
+
+def refresh_days(days, max_workers=MAX_WORKERS, chunk_days=CHUNK_DAYS):
+    """Fetch days from the API in parallel and store each as its own partition.
+
+    Consecutive days are requested together in windows of up to chunk_days
+    (FETCH_CHUNK_DAYS), so a cold range costs fewer round trips.
+    """
+    if not days:
+        return
+    windows = day_windows(days, chunk_days)
+    session = get_session()
+    with timed("refresh_days") as info, \
+            ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(windows)))) as pool:
+        info["rows"] = 0
+        fetched = pool.map(
+            lambda window: with_retries(lambda: process_batches(
+                stream_window(window[0], window[-1], session=session))),
+            windows,
+        )
+        for window, df in zip(windows, fetched):
+            for day, rows in split_by_day(df, window).items():
+                write_partition(day, rows)
+            info["rows"] += len(df)
+
+
+def watermark(df):
+    """(largest id, latest created/updated stamp) of a processed frame; rows past it are new or changed."""
+    max_id = int(df["id"].max()) if "id" in df.columns and df["id"].notna().any() else -1
+    stamps = [df[col].max() for col in WATERMARK_COLUMNS if col in df.columns]
+    stamps = [stamp for stamp in stamps if pd.notna(stamp)]
+    return max_id, max(stamps).strftime(STAMP_FORMAT) if stamps else ""
+
+
+def past_watermark(mark):
+    """Predicate on raw API records: True for those new or changed relative to mark.
+
+    Records stamped exactly at the watermark are kept, since rows written in
+    the same second may not have been seen yet (see changed_rows).
+    """
+    max_id, max_stamp = mark
+    created, updated = WATERMARK_COLUMNS
+
+    def keep(record):
+        try:
+            if int(record["id"]) > max_id:
+                return True
+        except (KeyError, TypeError, ValueError):
+            return True
+        return str(record.get(updated) or "") >= max_stamp or str(record.get(created) or "") >= max_stamp
+    return keep
+
+
+def upsert_rows(df, delta):
+    """df with delta's rows replacing those with the same id in place and new ids appended."""
+    if delta.empty:
+        return df
+    if df.empty or "id" not in df.columns or "id" not in delta.columns:
+        return concat_frames([df, delta])
+    combined = concat_frames([df, delta])
+    old_ids = df["id"].to_numpy(dtype="float64", na_value=np.nan)
+    new_ids = delta["id"].to_numpy(dtype="float64", na_value=np.nan)
+    # Position in combined of the last delta row for each id
+    latest = pd.Series(np.arange(len(df), len(combined)), index=new_ids)
+    latest = latest[~latest.index.duplicated(keep="last")]
+    replaced = latest.reindex(old_ids).to_numpy()
+    order = np.where(np.isnan(replaced), np.arange(len(df)), np.nan_to_num(replaced)).astype(np.int64)
+    appended = latest[~latest.index.isin(old_ids)].to_numpy()
+    return combined.take(np.concatenate([order, appended])).reset_index(drop=True)
+
+
+def values_equal(old, new):
+    """Elementwise equality of two object arrays, with missing on both sides counting as equal.
+
+    Only present values are compared, since pd.NA == x is NA and cannot be
+    turned into a bool.
+    """
+    old_missing, new_missing = pd.isna(old), pd.isna(new)
+    equal = old_missing & new_missing
+    present = ~(old_missing | new_missing)
+    equal[present] = (old[present] == new[present]).astype(bool)
+    return equal
+
+
+def changed_rows(df, delta):
+    """Rows of delta that are new to df or differ from the row with the same id."""
+    if delta.empty or df.empty or "id" not in df.columns or "id" not in delta.columns:
+        return delta
+    ids = df["id"].to_numpy(dtype="float64", na_value=np.nan)
+    positions = pd.Series(np.arange(len(df)), index=ids)
+    positions = positions[~positions.index.duplicated(keep="last")]
+    found = positions.reindex(delta["id"].to_numpy(dtype="float64", na_value=np.nan)).to_numpy()
+    known = ~np.isnan(found)
+    same = known.copy()
+    for col in delta.columns:
+        if col not in df.columns:
+            same[:] = False
+            break
+        old = df[col].take(np.nan_to_num(found[known]).astype(np.int64)).astype(object).to_numpy()
+        new = delta[col][known].astype(object).to_numpy()
+        same[known] &= values_equal(old, new)
+    return delta[~same].reset_index(drop=True)
+
+
+def fetch_delta(day, mark, session=None):
+    """Processed rows of day at or past mark (see watermark)."""
+    session = session or get_session()
+    extra_params = {API_DELTA_PARAM: mark[1]} if API_DELTA_PARAM and mark[1] else None
+    return with_retries(lambda: process_batches(stream_window(
+        day, day, session=session, extra_params=extra_params, keep=past_watermark(mark))))
+
+
+def sync_day(day):
+    """Bring a day's partition up to date, fetching only its new and changed rows when possible.
+
+    Returns the upserted rows, or None when the day was refetched whole
+    (no partition yet, delta sync off, or the last full fetch is older than
+    FULL_SYNC_SECONDS).
+    """
+    path = partition_path(day)
+    current = pd.read_parquet(path) if DELTA_SYNC and os.path.exists(path) else None
+    full_sync_at = current.attrs.get("full_sync_at") if current is not None else None
+    if not full_sync_at or time.time() - full_sync_at > FULL_SYNC_SECONDS:
+        refresh_days([day])
+        return None
+
+    with timed("delta_sync") as info:
+        # Rows stamped at the watermark come back unchanged; they are not news
+        delta = changed_rows(current, fetch_delta(day, watermark(current)))
+        info["rows"] = len(delta)
+        if delta.empty:
+            # Nothing changed; the partition counts as fresh again
+            os.utime(path)
+        else:
+            write_partition(day, upsert_rows(current, delta), full_sync_at)
+    return delta
+
+
+def refresh_stale(from_date, to_date):
+    """Refresh the stale days of a range; a running day with a partition gets a delta sync.
+
+    Returns {day: upserted rows or None} for the days that were delta synced.
+    """
+    days = stale_days(from_date, to_date)
+    today = datetime.now().strftime("%Y-%m-%d")
+    synced = {}
+    if DELTA_SYNC and today in days and os.path.exists(partition_path(today)):
+        days.remove(today)
+        synced[today] = sync_day(today)
+    refresh_days(days)
+    return synced
+
+
+def read_partitions(from_date, to_date):
+    """Concatenate the stored partitions of a range (missing days are skipped)."""
+    frames = [
+        pd.read_parquet(partition_path(day))
+        for day in days_in_range(from_date, to_date)
+        if os.path.exists(partition_path(day))
+    ]
+    df = concat_frames(frames)
+    if "id" in df.columns:
+        df = df.drop_duplicates(subset="id", keep="last", ignore_index=True)
+    return df
+
+
+def dataset_version(from_date, to_date):
+    """Cheap token that changes whenever any partition of the range is rewritten."""
+    stamps = [
+        f"{day}@{os.stat(partition_path(day)).st_mtime_ns}"
+        for day in days_in_range(from_date, to_date)
+        if os.path.exists(partition_path(day))
+    ]
+    return hashlib.md5("|".join(stamps).encode()).hexdigest()
+
+
+def load_range(from_date, to_date):
+    """Return processed task activity for a range, calling the API only for stale days.
+
+    The frame's attrs["version"] identifies its contents for downstream caches.
+    """
+    refresh_stale(from_date, to_date)
+    with timed("read_partitions") as info:
+        df = read_partitions(from_date, to_date)
+        info["rows"] = len(df)
+    df.attrs["version"] = f"{from_date}:{to_date}:{dataset_version(from_date, to_date)}"
+    return df
+
+
+def load_rollups(from_date, to_date):
+    """Daily rollups for a range, calling the API only for stale days.
+
+    Partitions written before rollups existed are rolled up from disk on
+    first use. attrs["version"] changes whenever a partition is rewritten.
+    """
+    refresh_stale(from_date, to_date)
+    days = days_in_range(from_date, to_date)
+    for day in days:
+        path = partition_path(day)
+        if os.path.exists(path) and (not os.path.exists(rollup_path(day))
+                                     or os.path.getmtime(rollup_path(day)) < os.path.getmtime(path)):
+            write_rollup(day, pd.read_parquet(path))
+    rollups = read_rollups(days)
+    rollups.attrs["version"] = f"rollups:{from_date}:{to_date}:{dataset_version(from_date, to_date)}"
+    return rollups
+
+
+def write_records_json(df, path):
+    """Write a processed frame back out as the flat API record list."""
+    out = df.drop(columns=DERIVED_COLUMNS, errors="ignore")
+    for col in out.select_dtypes(include="datetime").columns:
+        out[col] = out[col].dt.strftime("%Y-%m-%d %H:%M:%S")
+    out.to_json(path, orient="records", force_ascii=False)
@@ -1,4 +1,4 @@
-from mailer import send_summary_email
+from mailer import flush_outbox, send_summary_email
 
 if __name__ == "__main__":
     send_summary_email(
@@ -8,3 +8,5 @@ if __name__ == "__main__":
         html_body="<p>This is a test.</p>",  # HTML version
         csv_path="data/task_data.json"  # any small file path
     )
+    # With the outbox on the message was only queued; deliver it before exiting
+    flush_outbox()
@@ -0,0 +1,34 @@
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dataset_cache import CACHE_DIR, LOCK_TIMEOUT, get_cached, prune_cache, read_entry, store  # noqa: E402
+
+
+def test_prune_cache_keeps_most_recently_used(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    now = time.time()
+    for i, key in enumerate(["a", "b", "c", "d"]):
+        store(key, pd.DataFrame({"x": [i]}))
+        os.utime(read_entry(key)[0], (now - 100 + i, now - 100 + i))
+
+    # Reading "a" makes it the most recently used
+    assert get_cached("a", lambda: None, ttl=3600)["x"].tolist() == [0]
+    # A file left behind by a writer that died, and one still being written
+    orphan = os.path.join(CACHE_DIR, "orphan.parquet")
+    writing = os.path.join(CACHE_DIR, "writing.tmp")
+    for path in (orphan, writing):
+        open(path, "w").close()
+    os.utime(orphan, (now - LOCK_TIMEOUT - 1, now - LOCK_TIMEOUT - 1))
+
+    paths = {key: read_entry(key)[0] for key in ["a", "b", "c", "d"]}
+    prune_cache(keep=2)
+
+    assert [key for key in paths if read_entry(key)] == ["a", "d"]
+    assert sorted(os.listdir(CACHE_DIR)) == sorted(
+        [os.path.basename(paths["a"]), os.path.basename(paths["d"]), "cache.sqlite", "writing.tmp"]
+        + [name for name in os.listdir(CACHE_DIR) if name.startswith("cache.sqlite-")])
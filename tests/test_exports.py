@@ -0,0 +1,20 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from exports import prune_files  # noqa: E402
+
+
+def test_prune_files_keeps_newest_files_only(tmp_path):
+    now = time.time()
+    for i, name in enumerate(["a.csv", "b.csv.gz", "c.csv", "d_first1000.csv", "e.tmp"]):
+        path = tmp_path / name
+        path.write_text(name)
+        os.utime(path, (now - 100 + i, now - 100 + i))
+    (tmp_path / "downloads").mkdir()
+
+    prune_files(str(tmp_path), keep=2)
+
+    assert sorted(os.listdir(tmp_path)) == ["c.csv", "d_first1000.csv", "downloads", "e.tmp"]
@@ -0,0 +1,40 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from json_stream import iter_items  # noqa: E402
+
+NUMBERS = ["0", "-0", "7", "-12", "1.5", "-0.25", "1e3", "1E+3", "2.5e-4", "-3.25E10", "123456789012"]
+
+PAYLOADS = [
+    "[" + ", ".join(NUMBERS) + "]",
+    '{"success": 1.5e2, "data": [' + ",".join(NUMBERS) + '], "total": 11}',
+    '{"data": [{"id": 1.25, "n": [1e5, -2.0]}, 3.75, true, null, "4.5"]}',
+    "[1.5]",
+    "[-1e-7 ]",
+]
+
+
+def split_at(text, position, as_bytes):
+    chunks = [text[:position], text[position:]]
+    return [chunk.encode() for chunk in chunks] if as_bytes else chunks
+
+
+@pytest.mark.parametrize("payload", PAYLOADS)
+@pytest.mark.parametrize("as_bytes", [False, True])
+def test_every_split_position(payload, as_bytes):
+    parsed = json.loads(payload)
+    expected = parsed["data"] if isinstance(parsed, dict) else parsed
+    for position in range(len(payload) + 1):
+        assert list(iter_items(split_at(payload, position, as_bytes))) == expected, position
+
+
+@pytest.mark.parametrize("payload", PAYLOADS)
+def test_one_character_chunks(payload):
+    parsed = json.loads(payload)
+    expected = parsed["data"] if isinstance(parsed, dict) else parsed
+    assert list(iter_items(iter(payload))) == expected
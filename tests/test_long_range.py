@@ -0,0 +1,68 @@
+import os
+import sys
+from datetime import date, timedelta
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import mailer  # noqa: E402
+import report_scheduler  # noqa: E402
+import scheduler  # noqa: E402
+from processing import process_records  # noqa: E402
+from task_store import STORE_DIR, write_partition  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+DAYS = 60
+ROWS_PER_DAY = 6
+
+
+def day_records(day, offset):
+    return [{
+        "id": str(offset * ROWS_PER_DAY + i + 1), "user_id": str(i), "project": str(i % 2 + 1),
+        "activity_status": "Completed" if i % 3 == 0 else "Pending", "task_title": f"Task {i % 2}",
+        "remark": "remark", "current_task": "task", "time_spent": "0:30", "college": f"College {i % 3}",
+        "uname": f"User {i}", "created_date": f"{day} 10:00:00", "updated_date": "0000-00-00 00:00:00",
+    } for i in range(ROWS_PER_DAY)]
+
+
+def test_long_range_reads_rollups_only(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(mailer, "OUTBOX_ENABLED", False)
+    monkeypatch.setattr(report_scheduler, "get_scheduler", lambda: None)
+    monkeypatch.setattr(scheduler, "schedule_jobs", lambda scheduler: None)
+
+    # Every day of the range and the default view is already stored, so no API call is made
+    today = date.today()
+    first = today - timedelta(days=DAYS)
+    for offset in range(DAYS + 1):
+        day = (first + timedelta(days=offset)).strftime("%Y-%m-%d")
+        write_partition(day, process_records(day_records(day, offset)))
+
+    partition_reads = []
+    read_parquet = pd.read_parquet
+
+    def spy(path, *args, **kwargs):
+        if str(path).startswith(STORE_DIR):
+            partition_reads.append(path)
+        return read_parquet(path, *args, **kwargs)
+
+    monkeypatch.setattr(pd, "read_parquet", spy)
+
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=60)
+    at.run()
+    partition_reads.clear()
+
+    at.sidebar.date_input[0].set_value(first)
+    at.sidebar.date_input[1].set_value(today - timedelta(days=1)).run()
+    assert not at.exception
+    assert partition_reads == []
+    assert at.metric[0].value == str(DAYS * ROWS_PER_DAY)
+    assert not at.dataframe
+
+    # Asking for the tasks loads the rows
+    at.button[0].click().run()
+    assert not at.exception
+    assert partition_reads
+    assert at.dataframe
@@ -0,0 +1,46 @@
+import os
+import sys
+from email.message import EmailMessage
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from outbox import LEASE_SECONDS, claim_next, enqueue, exists, mark_failed, release  # noqa: E402
+
+
+def message(subject="Daily report"):
+    msg = EmailMessage()
+    msg["Subject"] = subject
+    msg["To"] = "team@example.com"
+    msg.set_content("body")
+    return msg
+
+
+def test_enqueue_dedups_until_the_message_fails_for_good(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert enqueue(message(), dedup_key="daily:2024-01-01")
+    assert not enqueue(message(), dedup_key="daily:2024-01-01")
+    assert exists("daily:2024-01-01")
+
+    message_id, _, attempts, _ = claim_next()
+    mark_failed(message_id, attempts + 1, "rejected", permanent=True)
+    assert not exists("daily:2024-01-01")
+
+    # A permanent failure frees the key, and the message goes out again
+    assert enqueue(message("Daily report, again"), dedup_key="daily:2024-01-01")
+    assert exists("daily:2024-01-01")
+    assert claim_next()[1]["Subject"] == "Daily report, again"
+
+
+def test_claimed_message_is_leased_until_released_or_expired(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    enqueue(message(), dedup_key="daily:2024-01-01")
+    now = 1e10
+
+    message_id = claim_next(now)[0]
+    assert claim_next(now + 1) is None
+    # The claiming process died: once the lease runs out someone else takes it
+    assert claim_next(now + LEASE_SECONDS + 1)[0] == message_id
+    assert claim_next(now + LEASE_SECONDS + 2) is None
+
+    release(message_id)
+    assert claim_next(now + LEASE_SECONDS + 3)[0] == message_id
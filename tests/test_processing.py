@@ -0,0 +1,38 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from processing import _to_integer, concat_frames, process_records  # noqa: E402
+
+
+@pytest.mark.parametrize("values, dtype, expected", [
+    (["1", "2"], "UInt32", [1, 2]),
+    (["1", "null"], "UInt32", [1, pd.NA]),
+    (["5000000000", "1"], "Int64", [5000000000, 1]),
+    (["-1", "2"], "Int64", [-1, 2]),
+    (["-1", "null"], "Int64", [-1, pd.NA]),
+    (["4294967296", "NULL"], "Int64", [4294967296, pd.NA]),
+])
+def test_to_integer_widens_out_of_range_ids(values, dtype, expected):
+    series = _to_integer(pd.Series(values, dtype=object), "UInt32")
+    assert str(series.dtype) == dtype
+    assert series.tolist() == expected
+
+
+def test_to_integer_keeps_text_ids_readable():
+    series = _to_integer(pd.Series(["A12", "7"], dtype=object), "UInt32")
+    assert isinstance(series.dtype, pd.CategoricalDtype)
+    assert series.tolist() == ["A12", "7"]
+
+
+def test_out_of_range_ids_survive_ingest_and_concat():
+    record = {"created_date": "2024-01-01 10:00:00", "updated_date": "0000-00-00 00:00:00"}
+    wide = process_records([dict(record, id="5000000000", user_id="-1")])
+    narrow = process_records([dict(record, id="7", user_id="3")])
+    combined = concat_frames([narrow, wide])
+    assert combined["id"].tolist() == [7, 5000000000]
+    assert combined["user_id"].tolist() == [3, -1]
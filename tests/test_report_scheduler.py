@@ -0,0 +1,18 @@
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from report_scheduler import claim_run  # noqa: E402
+
+
+def test_each_run_is_claimed_once(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    run_time = datetime(2024, 1, 1, 9, tzinfo=timezone.utc)
+    assert claim_run("daily_email", run_time)
+    assert not claim_run("daily_email", run_time)
+    # The same instant in another zone is the same run
+    assert not claim_run("daily_email", run_time.astimezone(timezone(timedelta(hours=5, minutes=30))))
+    assert claim_run("daily_email", run_time + timedelta(days=1))
+    assert claim_run("sync_reports", run_time)
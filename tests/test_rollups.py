@@ -0,0 +1,43 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aggregations import summarize  # noqa: E402
+from processing import process_records  # noqa: E402
+from rollups import ROLLUP_DIMENSIONS, build_rollup, summarize_rollups  # noqa: E402
+
+DAYS = ["2024-01-01", "2024-01-02", "2024-01-03"]
+
+
+def day_rows(day, count):
+    return process_records([{
+        "id": str(i), "user_id": str(i % 4), "project": str(i % 2 + 1),
+        "activity_status": ["Completed", "Pending", "null"][i % 3], "task_title": f"Task {i % 5}",
+        "time_spent": ["0:30", "1:15:00", "", "2:00"][i % 4], "college": f"College {i % 3}",
+        "uname": f"User {i % 4}", "created_date": f"{day} {8 + i % 10:02d}:00:00",
+        "updated_date": "0000-00-00 00:00:00",
+    } for i in range(count)])
+
+
+def by_value(totals):
+    totals = totals.set_axis(totals.index.astype(str)).sort_index()
+    return totals["count"].tolist(), totals["minutes"].tolist(), totals.index.tolist()
+
+
+def test_rollup_metrics_match_raw_rows():
+    parts = {day: day_rows(day, 10 + 7 * i) for i, day in enumerate(DAYS)}
+    raw = summarize(pd.concat(parts.values(), ignore_index=True), dimensions=ROLLUP_DIMENSIONS)
+    rolled = summarize_rollups(pd.concat([build_rollup(day, df) for day, df in parts.items()],
+                                         ignore_index=True))
+
+    assert rolled["total_tasks"] == raw["total_tasks"] == 51
+    assert rolled["total_minutes"] == raw["total_minutes"]
+    assert rolled["daily"]["tasks"].tolist() == raw["daily"]["tasks"].tolist()
+    assert rolled["daily"]["minutes"].tolist() == raw["daily"]["minutes"].tolist()
+    assert rolled["daily"]["day"].tolist() == raw["daily"]["day"].tolist()
+    assert rolled["dimensions"].keys() == raw["dimensions"].keys()
+    for dim, metrics in raw["dimensions"].items():
+        assert by_value(rolled["dimensions"][dim]["totals"]) == by_value(metrics["totals"]), dim
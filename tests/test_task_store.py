@@ -0,0 +1,74 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from processing import process_records  # noqa: E402
+import task_store  # noqa: E402
+from task_store import changed_rows, day_windows, partition_path, split_by_day, sync_day, write_partition  # noqa: E402
+
+
+def record(id, **fields):
+    return {"id": str(id), "user_id": "5", "project": "2", "team": "null", "activity_status": "Pending",
+            "task_title": "Poster", "created_date": "2024-01-01 10:00:00",
+            "updated_date": "0000-00-00 00:00:00", **fields}
+
+
+def test_changed_rows_with_na_in_integer_columns():
+    # team is NA on both sides, user_id and project become NA or stop being NA
+    current = process_records([record(1), record(2, user_id="null"), record(3), record(4)])
+    delta = process_records([record(1), record(2, user_id="null"), record(3, project="null"),
+                             record(4, team="7"), record(5)])
+    assert str(current["team"].dtype) == "UInt32"
+    assert changed_rows(current, delta)["id"].tolist() == [3, 4, 5]
+
+
+def test_day_windows_group_consecutive_days():
+    days = ["2024-01-05", "2024-01-01", "2024-01-02", "2024-01-03", "2024-01-04", "2024-01-07"]
+    assert day_windows(days, chunk_days=3) == [
+        ["2024-01-01", "2024-01-02", "2024-01-03"], ["2024-01-04", "2024-01-05"], ["2024-01-07"]]
+    assert day_windows(days, chunk_days=1) == [[day] for day in sorted(days)]
+
+
+def test_split_by_day_keeps_every_row():
+    window = ["2024-01-01", "2024-01-02", "2024-01-03"]
+    df = process_records([record(1), record(2, created_date="2024-01-03 09:00:00"),
+                          record(3, created_date="0000-00-00 00:00:00")])
+    parts = split_by_day(df, window)
+    assert {day: rows["id"].tolist() for day, rows in parts.items()} == {
+        "2024-01-01": [1, 3], "2024-01-02": [], "2024-01-03": [2]}
+
+
+def test_sync_day_upserts_only_changed_rows(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    day = "2024-01-01"
+    write_partition(day, process_records([record(1), record(2), record(3, team="null")]))
+
+    marks = []
+
+    def fetch_delta(fetched_day, mark, session=None):
+        marks.append(mark)
+        # The API sends back rows at the watermark too; only 2 and 4 are news
+        return process_records([record(1), record(2, activity_status="Completed"), record(3, team="null"),
+                                record(4, created_date="2024-01-01 11:00:00")])
+
+    monkeypatch.setattr(task_store, "fetch_delta", fetch_delta)
+    delta = sync_day(day)
+
+    assert marks == [(3, "2024-01-01 10:00:00")]
+    assert delta["id"].tolist() == [2, 4]
+    stored = pd.read_parquet(partition_path(day))
+    assert stored["id"].tolist() == [1, 2, 3, 4]
+    assert stored["activity_status"].astype(str).tolist() == ["Pending", "Completed", "Pending", "Pending"]
+
+
+def test_sync_day_refetches_whole_day_without_partition(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    refreshed = []
+    monkeypatch.setattr(task_store, "refresh_days", refreshed.append)
+    monkeypatch.setattr(task_store, "fetch_delta", lambda *args, **kwargs: pytest.fail("delta fetched"))
+    assert sync_day("2024-01-01") is None
+    assert refreshed == [["2024-01-01"]]